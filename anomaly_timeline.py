@@ -0,0 +1,64 @@
+"""Countries x years anomaly matrix behind the animated regional map.
+
+The matrix comes either from gridded anomalies (the per-time-step country
+means from zonal_stats, averaged per calendar year) or, without a grid,
+from a simulation that scales each country's simulated anomaly by the
+smoothed global temperature curve in ``df``.
+
+For the browser the matrix is quantized to one byte per country-year
+(255 marks a missing value) and base64 encoded, so a century of 177
+countries is ~30 KB: the country geometry is sent once and each frame of
+the animation is just a slice of this array.
+"""
+import base64
+import hashlib
+
+import numpy as np
+
+MISSING = 255
+LEVELS = 254  # Quantization steps, 0..254
+
+
+def _years_of(time):
+    time = np.asarray(time)
+    if np.issubdtype(time.dtype, np.datetime64):
+        return time.astype("datetime64[Y]").astype("int64") + 1970
+    return np.floor(time.astype("float64")).astype("int64")
+
+
+def annual_country_matrix(means, time):
+    """Averages (countries, time) means into (years, (countries, years))."""
+    years = _years_of(time)
+    unique_years, inverse = np.unique(years, return_inverse=True)
+    valid = ~np.isnan(means)
+    totals = np.zeros((means.shape[0], len(unique_years)))
+    counts = np.zeros_like(totals)
+    np.add.at(totals.T, inverse, np.where(valid, means, 0.0).T)
+    np.add.at(counts.T, inverse, valid.T.astype("float64"))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return unique_years, np.where(counts > 0, totals / counts, np.nan)
+
+
+def simulate_country_matrix(world, df, value_column="Temp Anomaly", temp_column="Temperature Anomaly (°C)"):
+    """Scales each country's latest anomaly by the global warming curve, 0 in the first year."""
+    years = df["Year"].to_numpy()
+    trend = np.polyval(np.polyfit(years, df[temp_column].to_numpy(dtype="float64"), 2), years)
+    span = trend[-1] - trend.min()
+    share = (trend - trend.min()) / span if span > 0 else np.ones_like(trend)
+    latest = world[value_column].to_numpy(dtype="float64")
+    return years, np.round(latest[:, None] * share[None, :], 2)
+
+
+def timeline_version(years, matrix):
+    digest = hashlib.sha1(np.ascontiguousarray(years, dtype="int64").tobytes())
+    digest.update(np.ascontiguousarray(matrix, dtype="float64").tobytes())
+    return digest.hexdigest()
+
+
+def encode_frames(matrix, vmin, vmax):
+    """Year-major uint8 frames (frame t, country i at t * n + i), base64 encoded."""
+    step = (vmax - vmin) / LEVELS if vmax > vmin else 1.0
+    with np.errstate(invalid="ignore"):
+        quantized = np.clip(np.round((matrix - vmin) / step), 0, LEVELS)
+    quantized = np.where(np.isnan(matrix), MISSING, quantized).astype("uint8")
+    return base64.b64encode(np.ascontiguousarray(quantized.T).tobytes()).decode("ascii"), step
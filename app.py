@@ -1,15 +1,40 @@
+import time
+_script_started = time.perf_counter() # Start of the cold-start timing reported at the end of the first run
+
 import streamlit as st
 import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import plotly.express as px
-from sklearn.linear_model import LinearRegression
+import plotly.graph_objects as go
 import requests
-import geopandas as gpd
-import folium
-from streamlit_folium import folium_static
+from concurrent.futures import TimeoutError as FutureTimeoutError
+import streamlit.components.v1 as components
+from streamlit.logger import get_logger
 from dotenv import load_dotenv
 import os
+import hmac
+import math
+import functools
+
+# geopandas, folium, scikit-learn and scipy.signal are slow to import, so they are imported
+# inside the code paths that use them (and not at all when prebuilt startup artifacts are served)
+import startup_artifacts
+from climate_data import anomaly_source, load_climate, prepare_world, read_world
+from climate_store import ClimateStore
+from shared_cache import SharedDatasetCache, dataset_key, default_root
+from metrics import FlameProfiler, JsonLogSink, Registry, serve as serve_metrics
+from anomaly_timeline import simulate_country_matrix, timeline_version
+from topology import DEFAULT_LOD, LOD_LEVELS
+from response_cache import DEFAULT_MAX_ENTRIES, DEFAULT_PATH, DEFAULT_TTL, ResponseCache
+from inference_client import InferenceClient
+from query_planner import QueryPlanner
+from range_stats import RangeIndex
+from downsampling import SeriesPyramid
+from forecasting import DEFAULT_LEVEL, MODELS, Forecaster
+from scenarios import INDICATORS as SCENARIO_INDICATORS, PATHWAYS, calibrate, default_workers, make_pool, run_ensemble
+from inference_backends import (DEFAULT_QA_MODEL, DEFAULT_SUMMARY_MODEL, QUESTION_ANSWERING, SUMMARIZATION,
+                                create_backend)
+
+logger = get_logger(__name__)
+imports_ms = (time.perf_counter() - _script_started) * 1000
 
 # --- Page Configuration ---
 st.set_page_config(layout="wide", page_title="ClimateCanvas", page_icon="🌍")
@@ -17,9 +42,137 @@ st.set_page_config(layout="wide", page_title="ClimateCanvas", page_icon="🌍")
 # --- Load Environment Variables ---
 load_dotenv()
 HF_API_KEY = os.getenv("HF_API_KEY")
-API_URL_SUMMARY = "https://api-inference.huggingface.co/models/facebook/bart-large-cnn"
-API_URL_QA = "https://api-inference.huggingface.co/models/deepset/roberta-base-squad2"
-headers = {"Authorization": f"Bearer {HF_API_KEY}"}
+MAP_DETAIL = os.getenv("MAP_DETAIL", DEFAULT_LOD) # Default level of detail for the regional map
+CLIMATE_STORE_PATH = os.getenv("CLIMATE_STORE_PATH", os.path.join("data", "store")) # Built with climate_store.py
+ANOMALY_GRID_PATH = os.getenv("ANOMALY_GRID_PATH", os.path.join("data", "anomaly_grid.npz")) # Gridded anomalies (.npz or NetCDF)
+SHARED_CACHE_DIR = os.getenv("SHARED_CACHE_DIR", default_root()) # Datasets shared by every worker on the node; empty disables
+STARTUP_ARTIFACTS_PATH = os.getenv("STARTUP_ARTIFACTS_PATH", startup_artifacts.DEFAULT_PATH) # Built with startup_artifacts.py
+FORECAST_MAX_HORIZON = int(os.getenv("FORECAST_MAX_HORIZON", 50)) # Longest forecast offered in Section 3
+CHART_MAX_POINTS = int(os.getenv("CHART_MAX_POINTS", 2000)) # Points per line chart, however long the series
+WEBGL_THRESHOLD = int(os.getenv("WEBGL_THRESHOLD", 1000)) # Traces with more points render with WebGL
+SCENARIO_WORKERS = int(os.getenv("SCENARIO_WORKERS", default_workers())) # Processes for large scenario ensembles
+SCENARIO_MAX_MEMBERS = int(os.getenv("SCENARIO_MAX_MEMBERS", 1_000_000)) # Largest ensemble a session may ask for
+INFERENCE_RESULT_TIMEOUT = float(os.getenv("INFERENCE_RESULT_TIMEOUT", 120)) # Seconds a section waits for a summary/answer
+HF_API_BASE = os.getenv("HF_API_BASE", "https://api-inference.huggingface.co") # Point at a stand-in server for testing
+API_URL_SUMMARY = f"{HF_API_BASE}/models/facebook/bart-large-cnn"
+API_URL_QA = f"{HF_API_BASE}/models/deepset/roberta-base-squad2"
+METRICS_PORT = os.getenv("METRICS_PORT", "") # Serve Prometheus metrics at :PORT/metrics; empty disables
+METRICS_PORTS = int(os.getenv("METRICS_PORTS", 8)) # Each worker takes the first free port of METRICS_PORT..+N-1
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1") # Set to 0.0.0.0 only if scrapers outside this host need it
+METRICS_LOG = os.getenv("METRICS_LOG", "").lower() in ("1", "true", "yes") # One JSON log line per timing span
+PROFILE_DIR = os.getenv("PROFILE_DIR", "") # Where ?profile=<PROFILE_TOKEN> writes a flame profile of that rerun
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "") # Secret a visitor must pass to profile; empty disables profiling
+
+# --- Instrumentation ---
+@st.cache_resource
+def get_metrics():
+    # One registry per process, shared by every session
+    registry = Registry()
+    registry.describe("rerun_seconds", "Full script reruns")
+    registry.describe("section_seconds", "Page sections (fragments), including waits for inference results")
+    registry.describe("cache_lookups_total", "Calls to cached functions")
+    registry.describe("cache_misses_total", "Calls to cached functions that had to compute the result")
+    registry.describe("cache_fill_seconds", "Computing the result of a cached function on a miss")
+    registry.describe("response_cache_hits_total", "Inference responses served from the shared response cache (all workers)")
+    registry.describe("response_cache_misses_total", "Inference requests the shared response cache could not answer (all workers)")
+    registry.describe("response_cache_evictions_total", "Least recently used responses evicted from the shared cache")
+    registry.describe("response_cache_entries", "Responses currently in the shared cache")
+    if METRICS_LOG:
+        registry.add_sink(JsonLogSink(get_logger("climatecanvas.metrics")))
+    if METRICS_PORT:
+        try:
+            server = serve_metrics(registry, int(METRICS_PORT), METRICS_HOST, METRICS_PORTS)
+            logger.info("Metrics of worker %d at http://%s:%d/metrics", os.getpid(), METRICS_HOST, server.server_port)
+        except OSError as e:
+            # e.g. more workers on this node than METRICS_PORTS
+            logger.warning("Metrics endpoint not started: %s", e)
+    return registry
+
+metrics = get_metrics()
+
+def instrumented(cache):
+    # Wraps a Streamlit cache decorator: the body only runs on a miss, so counting calls to the
+    # outer and inner functions gives the hit ratio, and the fill span times each miss
+    def decorate(func):
+        @functools.wraps(func)
+        def fill(*args, **kwargs):
+            metrics.counter("cache_misses_total", cache=func.__name__).inc()
+            with metrics.span("cache_fill", cache=func.__name__):
+                return func(*args, **kwargs)
+        cached = cache(fill)
+
+        @functools.wraps(func)
+        def lookup(*args, **kwargs):
+            metrics.counter("cache_lookups_total", cache=func.__name__).inc()
+            return cached(*args, **kwargs)
+        lookup.clear = cached.clear
+        return lookup
+    return decorate
+
+# With PROFILE_DIR and PROFILE_TOKEN set, opening the app with ?profile=<token> profiles that one rerun
+profiler = None
+if "profile" in st.query_params:
+    requested = st.query_params["profile"]
+    del st.query_params["profile"]
+    if PROFILE_DIR and PROFILE_TOKEN and hmac.compare_digest(requested.encode(), PROFILE_TOKEN.encode()):
+        profiler = FlameProfiler().start()
+
+@st.cache_resource
+def get_response_cache():
+    # One handle per process; the SQLite file behind it is shared by every worker
+    cache = ResponseCache(
+        os.getenv("RESPONSE_CACHE_PATH", DEFAULT_PATH),
+        ttl=int(os.getenv("RESPONSE_CACHE_TTL", DEFAULT_TTL)),
+        max_entries=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+    )
+    # Hits, misses, evictions and size of the shared cache, read from SQLite on every scrape
+    metrics.add_collector(cache.metric_samples)
+    return cache
+
+@st.cache_resource
+def get_inference_client():
+    # Shared by all sessions: pooled connections, retries and a process-wide concurrency limit
+    return InferenceClient(
+        HF_API_KEY,
+        max_concurrency=int(os.getenv("INFERENCE_MAX_CONCURRENCY", 4)),
+        cache=get_response_cache(),
+        metrics=metrics,
+    )
+
+@st.cache_resource
+def get_inference_backend():
+    # INFERENCE_BACKEND=remote (Hugging Face API), local (transformers on CPU) or extractive (offline fallback)
+    backend = os.getenv("INFERENCE_BACKEND", "remote")
+    return create_backend(
+        backend,
+        client=get_inference_client() if backend == "remote" else None,
+        urls={SUMMARIZATION: API_URL_SUMMARY, QUESTION_ANSWERING: API_URL_QA},
+        api_key=HF_API_KEY,
+        cache=get_response_cache(),
+        max_batch_size=int(os.getenv("INFERENCE_BATCH_SIZE", 8)),
+        max_wait=float(os.getenv("INFERENCE_BATCH_WAIT_MS", 20)) / 1000,
+        summary_model=os.getenv("LOCAL_SUMMARY_MODEL", DEFAULT_SUMMARY_MODEL),
+        qa_model=os.getenv("LOCAL_QA_MODEL", DEFAULT_QA_MODEL),
+    )
+
+ai_backend = get_inference_backend()
+
+# Inference requests run in the background while the rest of their section renders;
+# each section fills its placeholders at its end, so a fragment rerun delivers its own results
+def query_ai(pending, task, payload, placeholder, render, action):
+    placeholder.info(f"⏳ {action.capitalize()}...")
+    pending.append((ai_backend.submit(task, payload), placeholder, render, action))
+
+def deliver_results(pending):
+    for future, placeholder, render, action in pending:
+        try:
+            render(placeholder, future.result(timeout=INFERENCE_RESULT_TIMEOUT))
+        except FutureTimeoutError:
+            placeholder.error(f"😥 Timed out {action} after {INFERENCE_RESULT_TIMEOUT:.0f} seconds. Please try again.")
+        except requests.exceptions.RequestException as e:
+            placeholder.error(f"😥 Network error {action}: {e}")
+        except Exception as e:
+            placeholder.error(f"😥 Error {action}: {e}")
 
 # --- Tailwind CSS Injection ---
 # Include Tailwind CSS via CDN
@@ -110,65 +263,127 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
+def climate_store_version():
+    # Cheap manifest read; every ingest or rebuild changes the version and invalidates load_data()
+    return ClimateStore(CLIMATE_STORE_PATH).series("global").version
+
+def anomaly_grid_path():
+    return ANOMALY_GRID_PATH if os.path.exists(ANOMALY_GRID_PATH) else None
+
+@st.cache_resource
+def get_shared_cache():
+    return SharedDatasetCache(SHARED_CACHE_DIR or None)
+
+def shared_dataset_version(*parts):
+    # Hash of the source files and code a dataset is built from, plus any upstream versions
+    sources = startup_artifacts.source_paths(startup_artifacts.SHAPEFILE, anomaly_grid_path())
+    return dataset_key(startup_artifacts.source_signature(sources), *parts)
+
 # Load sample datasets
-@st.cache_data
-def load_data():
-    years = np.arange(1900, 2024) # Extended to 2024 for consistency
-    base_temp_anomaly = 0.0005 * (years - 1900)**2 + np.random.normal(0, 0.15, len(years)) - 0.5
-    base_co2 = 280 + 1.8 * (years - 1900) + np.random.normal(0, 5, len(years))
-    base_sea_level = 0.08 * (years - 1900) + np.random.normal(0, 5, len(years))
-
-    df = pd.DataFrame({
-        "Year": years,
-        "Temperature Anomaly (°C)": base_temp_anomaly,
-        "CO2 Levels (ppm)": base_co2,
-        "Sea Level Rise (mm)": base_sea_level
-    })
-    df['CO2 Levels (ppm)'] = df['CO2 Levels (ppm)'].astype(int) # More realistic CO2 levels
-    df['Sea Level Rise (mm)'] = df['Sea Level Rise (mm)'].clip(lower=0) # Sea level shouldn't decrease drastically
-    return df
-
-@st.cache_data
-def load_geospatial_data():
+# cache_resource rather than cache_data: the frames are read-only views of the shared copy, so a
+# hit hands out the same object instead of unpickling another one
+@instrumented(st.cache_resource)
+def load_data(store_version=None):
+    # Observed series from the columnar store if ingested, else simulated; df.attrs['version'] keys derived caches
+    return get_shared_cache().get_or_publish(
+        "climate", shared_dataset_version(store_version),
+        lambda: load_climate(CLIMATE_STORE_PATH if store_version is not None else None),
+    )
+
+@st.cache_resource
+def get_startup_artifacts(df_version):
+    # None unless they were built from the current shapefile, grid, code and dataset
+    sources = startup_artifacts.source_paths(startup_artifacts.SHAPEFILE, anomaly_grid_path())
+    return startup_artifacts.load(STARTUP_ARTIFACTS_PATH, sources, df_version)
+
+@st.cache_resource
+def get_range_index(_df, version):
+    # Prefix sums and sparse tables so year-range slices and stats don't rescan df
+    return RangeIndex(_df)
+
+@st.cache_resource
+def get_series_pyramid(_df, version, column):
+    # Min-max levels of one series, so a chart of any year range costs at most CHART_MAX_POINTS points.
+    # Built from every monthly (or daily) value in the store; the simulated series only has annual ones
+    if _df.attrs.get('store_path'):
+        return SeriesPyramid(*ClimateStore(_df.attrs['store_path']).series("global").points(column))
+    return SeriesPyramid(_df["Year"].to_numpy(), _df[column].to_numpy())
+
+def chart_points(df, column, start_year, end_year):
+    # x is a decimal year, so end_year's last month ends just short of end_year + 1
+    pyramid = get_series_pyramid(df, df.attrs.get('version'), column)
+    return pyramid.query(start_year, math.nextafter(end_year + 1, start_year), CHART_MAX_POINTS)
+
+def line_trace(x, y, **kwargs):
+    # SVG traces get sluggish with thousands of points; switch to WebGL above the threshold
+    trace = go.Scattergl if len(x) > WEBGL_THRESHOLD else go.Scatter
+    return trace(x=x, y=y, **kwargs)
+
+@st.cache_resource
+def get_query_planner(_df, version):
+    # Year index and per-indicator arrays for answering numeric questions without the model
+    return QueryPlanner(_df, get_range_index(_df, version))
+
+@instrumented(st.cache_resource)
+def get_fact_index(_df, _world, df_version, world_version):
+    # Per-year, per-decade and per-country fact chunks, retrieved as QA context
+    from fact_index import FactIndex # scikit-learn takes over a second to import; only free-form questions need it
+    return FactIndex.from_data(_df, _world)
+
+@instrumented(st.cache_resource)
+def load_geospatial_data(df_version=None, use_artifacts=True):
+    # Built by the first worker on the node, memory-mapped by the rest
+    artifacts = get_startup_artifacts(df_version) if use_artifacts else None
+    return get_shared_cache().get_or_publish(
+        "world" if use_artifacts else "world_full",
+        shared_dataset_version(df_version, artifacts.manifest['built_at'] if artifacts is not None else None),
+        lambda: build_geospatial_data(df_version, use_artifacts),
+    )
+
+def build_geospatial_data(df_version, use_artifacts):
+    artifacts = get_startup_artifacts(df_version) if use_artifacts else None
+    if artifacts is not None:
+        # Country table with centroids and anomalies from the build step: no shapefile, no geopandas
+        return artifacts.regions()
+
     # Attempt to load from local path first
-    local_data_path = os.path.join("data", "ne_110m_admin_0_countries.shp")
+    local_data_path = startup_artifacts.SHAPEFILE
     if os.path.exists(local_data_path):
          data_path = local_data_path
     else:
+        import geopandas as gpd
         # Fallback to geopandas dataset (requires internet)
         st.warning("Local shapefile not found. Using default geopandas dataset (requires internet). Place 'ne_110m_admin_0_countries' files in a 'data' folder for offline use.")
         data_path = gpd.datasets.get_path('naturalearth_lowres')
 
-    world = gpd.read_file(data_path)
-
-    # Simulate regional temperature anomalies based on latitude (crude simulation)
-    np.random.seed(42)
-    # Higher anomaly near poles, lower near equator (example logic)
-    world['centroid_lat'] = world.geometry.centroid.y
-    world['Temp Anomaly'] = 0.5 + 0.01 * np.abs(world['centroid_lat']) + np.random.normal(loc=0.0, scale=0.2, size=len(world))
-    world['Temp Anomaly'] = world['Temp Anomaly'].round(2) # Round for display
-
-    # Ensure the column used in Choropleth exists and has the correct name
-    if 'name' not in world.columns and 'NAME' in world.columns:
-        world = world.rename(columns={'NAME': 'name'})
-    elif 'name' not in world.columns and 'ADMIN' in world.columns:
-         world = world.rename(columns={'ADMIN': 'name'})
-    # Add more fallbacks if necessary based on the shapefile structure
-
-    # Handle potential missing names (fill with a placeholder)
-    if 'name' in world.columns:
-        world['name'] = world['name'].fillna('Unknown Country')
-    else:
+    world = prepare_world(read_world(data_path), anomaly_grid_path())
+    if world.attrs.get('names_missing'):
         st.error("Could not find a suitable country name column in the shapefile ('name', 'NAME', 'ADMIN'). Please check your shapefile attributes.")
-        # Add a dummy name column if it's missing entirely to prevent errors, though the map might not work well
-        world['name'] = [f"Region {i}" for i in range(len(world))]
-
-
     return world
 
+@instrumented(st.cache_data(show_spinner=False))
+def load_regional_map(_world, version, detail, _timeline=None, timeline_key=None, df_version=None):
+    # Keyed on the geodata version, detail level and timeline; leading underscores stop Streamlit hashing the data
+    artifacts = get_startup_artifacts(df_version)
+    prebuilt = artifacts.map_html(detail, version, timeline_key) if artifacts is not None else None
+    if prebuilt is not None:
+        return prebuilt
+    from regional_map import build_map_artifact
+    if 'geometry' not in _world.columns:
+        # The prebuilt country table has no geometry; this map needs the full geodata
+        _world = load_geospatial_data(df_version, use_artifacts=False)
+    return build_map_artifact(_world, detail, timeline=_timeline)
+
+@instrumented(st.cache_data(show_spinner=False))
+def load_anomaly_timeline(_world, _df, world_version, df_version):
+    # Countries x years matrix for the map's year slider: from the anomaly grid if loaded, else simulated
+    if 'timeline' in _world.attrs:
+        return _world.attrs['timeline']
+    return simulate_country_matrix(_world, _df)
+
 try:
-    df = load_data()
-    world = load_geospatial_data()
+    df = load_data(climate_store_version())
+    world = load_geospatial_data(df.attrs.get('version'))
     geodata_loaded = True
 except Exception as e:
     st.error(f"Error loading data: {e}")
@@ -178,6 +393,14 @@ except Exception as e:
     geodata_loaded = False
 
 
+def trend_sentence(stats):
+    # Data for the summary prompt beyond the end points, straight from the range index
+    if stats is None or stats['slope'] is None:
+        return ""
+    return (f"Over the period the anomaly changed by about {stats['slope'] * 10:+.2f}°C per decade, ranging from "
+            f"{stats['min']:.2f}°C in {stats['min_year']} to {stats['max']:.2f}°C in {stats['max_year']}.")
+
+
 # --- Section Styling Function ---
 def render_section_header(title, subtitle):
     st.markdown(f"""
@@ -187,7 +410,101 @@ def render_section_header(title, subtitle):
     </div>
     """, unsafe_allow_html=True)
 
+def render_summary(placeholder, result):
+    ai_summary = result[0]["summary_text"]
+    placeholder.markdown(f"""
+    <div class='p-4 my-4 bg-teal-50 border border-teal-200 rounded-lg shadow-sm'>
+        <strong class='text-teal-800'>🤖 AI-Generated Summary:</strong>
+        <p class='mt-2 text-gray-800'>{ai_summary}</p>
+    </div>
+    """, unsafe_allow_html=True)
+
+def render_answer(placeholder, result):
+    ai_response = result.get("answer", "The AI could not find a specific answer in the provided context.")
+    score = result.get("score", 0) # Confidence score
+
+    # Display response with confidence indication
+    confidence_color = "green" if score > 0.5 else ("orange" if score > 0.1 else "red")
+    if result.get("source") == "data":
+        footnote = "(Computed directly from the dataset)"
+    else:
+        footnote = f"(Confidence: <span class='font-semibold' style='color:{confidence_color};'>{score:.2f}</span>)"
+    placeholder.markdown(f"""
+    <div class='p-4 my-4 bg-blue-50 border border-blue-200 rounded-lg shadow-sm'>
+        <strong class='text-blue-800'>🤖 AI Response:</strong>
+        <p class='mt-2 text-gray-800'>{ai_response}</p>
+        <p class='text-xs text-gray-500 mt-2'>{footnote}</p>
+    </div>
+    """, unsafe_allow_html=True)
+
+# Each section below is a fragment: a widget inside it reruns only that section, using the
+# df/world passed in by the last full run. Expensive outputs are cached on the dataset version.
+
 # --- Section 1: Global Temperature Anomalies ---
+@instrumented(st.cache_data(show_spinner=False, max_entries=64))
+def build_temperature_figure(_df, version, start_year, end_year):
+    x, y = chart_points(_df, "Temperature Anomaly (°C)", start_year, end_year)
+    fig_temp = go.Figure(line_trace(x, y, mode="lines", name="Anomaly (°C)"))
+    fig_temp.update_layout(
+        title=f"Global Temperature Anomaly ({start_year}-{end_year})",
+        template="plotly_white", # Use a clean template
+        xaxis_title="Year",
+        yaxis_title="Temperature Anomaly (°C)",
+        font=dict(family="Arial, sans-serif", size=12, color="black"),
+        title_font_size=18,
+        hovermode="x unified"
+    )
+    fig_temp.update_traces(line=dict(color='#06b6d4', width=2.5)) # Teal color line
+    return fig_temp
+
+@st.fragment
+@metrics.timed("section", section="temperature")
+def temperature_section(df):
+    pending = []
+    # Interactive widget container with styling
+    st.markdown("<div class='my-6 p-4 bg-gray-50 rounded-lg shadow-inner border border-gray-200'>", unsafe_allow_html=True)
+    if not df.empty:
+        min_year_data = int(df["Year"].min())
+        max_year_data = int(df["Year"].max())
+        default_start = max(min_year_data, 1950) # Default start year
+
+        start_year, end_year = st.slider(
+            "Select Time Range:",
+            min_value=min_year_data,
+            max_value=max_year_data,
+            value=(default_start, max_year_data),
+            help="Drag the sliders to select the start and end years for the analysis."
+        )
+        range_index = get_range_index(df, df.attrs.get('version'))
+
+        # Plot temperature anomalies
+        st.markdown("<h3 class='text-xl font-semibold text-gray-700 mb-3'>Temperature Anomalies Over Selected Period</h3>", unsafe_allow_html=True)
+        st.plotly_chart(build_temperature_figure(df, df.attrs.get('version'), start_year, end_year), use_container_width=True)
+
+        # AI-Powered Narrative Generation
+        st.markdown("<div class='mt-5'>", unsafe_allow_html=True)
+        if st.button("✨ Generate AI Summary for Selected Period", key="summary_temp"):
+            if ai_backend.available:
+                temp_stats = range_index.stats("Temperature Anomaly (°C)", start_year, end_year)
+                summary_prompt = f"""
+                Provide a concise summary of the global temperature anomaly trend shown in the data between the years {start_year} and {end_year}.
+                Focus on the overall pattern (e.g., increasing, decreasing, stable), any notable acceleration or deceleration, and mention the approximate anomaly values at the start and end of the period based on the general trend.
+                Context: The data represents global average temperature deviations from a baseline.
+                Example data points (if available): Start year {start_year} anomaly might be around {temp_stats['first']:.2f}°C, end year {end_year} anomaly might be around {temp_stats['last']:.2f}°C.
+                {trend_sentence(temp_stats)}
+                """
+                payload = {"inputs": summary_prompt, "parameters": {"max_length": 150, "min_length": 30}}
+                query_ai(pending, SUMMARIZATION, payload, st.empty(), render_summary, "generating summary")
+            else:
+                st.warning("Hugging Face API Key not configured. Cannot generate AI summary. Set INFERENCE_BACKEND=local to run without it.")
+        st.markdown("</div>", unsafe_allow_html=True)
+
+    else:
+         st.warning("Temperature data not loaded. Cannot display chart or generate summary.")
+
+    st.markdown("</div>", unsafe_allow_html=True) # Close widget container
+    deliver_results(pending)
+
 render_section_header(
     "1. Rising Temperatures: A Global View",
     "Global average temperatures have shown a significant upward trend, particularly since the mid-20th century. Explore the historical temperature anomalies relative to a baseline period (typically pre-industrial)."
@@ -205,261 +522,241 @@ with st.expander("What are Temperature Anomalies?"):
     </div>
     """, unsafe_allow_html=True)
 
-# Interactive widget container with styling
-st.markdown("<div class='my-6 p-4 bg-gray-50 rounded-lg shadow-inner border border-gray-200'>", unsafe_allow_html=True)
-if not df.empty:
-    min_year_data = int(df["Year"].min())
-    max_year_data = int(df["Year"].max())
-    default_start = max(min_year_data, 1950) # Default start year
-
-    start_year, end_year = st.slider(
-        "Select Time Range:",
-        min_value=min_year_data,
-        max_value=max_year_data,
-        value=(default_start, max_year_data),
-        help="Drag the sliders to select the start and end years for the analysis."
-    )
-    filtered_df = df[(df["Year"] >= start_year) & (df["Year"] <= end_year)]
-
-    # Plot temperature anomalies
-    st.markdown("<h3 class='text-xl font-semibold text-gray-700 mb-3'>Temperature Anomalies Over Selected Period</h3>", unsafe_allow_html=True)
-    fig_temp = px.line(
-        filtered_df,
-        x="Year",
-        y="Temperature Anomaly (°C)",
-        title=f"Global Temperature Anomaly ({start_year}-{end_year})",
-        labels={"Temperature Anomaly (°C)": "Anomaly (°C)"},
-        template="plotly_white" # Use a clean template
-    )
-    fig_temp.update_layout(
-        xaxis_title="Year",
-        yaxis_title="Temperature Anomaly (°C)",
-        font=dict(family="Arial, sans-serif", size=12, color="black"),
-        title_font_size=18,
-        hovermode="x unified"
-    )
-    fig_temp.update_traces(line=dict(color='#06b6d4', width=2.5)) # Teal color line
-    st.plotly_chart(fig_temp, use_container_width=True)
-
-    # AI-Powered Narrative Generation
-    st.markdown("<div class='mt-5'>", unsafe_allow_html=True)
-    if st.button("✨ Generate AI Summary for Selected Period", key="summary_temp"):
-        if HF_API_KEY:
-            summary_prompt = f"""
-            Provide a concise summary of the global temperature anomaly trend shown in the data between the years {start_year} and {end_year}.
-            Focus on the overall pattern (e.g., increasing, decreasing, stable), any notable acceleration or deceleration, and mention the approximate anomaly values at the start and end of the period based on the general trend.
-            Context: The data represents global average temperature deviations from a baseline.
-            Example data points (if available): Start year {start_year} anomaly might be around {filtered_df.iloc[0]['Temperature Anomaly (°C)']:.2f}°C, end year {end_year} anomaly might be around {filtered_df.iloc[-1]['Temperature Anomaly (°C)']:.2f}°C.
-            """
-            payload = {"inputs": summary_prompt, "parameters": {"max_length": 150, "min_length": 30}}
-            try:
-                response = requests.post(API_URL_SUMMARY, headers=headers, json=payload, timeout=30)
-                response.raise_for_status() # Raise HTTPError for bad responses (4xx or 5xx)
-                ai_summary = response.json()[0]["summary_text"]
-                st.markdown(f"""
-                <div class='p-4 my-4 bg-teal-50 border border-teal-200 rounded-lg shadow-sm'>
-                    <strong class='text-teal-800'>🤖 AI-Generated Summary:</strong>
-                    <p class='mt-2 text-gray-800'>{ai_summary}</p>
-                </div>
-                """, unsafe_allow_html=True)
-            except requests.exceptions.RequestException as e:
-                 st.error(f"😥 Network error generating summary: {e}")
-            except Exception as e:
-                 st.error(f"😥 Error generating summary: {e}")
-        else:
-            st.warning("Hugging Face API Key not configured. Cannot generate AI summary.")
-    st.markdown("</div>", unsafe_allow_html=True)
+temperature_section(df)
 
-else:
-     st.warning("Temperature data not loaded. Cannot display chart or generate summary.")
 
-st.markdown("</div>", unsafe_allow_html=True) # Close widget container
+# --- Section 2: Regional Analysis with Geospatial Data ---
+@st.fragment
+@metrics.timed("section", section="regional")
+def regional_section(world, df, geodata_loaded):
+    if geodata_loaded and world is not None and 'name' in world.columns:
+        st.markdown("<div class='my-6 p-4 bg-gray-50 rounded-lg shadow-inner border border-gray-200'>", unsafe_allow_html=True)
+        st.markdown("<h3 class='text-xl font-semibold text-gray-700 mb-3'>Interactive Map of Regional Temperature Anomalies</h3>", unsafe_allow_html=True)
+
+        detail_levels = list(LOD_LEVELS)
+        map_detail = st.selectbox(
+            "Map detail:",
+            detail_levels,
+            index=detail_levels.index(MAP_DETAIL) if MAP_DETAIL in detail_levels else detail_levels.index(DEFAULT_LOD),
+            help="Lower detail simplifies country borders and sends much less data to the browser."
+        )
 
+        # Build (or reuse) the rendered choropleth for this version of the geodata
+        map_version = world.attrs['map_version']
+        timeline = load_anomaly_timeline(world, df, map_version, df.attrs.get('version')) if not df.empty or 'timeline' in world.attrs else None
+        map_html, map_stats = load_regional_map(
+            world, map_version, map_detail, timeline, timeline_version(*timeline) if timeline is not None else None,
+            df.attrs.get('version')
+        )
 
-# --- Section 2: Regional Analysis with Geospatial Data ---
+        # Display the map in Streamlit using the styled container
+        st.markdown("<div class='my-4 border rounded-lg shadow-md overflow-hidden'>", unsafe_allow_html=True)
+        components.html(map_html, height=map_stats['height'] + 10) # Let container control width
+        st.markdown("</div>", unsafe_allow_html=True)
+
+        st.caption(
+            f"Geometry payload: {map_stats['bytes'] / 1024:.0f} KB "
+            f"({map_stats['saved_ratio']:.0%} smaller than full GeoJSON), built in {map_stats['render_ms']:.0f} ms."
+        )
+        if anomaly_source(world) == "gridded":
+            st.markdown("<p class='text-sm text-gray-500 mt-2'>Hover over a country to see its name and temperature anomaly, the area-weighted mean of the gridded anomaly data over the country. Use the slider or ▶ on the map to move through the years.</p>", unsafe_allow_html=True)
+        else:
+            st.markdown("<p class='text-sm text-gray-500 mt-2'>Hover over a country to see its name and simulated temperature anomaly. Use the slider or ▶ on the map to move through the years. Note: Anomalies are simulated for illustrative purposes.</p>", unsafe_allow_html=True)
+        st.markdown("</div>", unsafe_allow_html=True) # Close widget container
+    else:
+        st.markdown("<div class='my-6 p-4 bg-yellow-50 rounded-lg border border-yellow-200'><p class='text-yellow-800'>Geospatial data could not be loaded or processed correctly. The regional map cannot be displayed.</p></div>", unsafe_allow_html=True)
+
+anomaly_kind = anomaly_source(world) if geodata_loaded else "simulated" # Gridded when ANOMALY_GRID_PATH was loaded
 render_section_header(
     "2. A World of Difference: Regional Anomalies",
-    "Climate change impacts are not uniform. Explore how simulated temperature anomalies vary across different countries and regions using the interactive map below."
+    f"Climate change impacts are not uniform. Explore how {anomaly_kind} temperature anomalies vary across different countries and regions using the interactive map below."
 )
 
-if geodata_loaded and world is not None and 'name' in world.columns:
-    st.markdown("<div class='my-6 p-4 bg-gray-50 rounded-lg shadow-inner border border-gray-200'>", unsafe_allow_html=True)
-    st.markdown("<h3 class='text-xl font-semibold text-gray-700 mb-3'>Interactive Map of Regional Temperature Anomalies</h3>", unsafe_allow_html=True)
-
-    # Create a choropleth map
-    m = folium.Map(location=[20, 0], zoom_start=2, tiles='CartoDB positron', attr='CartoDB Positron')
-
-    choropleth = folium.Choropleth(
-        geo_data=world,
-        name="choropleth",
-        data=world,
-        columns=["name", "Temp Anomaly"], # Use the standardized 'name' column
-        key_on="feature.properties.name", # Use the standardized 'name' column
-        fill_color="YlOrRd",
-        fill_opacity=0.7,
-        line_opacity=0.3,
-        legend_name="Simulated Temperature Anomaly (°C)",
-        highlight=True, # Highlight country on hover
-        nan_fill_color="lightgrey" # Color for countries with no data
-    ).add_to(m)
-
-    # Add tooltips for interactivity
-    tooltip = folium.features.GeoJsonTooltip(
-        fields=['name', 'Temp Anomaly'],
-        aliases=['Country:', 'Simulated Anomaly (°C):'],
-        sticky=False, # Tooltip follows mouse
-        style=("background-color: white; color: black; font-family: Arial; "
-               "font-size: 12px; padding: 5px; border-radius: 3px; box-shadow: 1px 1px 3px grey;")
+regional_section(world, df, geodata_loaded)
+
+
+# --- Section 3: Predictive Analytics ---
+@instrumented(st.cache_resource)
+def get_forecaster(_df, version):
+    # Every model fitted to every indicator once per dataset version, with its bootstrap draws
+    return Forecaster(_df, max_horizon=FORECAST_MAX_HORIZON)
+
+@instrumented(st.cache_data(show_spinner=False, max_entries=64))
+def build_forecast_figure(_df, version, column, model, horizon):
+    # A new horizon or model reuses the fitted forecaster: one matrix product and a quantile
+    forecast = get_forecaster(_df, version).forecast(column, model, horizon)
+    last_year = int(_df["Year"].max())
+    history_x, history_y = chart_points(_df, column, min(2000, last_year - 2 * horizon), last_year) # Show some recent history
+
+    fig = go.Figure([
+        go.Scatter(x=forecast["Year"], y=forecast["Upper"], mode="lines", line=dict(width=0), showlegend=False, hoverinfo="skip"),
+        go.Scatter(x=forecast["Year"], y=forecast["Lower"], mode="lines", line=dict(width=0), fill="tonexty",
+                   fillcolor="rgba(249, 115, 22, 0.2)", name=f"{DEFAULT_LEVEL:.0%} interval"),
+        line_trace(history_x, history_y, mode="lines+markers", name="Historical",
+                   line=dict(color="#0ea5e9", width=2.5)), # Sky blue
+        go.Scatter(x=forecast["Year"], y=forecast["Forecast"], mode="lines+markers", name="Predicted",
+                   line=dict(color="#f97316", width=2.5)), # Orange
+    ])
+    fig.update_layout(
+         title=f"Historical and Predicted {column} ({model} model)",
+         xaxis_title="Year",
+         yaxis_title=column,
+         template="plotly_white",
+         font=dict(family="Arial, sans-serif", size=12, color="black"),
+         title_font_size=18,
+         legend_title_text='Data Type',
+         hovermode="x unified"
     )
-    folium.GeoJson(
-        world,
-        style_function=lambda x: {'fillColor': 'transparent', 'color': 'transparent'}, # Make GeoJson layer invisible
-        tooltip=tooltip
-    ).add_to(m)
+    return fig
+
+@st.fragment
+@metrics.timed("section", section="forecast")
+def forecast_section(df):
+    st.markdown("<div class='my-6 p-4 bg-gray-50 rounded-lg shadow-inner border border-gray-200'>", unsafe_allow_html=True)
+    if not df.empty:
+        try:
+            version = df.attrs.get('version')
+            forecaster = get_forecaster(df, version)
+            col_indicator, col_model, col_horizon = st.columns(3)
+            indicator = col_indicator.selectbox(
+                "Indicator:", forecaster.columns,
+                index=forecaster.columns.index("CO2 Levels (ppm)") if "CO2 Levels (ppm)" in forecaster.columns else 0
+            )
+            model = col_model.selectbox("Model:", MODELS, format_func=str.capitalize)
+            horizon = col_horizon.slider("Years ahead:", 1, FORECAST_MAX_HORIZON, 10)
+
+            last_year = int(df["Year"].max())
+            st.markdown(f"<h3 class='text-xl font-semibold text-gray-700 mb-3'>Forecasting {indicator} ({last_year + 1}-{last_year + horizon})</h3>", unsafe_allow_html=True)
+            st.plotly_chart(build_forecast_figure(df, version, indicator, model, horizon), use_container_width=True)
+
+            errors = ", ".join(f"{m} {forecaster.rmse(indicator, m):.2f}" for m in MODELS)
+            st.caption(f"In-sample RMSE by model: {errors}. Bands are {DEFAULT_LEVEL:.0%} residual-bootstrap prediction intervals.")
+            st.markdown("<p class='text-sm text-gray-500 mt-2'>Note: These are statistical projections based solely on past trends and do not account for future policy changes, technological advancements, or complex climate feedback loops.</p>", unsafe_allow_html=True)
 
-    # Add layer control
-    folium.LayerControl().add_to(m)
+        except Exception as e:
+            st.error(f"😥 Error during prediction: {e}")
 
-    # Display the map in Streamlit using the styled container
-    st.markdown("<div class='my-4 border rounded-lg shadow-md overflow-hidden'>", unsafe_allow_html=True)
-    folium_static(m, width=None, height=500) # Let container control width
-    st.markdown("</div>", unsafe_allow_html=True)
+    else:
+        st.warning("Climate data not loaded. Cannot display predictions.")
 
-    st.markdown("<p class='text-sm text-gray-500 mt-2'>Hover over a country to see its name and simulated temperature anomaly. Note: Anomalies are simulated for illustrative purposes.</p>", unsafe_allow_html=True)
     st.markdown("</div>", unsafe_allow_html=True) # Close widget container
-else:
-    st.markdown("<div class='my-6 p-4 bg-yellow-50 rounded-lg border border-yellow-200'><p class='text-yellow-800'>Geospatial data could not be loaded or processed correctly. The regional map cannot be displayed.</p></div>", unsafe_allow_html=True)
 
+@st.cache_resource
+def get_scenario_pool():
+    # One process pool shared by every session's large ensembles; concurrent runs queue on its workers
+    return make_pool(SCENARIO_WORKERS) if SCENARIO_WORKERS > 1 else None
+
+@instrumented(st.cache_data(show_spinner="Running scenario ensemble...", max_entries=32))
+def run_scenario(_df, version, pathway, members, horizon):
+    # Keyed on the dataset version and scenario parameters; only the quantile frames are kept
+    if members > SCENARIO_MAX_MEMBERS:
+        raise ValueError(f"Ensembles are limited to {SCENARIO_MAX_MEMBERS:,} members")
+    return run_ensemble(calibrate(_df), pathway, horizon=horizon, members=members, workers=SCENARIO_WORKERS,
+                        pool=get_scenario_pool())
+
+def build_scenario_figure(df, fan, indicator, pathway):
+    history_x, history_y = chart_points(df, indicator, 1950, int(fan["Year"].min()) - 1)
+    fig = go.Figure([
+        go.Scatter(x=fan["Year"], y=fan["P95"], mode="lines", line=dict(width=0), showlegend=False, hoverinfo="skip"),
+        go.Scatter(x=fan["Year"], y=fan["P5"], mode="lines", line=dict(width=0), fill="tonexty",
+                   fillcolor="rgba(239, 68, 68, 0.15)", name="5-95%"),
+        go.Scatter(x=fan["Year"], y=fan["P75"], mode="lines", line=dict(width=0), showlegend=False, hoverinfo="skip"),
+        go.Scatter(x=fan["Year"], y=fan["P25"], mode="lines", line=dict(width=0), fill="tonexty",
+                   fillcolor="rgba(239, 68, 68, 0.3)", name="25-75%"),
+        line_trace(history_x, history_y, mode="lines", name="Historical",
+                   line=dict(color="#0ea5e9", width=2.5)), # Sky blue
+        go.Scatter(x=fan["Year"], y=fan["P50"], mode="lines", name="Median", line=dict(color="#dc2626", width=2.5)),
+    ])
+    fig.update_layout(
+         title=f"{indicator} under the '{pathway}' pathway",
+         xaxis_title="Year",
+         yaxis_title=indicator,
+         template="plotly_white",
+         font=dict(family="Arial, sans-serif", size=12, color="black"),
+         title_font_size=18,
+         hovermode="x unified"
+    )
+    return fig
+
+@st.fragment
+@metrics.timed("section", section="scenario")
+def scenario_section(df):
+    st.markdown("<div class='my-6 p-4 bg-gray-50 rounded-lg shadow-inner border border-gray-200'>", unsafe_allow_html=True)
+    if not df.empty and all(c in df.columns for c in SCENARIO_INDICATORS):
+        last_year = int(df["Year"].max())
+        horizon = max(2100 - last_year, 10)
+        st.markdown(f"<h3 class='text-xl font-semibold text-gray-700 mb-3'>Emission Scenarios to {last_year + horizon}</h3>", unsafe_allow_html=True)
+        col_pathway, col_members, col_indicator = st.columns(3)
+        pathway = col_pathway.selectbox("Emission pathway:", list(PATHWAYS), index=list(PATHWAYS).index("Current trend"))
+        sizes = [n for n in (10_000, 100_000, 1_000_000) if n <= SCENARIO_MAX_MEMBERS] or [SCENARIO_MAX_MEMBERS]
+        members = col_members.select_slider("Ensemble members:", sizes, value=min(100_000, sizes[-1]), format_func="{:,}".format)
+        indicator = col_indicator.selectbox("Show:", SCENARIO_INDICATORS, index=SCENARIO_INDICATORS.index("Temperature Anomaly (°C)"))
+        try:
+            fans = run_scenario(df, df.attrs.get('version'), pathway, members, horizon)
+            st.plotly_chart(build_scenario_figure(df, fans[indicator], indicator, pathway), use_container_width=True)
+            st.markdown(f"<p class='text-sm text-gray-500 mt-2'>Each of the {members:,} simulated futures samples its own emission growth, climate sensitivity and sea-level response; the bands show where 50% and 90% of them end up. Illustrative only: the response parameters are rough literature values, not a climate model.</p>", unsafe_allow_html=True)
+        except Exception as e:
+            st.error(f"😥 Error running scenarios: {e}")
+    else:
+        st.warning("Climate data not loaded. Cannot run scenarios.")
+    st.markdown("</div>", unsafe_allow_html=True) # Close widget container
 
-# --- Section 3: Predictive Analytics for CO2 Levels ---
 render_section_header(
-    "3. Peering into the Future: CO₂ Predictions",
-    "Using historical data, we can train a simple predictive model (Linear Regression) to forecast potential future CO₂ levels. This provides a glimpse into possible scenarios based on past trends."
+    "3. Peering into the Future: Climate Predictions",
+    "Using historical data, we can fit simple predictive models (linear, polynomial, exponential and autoregressive) to forecast CO₂ levels, temperature anomalies and sea level rise, and run large ensembles of emission scenarios. This provides a glimpse into possible scenarios based on past trends."
 )
 
-st.markdown("<div class='my-6 p-4 bg-gray-50 rounded-lg shadow-inner border border-gray-200'>", unsafe_allow_html=True)
-if not df.empty:
-    st.markdown("<h3 class='text-xl font-semibold text-gray-700 mb-3'>Forecasting CO₂ Levels (2024-2034)</h3>", unsafe_allow_html=True)
-    try:
-        # Train a linear regression model
-        X = df["Year"].values.reshape(-1, 1)
-        y = df["CO2 Levels (ppm)"].values
-        model = LinearRegression()
-        model.fit(X, y)
-
-        # Predict future CO2 levels
-        last_year = int(df["Year"].max())
-        future_years = np.arange(last_year + 1, last_year + 11).reshape(-1, 1)
-        predicted_co2 = model.predict(future_years)
-
-        # Combine historical and predicted data for plotting
-        hist_df_plot = df[['Year', 'CO2 Levels (ppm)']].copy()
-        hist_df_plot['Type'] = 'Historical'
-
-        future_df_plot = pd.DataFrame({
-            "Year": future_years.flatten(),
-            "CO2 Levels (ppm)": predicted_co2,
-            "Type": "Predicted"
-        })
-
-        combined_df = pd.concat([hist_df_plot[hist_df_plot['Year'] >= 2000], future_df_plot], ignore_index=True) # Show some recent history
-
-        # Plot predictions
-        fig_co2_pred = px.line(
-            combined_df,
-            x="Year",
-            y="CO2 Levels (ppm)",
-            color="Type",
-            title="Historical and Predicted CO₂ Levels",
-            labels={"CO2 Levels (ppm)": "CO₂ (ppm)"},
-            template="plotly_white",
-            color_discrete_map={'Historical': '#0ea5e9', 'Predicted': '#f97316'} # Sky blue and Orange
-        )
-        fig_co2_pred.update_layout(
-             xaxis_title="Year",
-             yaxis_title="CO₂ Levels (ppm)",
-             font=dict(family="Arial, sans-serif", size=12, color="black"),
-             title_font_size=18,
-             legend_title_text='Data Type',
-             hovermode="x unified"
-        )
-        fig_co2_pred.update_traces(mode='lines+markers', line=dict(width=2.5))
-        st.plotly_chart(fig_co2_pred, use_container_width=True)
+forecast_section(df)
+scenario_section(df)
 
-        st.markdown("<p class='text-sm text-gray-500 mt-2'>Note: This is a simple linear projection based solely on past trends and does not account for future policy changes, technological advancements, or complex climate feedback loops.</p>", unsafe_allow_html=True)
 
-    except Exception as e:
-        st.error(f"😥 Error during prediction: {e}")
+# --- Section 4: Natural Language Queries ---
+@st.fragment
+@metrics.timed("section", section="query")
+def query_section(df, world):
+    pending = []
+    st.markdown("<div class='my-6 p-4 bg-gray-50 rounded-lg shadow-inner border border-gray-200'>", unsafe_allow_html=True)
+    st.markdown("<h3 class='text-xl font-semibold text-gray-700 mb-3'>Query the Climate Data</h3>", unsafe_allow_html=True)
 
-else:
-    st.warning("CO₂ data not loaded. Cannot display predictions.")
+    query = st.text_input("Enter your question about the trends (e.g., 'What was the approximate CO2 level in 2010?', 'Did sea level rise faster after 1980?'):", key="qa_input")
 
-st.markdown("</div>", unsafe_allow_html=True) # Close widget container
+    # Lookup-style questions (value in a year, change, rate, extremes) are answered from df directly
+    data_answer = get_query_planner(df, df.attrs.get('version')).answer(query) if query and not df.empty else None
 
+    if data_answer is not None:
+        render_answer(st.empty(), data_answer)
+    elif query:
+        if ai_backend.available:
+            try:
+                # Give the model only the facts most relevant to this question
+                from fact_index import DEFAULT_TOKEN_BUDGET, DEFAULT_TOP_K
+                fact_index = get_fact_index(df, world, df.attrs.get('version'), world.attrs.get('map_version') if world is not None else None)
+                full_context = fact_index.context_for(
+                    query,
+                    top_k=int(os.getenv("QA_CONTEXT_TOP_K", DEFAULT_TOP_K)),
+                    token_budget=int(os.getenv("QA_CONTEXT_TOKENS", DEFAULT_TOKEN_BUDGET)),
+                ) or "Basic climate indicators like temperature anomaly, CO2 levels, and sea level rise are tracked over time."
+
+                qa_payload = {
+                    "question": query,
+                    "context": full_context
+                }
+                # Full-page reruns re-send the same question; the cache absorbs them
+                query_ai(pending, QUESTION_ANSWERING, qa_payload, st.empty(), render_answer, "processing question")
+            except Exception as e:
+                st.error(f"😥 Error processing question: {e}")
+        else:
+            st.warning("Hugging Face API Key not configured. Cannot answer questions. Set INFERENCE_BACKEND=local to run without it.")
+
+    st.markdown("</div>", unsafe_allow_html=True) # Close widget container
+    deliver_results(pending)
 
-# --- Section 4: Natural Language Queries ---
 render_section_header(
     "4. Ask the AI",
     "Have specific questions about the climate data presented? Ask our AI assistant in plain English. It will attempt to answer based on the context of the dataset (temperature, CO₂, sea level trends from 1900-2023)."
 )
 
-st.markdown("<div class='my-6 p-4 bg-gray-50 rounded-lg shadow-inner border border-gray-200'>", unsafe_allow_html=True)
-st.markdown("<h3 class='text-xl font-semibold text-gray-700 mb-3'>Query the Climate Data</h3>", unsafe_allow_html=True)
-
-query = st.text_input("Enter your question about the trends (e.g., 'What was the approximate CO2 level in 2010?', 'Did sea level rise faster after 1980?'):", key="qa_input")
-
-if query:
-    if HF_API_KEY:
-        try:
-            # Provide more specific context based on the loaded data
-            context_parts = []
-            if not df.empty:
-                 min_yr, max_yr = df['Year'].min(), df['Year'].max()
-                 context_parts.append(f"The dataset covers the years {min_yr} to {max_yr}.")
-                 if 'Temperature Anomaly (°C)' in df.columns:
-                      min_temp, max_temp = df['Temperature Anomaly (°C)'].min(), df['Temperature Anomaly (°C)'].max()
-                      context_parts.append(f"Global temperature anomalies range roughly from {min_temp:.2f}°C to {max_temp:.2f}°C, showing a general increasing trend.")
-                 if 'CO2 Levels (ppm)' in df.columns:
-                      min_co2, max_co2 = df['CO2 Levels (ppm)'].min(), df['CO2 Levels (ppm)'].max()
-                      context_parts.append(f"Atmospheric CO2 levels range from approximately {min_co2} ppm to {max_co2} ppm, with a clear upward trend.")
-                 if 'Sea Level Rise (mm)' in df.columns:
-                      min_slr, max_slr = df['Sea Level Rise (mm)'].min(), df['Sea Level Rise (mm)'].max()
-                      context_parts.append(f"Cumulative sea level rise ranges from {min_slr:.1f} mm to {max_slr:.1f} mm, also increasing over time.")
-            else:
-                 context_parts.append("Basic climate indicators like temperature anomaly, CO2 levels, and sea level rise are tracked over time.")
-
-            full_context = " ".join(context_parts) + " The data generally shows warming temperatures, rising CO2, and rising sea levels throughout the period, especially accelerating in recent decades."
-
-            qa_payload = {
-                "question": query,
-                "context": full_context
-            }
-            response = requests.post(API_URL_QA, headers=headers, json=qa_payload, timeout=30)
-            response.raise_for_status() # Check for HTTP errors
-
-            result = response.json()
-            ai_response = result.get("answer", "The AI could not find a specific answer in the provided context.")
-            score = result.get("score", 0) # Confidence score
-
-            # Display response with confidence indication
-            confidence_color = "green" if score > 0.5 else ("orange" if score > 0.1 else "red")
-            st.markdown(f"""
-            <div class='p-4 my-4 bg-blue-50 border border-blue-200 rounded-lg shadow-sm'>
-                <strong class='text-blue-800'>🤖 AI Response:</strong>
-                <p class='mt-2 text-gray-800'>{ai_response}</p>
-                <p class='text-xs text-gray-500 mt-2'>(Confidence: <span class='font-semibold' style='color:{confidence_color};'>{score:.2f}</span>)</p>
-            </div>
-            """, unsafe_allow_html=True)
-
-        except requests.exceptions.RequestException as e:
-            st.error(f"😥 Network error processing question: {e}")
-        except Exception as e:
-            st.error(f"😥 Error processing question: {e}")
-            st.error(f"Response content: {response.text if 'response' in locals() else 'No response object'}") # Log response content for debugging
-    else:
-        st.warning("Hugging Face API Key not configured. Cannot answer questions.")
-
-st.markdown("</div>", unsafe_allow_html=True) # Close widget container
+query_section(df, world)
 
 
 # --- Conclusion ---
@@ -490,4 +787,32 @@ st.markdown("""
 </footer>
 """, unsafe_allow_html=True)
 
-st.markdown("</div>", unsafe_allow_html=True) # Close main container
\ No newline at end of file
+st.markdown("</div>", unsafe_allow_html=True) # Close main container
+
+
+
+# --- Cold-start Timing ---
+@st.cache_resource
+def startup_report():
+    # Filled in by the first run in this process, i.e. the cold start
+    return {}
+
+report = startup_report()
+if not report:
+    report.update(
+        imports_ms=imports_ms,
+        first_run_ms=(time.perf_counter() - _script_started) * 1000,
+        prebuilt_artifacts=not df.empty and get_startup_artifacts(df.attrs.get('version')) is not None,
+    )
+    logger.info("Cold start: imports %.0f ms, first page %.0f ms, prebuilt artifacts %s",
+                report['imports_ms'], report['first_run_ms'], "used" if report['prebuilt_artifacts'] else "not used")
+
+
+# --- Rerun Timing and Profile ---
+metrics.histogram("rerun_seconds").observe(time.perf_counter() - _script_started)
+if profiler is not None:
+    profiler.stop()
+    profile_path = os.path.join(PROFILE_DIR, f"rerun-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.folded")
+    samples = profiler.write(profile_path)
+    logger.info("Wrote a flame profile of this rerun (%d samples) to %s", samples, profile_path)
+    st.toast(f"Flame profile of this rerun written to {profile_path}")
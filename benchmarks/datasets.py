@@ -0,0 +1,34 @@
+"""Synthetic climate stores at monthly or daily resolution, for benchmarks.
+
+``write_store`` ingests ``years`` years of rows ending in 2023 into a
+``ClimateStore``, one per month or one per day, with the same columns and
+trends as the app's simulated series. Years before 1900 sit at the
+pre-industrial baseline, so every indicator stays in a plausible range.
+"""
+import numpy as np
+import pandas as pd
+
+from climate_store import ClimateStore
+
+LAST_YEAR = 2023
+RESOLUTIONS = ("monthly", "daily")
+
+
+def synthetic_series(years, resolution="monthly", seed=0):
+    rng = np.random.default_rng(seed)
+    freq = "D" if resolution == "daily" else "MS"
+    dates = pd.date_range(f"{LAST_YEAR + 1 - years}-01-01", f"{LAST_YEAR}-12-31", freq=freq)
+    elapsed = np.maximum(dates.year + (dates.dayofyear - 0.5) / 365.25 - 1900, 0)
+    frame = pd.DataFrame({"Year": dates.year, "Month": dates.month})
+    if resolution == "daily":
+        frame["Day"] = dates.day
+    return frame.assign(**{
+        "Temperature Anomaly (°C)": 0.0005 * elapsed**2 - 0.5 + rng.normal(0, 0.15, len(dates)),
+        "CO2 Levels (ppm)": 280 + 1.8 * elapsed + rng.normal(0, 5, len(dates)),
+        "Sea Level Rise (mm)": np.clip(0.08 * elapsed + rng.normal(0, 5, len(dates)), 0, None),
+    })
+
+
+def write_store(root, years, resolution="monthly", seed=0):
+    """Writes the global series at ``root``; returns the number of rows."""
+    return ClimateStore(root).series("global").append(synthetic_series(years, resolution, seed))
@@ -0,0 +1,91 @@
+"""Stand-in for the Hugging Face inference API, for benchmarks and tests.
+
+Answers every POST after ``latency`` seconds, the way the hosted models
+would: a summary list for summarization payloads and an answer dict for
+question-answering payloads (the ones with a ``question``). Point the app
+at it with ``HF_API_BASE=<server.url>`` and any ``HF_API_KEY``.
+
+``queue(status, body)`` scripts the next responses instead (e.g. a 503
+"model is loading" or a 500), which the client tests use for retries.
+"""
+import collections
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        scripted = self.server.record(len(json.dumps(body)))
+        time.sleep(self.server.latency)
+        if scripted is not None:
+            status, result = scripted
+        elif "question" in body:
+            status, result = 200, {"answer": "about 1.1 °C", "score": 0.9, "start": 0, "end": 12}
+        else:
+            status, result = 200, [{"summary_text": "Temperatures rose steadily over the selected period, faster towards its end."}]
+        out = json.dumps(result).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+    def log_message(self, format, *args):
+        pass  # Keep the benchmark output clean
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency):
+        super().__init__(address, _Handler)
+        self.latency = latency
+        self.calls = 0
+        self.request_bytes = 0
+        self.scripted = collections.deque()
+        self._lock = threading.Lock()
+
+    def record(self, size):
+        """Counts a request; returns the next scripted (status, body), if any."""
+        with self._lock:
+            self.calls += 1
+            self.request_bytes += size
+            return self.scripted.popleft() if self.scripted else None
+
+
+class FakeInferenceServer:
+    def __init__(self, latency=0.2, host="127.0.0.1", port=0):
+        self._server = _Server((host, port), latency)
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def calls(self):
+        return self._server.calls
+
+    def queue(self, status, body=None):
+        """Answers the next request with ``status`` and JSON ``body`` instead of a model result."""
+        self._server.scripted.append((status, body if body is not None else {"error": f"status {status}"}))
+        return self
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-hf", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
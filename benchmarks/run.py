@@ -0,0 +1,343 @@
+"""Headless benchmarks for app.py: full reruns and the sections they run.
+
+Drives the app with Streamlit's ``AppTest`` through a scripted session:
+the first load, a plain rerun, then one interaction per section (the year
+slider, an AI summary, the map detail, the forecast horizon and model, the
+scenario pathway, a lookup question and a free-form one). Sessions run on
+synthetic climate stores of a realistic span at monthly and at daily
+resolution (benchmarks/datasets.py), with the Hugging Face API replaced by
+a local server that answers after a fixed delay (benchmarks/fake_hf.py).
+
+Every step reports, per section (each ``st.fragment`` in app.py, "page"
+for everything outside them, "total" for the whole rerun):
+
+    ms          wall time, median over --repeat sessions
+    peak MB     peak traced allocations (tracemalloc, one extra session)
+    payload KB  serialized size of the elements the section rendered
+
+and the change against a stored baseline. Each session starts with empty
+Streamlit caches and its own response cache, shared dataset cache and
+startup artifacts directory, so "load" is a cold start; one discarded
+session first takes the module imports out of the numbers::
+
+    python -m benchmarks.run                        # compare with benchmarks/baseline.json
+    python -m benchmarks.run --sizes monthly:124,daily:50 --latency-ms 500
+    python -m benchmarks.run --save-baseline        # after an intentional change
+    python -m benchmarks.run --check                # exit 1 on regressions
+
+Wall times depend on the machine: compare against a baseline recorded on
+the same one (the baseline records where it was made).
+"""
+import argparse
+import functools
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+from streamlit.testing.v1.element_tree import Block
+
+from benchmarks.datasets import RESOLUTIONS, write_store
+from benchmarks.fake_hf import FakeInferenceServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(ROOT, "benchmarks", "baseline.json")
+DEFAULT_SIZES = "monthly:174,daily:174"  # 1850-2023, the span of the instrumental record
+METRICS = ("ms", "peak_mb", "payload_kb")
+# Differences below these are noise, however large in relative terms
+FLOORS = {"ms": 25.0, "peak_mb": 0.5, "payload_kb": 1.0}
+TIMEOUT = 600
+
+
+def widget(elements, label):
+    return next(w for w in elements if w.label == label)
+
+
+def select_other(box):
+    box.select(next(option for option in box.options if option != box.value))
+
+
+def year_range(at):
+    slider = widget(at.slider, "Select Time Range:")
+    slider.set_range(max(slider.min, slider.max - 50), slider.max)
+
+
+def next_pathway(at):
+    select_other(widget(at.selectbox, "Emission pathway:"))
+
+
+# (step, interaction before the rerun); each step is one at.run()
+STEPS = [
+    ("load", None),
+    ("rerun", lambda at: None),
+    ("year range", year_range),
+    ("summary", lambda at: at.button(key="summary_temp").click()),
+    ("map detail", lambda at: select_other(widget(at.selectbox, "Map detail:"))),
+    ("forecast horizon", lambda at: widget(at.slider, "Years ahead:").set_value(30)),
+    ("forecast model", lambda at: widget(at.selectbox, "Model:").select("autoregressive")),
+    ("scenario pathway", next_pathway),
+    ("lookup question", lambda at: at.text_input(key="qa_input").input("What was the CO2 level in 2010?")),
+    ("model question", lambda at: at.text_input(key="qa_input").input("What drives the warming trend?")),
+]
+
+
+class SectionRecorder:
+    """Stands in for ``st.fragment`` and times every section the app runs."""
+
+    def __init__(self):
+        self.calls = []
+        self.peak = 0
+        self._original = st.fragment
+
+    def __enter__(self):
+        st.fragment = self.fragment
+        return self
+
+    def __exit__(self, *exc):
+        st.fragment = self._original
+
+    def fragment(self, func=None, **kwargs):
+        if func is None:
+            return lambda f: self.fragment(f, **kwargs)
+
+        @functools.wraps(func)
+        def timed(*args, **kw):
+            tracing = tracemalloc.is_tracing()
+            if tracing:
+                self.fold_peak()
+                base = tracemalloc.get_traced_memory()[0]
+                tracemalloc.reset_peak()
+            start = time.perf_counter()
+            try:
+                return func(*args, **kw)
+            finally:
+                ms = (time.perf_counter() - start) * 1000
+                peak = (tracemalloc.get_traced_memory()[1] - base) / 2**20 if tracing else None
+                if tracing:
+                    self.fold_peak()
+                self.calls.append((func.__name__.removesuffix("_section"), ms, peak))
+
+        return self._original(timed, **kwargs)
+
+    def fold_peak(self):
+        # Each section resets the tracemalloc peak; this keeps the whole rerun's
+        self.peak = max(self.peak, tracemalloc.get_traced_memory()[1])
+
+
+def element_bytes(node):
+    children = getattr(node, "children", None)
+    if children:
+        return sum(element_bytes(child) for child in children.values())
+    proto = getattr(node, "proto", None)
+    return proto.ByteSize() if proto is not None else 0
+
+
+def payload_kb(at, sections):
+    """KB rendered per section; fragments are the top-level plain blocks, in page order."""
+    sizes = dict.fromkeys(["page", *sections], 0)
+    fragments = iter(sections)
+    for node in at.main.children.values():
+        name = next(fragments, "page") if type(node) is Block else "page"
+        sizes[name] += element_bytes(node)
+    sizes["total"] = sum(sizes.values())
+    return {name: size / 1024 for name, size in sizes.items()}
+
+
+def check(at, step):
+    problems = [e.value for e in at.exception] + [e.value for e in at.error]
+    if problems:
+        raise RuntimeError(f"Step '{step}' failed: {problems[0]}")
+
+
+def run_session(store, server, recorder, trace_memory=False, steps=STEPS):
+    """{step: {section: metrics}} for one scripted session with cold caches."""
+    with tempfile.TemporaryDirectory(prefix="climatecanvas-bench-") as tmp:
+        os.environ.update({
+            "CLIMATE_STORE_PATH": store,
+            "ANOMALY_GRID_PATH": os.path.join(tmp, "no_grid.npz"),
+            "STARTUP_ARTIFACTS_PATH": os.path.join(tmp, "artifacts"),
+            "SHARED_CACHE_DIR": os.path.join(tmp, "shared"),
+            "RESPONSE_CACHE_PATH": os.path.join(tmp, "responses.sqlite"),
+            "INFERENCE_BACKEND": "remote",
+            "HF_API_KEY": "benchmark",
+            "HF_API_BASE": server.url,
+        })
+        st.cache_data.clear()
+        st.cache_resource.clear()
+        at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=TIMEOUT)
+        sections, results = None, {}
+        for step, interact in steps:
+            if interact is not None:
+                interact(at)
+            recorder.calls.clear()
+            recorder.peak = 0
+            calls = server.calls
+            if trace_memory:
+                tracemalloc.reset_peak()
+                base = tracemalloc.get_traced_memory()[0]
+            start = time.perf_counter()
+            at.run()
+            total = (time.perf_counter() - start) * 1000
+            check(at, step)
+            if trace_memory:
+                recorder.fold_peak()
+
+            sections = sections or [name for name, _, _ in recorder.calls]
+            metrics = {name: {"ms": ms, "peak_mb": peak} for name, ms, peak in recorder.calls}
+            metrics["page"] = {"ms": total - sum(ms for _, ms, _ in recorder.calls)}
+            metrics["total"] = {
+                "ms": total,
+                "peak_mb": (recorder.peak - base) / 2**20 if trace_memory else None,
+                "hf_calls": server.calls - calls,
+            }
+            for name, kb in payload_kb(at, sections).items():
+                metrics.setdefault(name, {})["payload_kb"] = kb
+            results[step] = metrics
+        return results
+
+
+def parse_size(size):
+    # "daily:174" -> ("daily", 174)
+    resolution, _, years = size.strip().rpartition(":")
+    resolution = resolution or "monthly"
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f"Unknown resolution {resolution!r} in {size!r}; use one of {RESOLUTIONS}")
+    return resolution, int(years)
+
+
+def benchmark_size(resolution, years, server, repeat, warmup=False):
+    with tempfile.TemporaryDirectory(prefix="climatecanvas-store-") as store:
+        rows = write_store(store, years, resolution)
+        with SectionRecorder() as recorder:
+            if warmup:
+                run_session(store, server, recorder)  # Pays the process's module imports (sklearn, folium, ...)
+            timed = [run_session(store, server, recorder) for _ in range(repeat)]
+            tracemalloc.start()
+            try:
+                traced = run_session(store, server, recorder, trace_memory=True)
+            finally:
+                tracemalloc.stop()
+
+    # Wall times from the untraced sessions; memory, payload and HF calls from the traced one
+    for step, metrics in traced.items():
+        for section, values in metrics.items():
+            samples = [run[step][section]["ms"] for run in timed if section in run[step]]
+            values["ms"] = statistics.median(samples) if samples else None
+            values.update({k: round(v, 3) for k, v in values.items() if isinstance(v, float)})
+    return {"resolution": resolution, "years": years, "rows": rows, "steps": traced}
+
+
+def machine():
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "streamlit": st.__version__,
+    }
+
+
+def regressions(results, baseline, tolerance):
+    """(size, step, section, metric, value, base) for every metric that got worse beyond tolerance."""
+    found = []
+    for size, current in results["sizes"].items():
+        base_steps = baseline.get("sizes", {}).get(size, {}).get("steps", {})
+        for step, metrics in current["steps"].items():
+            for section, values in metrics.items():
+                for metric in METRICS:
+                    value = values.get(metric)
+                    base = base_steps.get(step, {}).get(section, {}).get(metric)
+                    if value is None or base is None:
+                        continue
+                    if value - base > FLOORS[metric] and value > base * (1 + tolerance):
+                        found.append((size, step, section, metric, value, base))
+    return found
+
+
+def change(value, base):
+    if value is None or base is None:
+        return ""
+    if base == 0:
+        return "new" if value else "0%"
+    return f"{value / base - 1:+.0%}"
+
+
+def report(results, baseline, flagged):
+    flagged = {entry[:4] for entry in flagged}
+    for size, current in results["sizes"].items():
+        base_steps = baseline.get("sizes", {}).get(size, {}).get("steps", {}) if baseline else {}
+        print(f"\n== {current['years']:,} years of {current['resolution']} data ({current['rows']:,} rows), "
+              f"HF latency {results['meta']['latency_ms']:.0f} ms ==")
+        print(f"{'step':<17} {'section':<12} {'ms':>9} {'':>6} {'peak MB':>9} {'':>6} {'payload KB':>11} {'':>6}  HF")
+        for step, metrics in current["steps"].items():
+            for section, values in metrics.items():
+                base = base_steps.get(step, {}).get(section, {})
+                cells = []
+                for metric, width, digits in (("ms", 9, 1), ("peak_mb", 9, 1), ("payload_kb", 11, 1)):
+                    value = values.get(metric)
+                    mark = "!" if (size, step, section, metric) in flagged else " "
+                    text = "-" if value is None else f"{value:.{digits}f}"
+                    cells.append(f"{text:>{width}} {change(value, base.get(metric)):>5}{mark}")
+                calls = values.get("hf_calls")
+                print(f"{step:<17} {section:<12} {' '.join(cells)}  {'' if calls is None else calls}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark app.py reruns and sections headlessly.")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES,
+                        help="Comma-separated resolution:years of synthetic data per run, e.g. monthly:174,daily:174")
+    parser.add_argument("--repeat", type=int, default=3, help="Sessions per size; wall times are their median")
+    parser.add_argument("--latency-ms", type=float, default=200, help="Delay of the fake Hugging Face API")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Write the results as the new baseline")
+    parser.add_argument("--output", help="Also write the results as JSON here")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Relative slowdown/growth that counts as a regression")
+    parser.add_argument("--check", action="store_true", help="Exit with status 1 if anything regressed")
+    args = parser.parse_args(argv)
+
+    os.chdir(ROOT)  # app.py reads data/ relative to the working directory
+    logging.disable(logging.WARNING)  # Deprecation notices and cold-start logs from every session
+    warnings.filterwarnings("ignore")
+
+    results = {"meta": {**machine(), "latency_ms": args.latency_ms, "repeat": args.repeat,
+                        "recorded": time.strftime("%Y-%m-%d %H:%M")}, "sizes": {}}
+    saved_env = dict(os.environ)
+    try:
+        with FakeInferenceServer(latency=args.latency_ms / 1000) as server:
+            for i, (resolution, years) in enumerate(parse_size(size) for size in args.sizes.split(",")):
+                print(f"Benchmarking {years:,} years of {resolution} data...", file=sys.stderr)
+                results["sizes"][f"{resolution}:{years}"] = benchmark_size(resolution, years, server, args.repeat, warmup=i == 0)
+    finally:
+        os.environ.clear()
+        os.environ.update(saved_env)
+
+    baseline = None
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    flagged = regressions(results, baseline, args.tolerance) if baseline else []
+    report(results, baseline, flagged)
+
+    if baseline:
+        meta = baseline["meta"]
+        if {k: meta.get(k) for k in ("platform", "cpus", "latency_ms")} != {k: results["meta"][k] for k in ("platform", "cpus", "latency_ms")}:
+            print(f"\nNote: the baseline was recorded on {meta.get('platform')} ({meta.get('cpus')} CPUs) "
+                  f"with {meta.get('latency_ms'):.0f} ms HF latency; wall times may not be comparable.")
+        print(f"\n{len(flagged)} regression(s) beyond {args.tolerance:.0%} against the baseline from {meta.get('recorded')}"
+              + (" (marked !)" if flagged else ""))
+    for path in filter(None, [args.output, args.baseline if args.save_baseline else None]):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=1)
+        print(f"Wrote {path}")
+    return 1 if args.check and flagged else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
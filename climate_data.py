@@ -0,0 +1,114 @@
+"""Loading the climate series and the country geodata.
+
+These are the loaders app.py wraps in Streamlit caches, kept free of
+Streamlit so startup_artifacts.py can run exactly the same steps at build
+time. geopandas, the zonal aggregator and the map code are imported only on
+the paths that need them, so a process serving prebuilt artifacts never
+loads them.
+"""
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from anomaly_timeline import annual_country_matrix
+from climate_store import ClimateStore
+
+SIMULATION_SEED = 1900  # Same simulated data in every process, so prebuilt artifacts stay valid
+
+
+def frame_version(df):
+    # Content hash used to key the caches derived from a DataFrame
+    return hashlib.sha1(pd.util.hash_pandas_object(df, index=True).values.tobytes()).hexdigest()
+
+
+def simulate_climate(seed=SIMULATION_SEED):
+    rng = np.random.default_rng(seed)
+    years = np.arange(1900, 2024) # Extended to 2024 for consistency
+    base_temp_anomaly = 0.0005 * (years - 1900)**2 + rng.normal(0, 0.15, len(years)) - 0.5
+    base_co2 = 280 + 1.8 * (years - 1900) + rng.normal(0, 5, len(years))
+    base_sea_level = 0.08 * (years - 1900) + rng.normal(0, 5, len(years))
+
+    df = pd.DataFrame({
+        "Year": years,
+        "Temperature Anomaly (°C)": base_temp_anomaly,
+        "CO2 Levels (ppm)": base_co2,
+        "Sea Level Rise (mm)": base_sea_level
+    })
+    df['CO2 Levels (ppm)'] = df['CO2 Levels (ppm)'].astype(int) # More realistic CO2 levels
+    df['Sea Level Rise (mm)'] = df['Sea Level Rise (mm)'].clip(lower=0) # Sea level shouldn't decrease drastically
+    return df
+
+
+def load_climate(store_path=None):
+    """Annual means from the columnar store when ``store_path`` is given, else the simulated series.
+
+    The frame carries a content hash in ``df.attrs['version']`` for the caches derived from it,
+    and ``df.attrs['store_path']`` when the charts can read the full monthly (or daily) series.
+    """
+    if store_path is not None:
+        # Observed series ingested into the columnar store (same column names as the simulation)
+        df = ClimateStore(store_path).series("global").read_annual()
+    else:
+        df = simulate_climate()
+    df.attrs['version'] = frame_version(df)
+    if store_path is not None:
+        df.attrs['store_path'] = store_path
+    return df
+
+
+def read_world(path):
+    import geopandas as gpd  # Slow to import; not needed when serving prebuilt artifacts
+    return gpd.read_file(path)
+
+
+def anomaly_source(world):
+    """'gridded' when the country anomalies were aggregated from a grid (those come with a timeline), else 'simulated'."""
+    return "gridded" if "timeline" in world.attrs else "simulated"
+
+
+def prepare_world(world, grid_path=None):
+    """Adds centroids, the 'Temp Anomaly' column and a 'name' column to the country GeoDataFrame.
+
+    With ``grid_path`` the anomalies are the last year's annual means of the area-weighted gridded fields and
+    ``world.attrs['timeline']`` gets the countries x years matrix; otherwise they are simulated.
+    Sets ``world.attrs['map_version']``, and ``world.attrs['names_missing']`` when no name column was found.
+    """
+    from regional_map import geodata_version
+
+    world['centroid_lat'] = world.geometry.centroid.y
+    if grid_path is not None:
+        from zonal_stats import ZonalAggregator, load_grid
+
+        # Area-weighted country means of every gridded anomaly field, averaged per calendar year
+        lats, lons, anomaly, time = load_grid(grid_path)
+        geometries = world.geometry if world.crs is None or world.crs.to_epsg() == 4326 else world.geometry.to_crs(4326)
+        years, matrix = annual_country_matrix(ZonalAggregator(geometries.values, lats, lons).aggregate(anomaly), time)
+        # The map opens on the last year's annual mean, the same value as the timeline's last frame
+        world['Temp Anomaly'] = matrix[:, -1]
+        world.attrs['timeline'] = (years, matrix)
+    else:
+        # Simulate regional temperature anomalies based on latitude (crude simulation)
+        rng = np.random.RandomState(42) # Same draws as the original np.random.seed(42)
+        # Higher anomaly near poles, lower near equator (example logic)
+        world['Temp Anomaly'] = 0.5 + 0.01 * np.abs(world['centroid_lat']) + rng.normal(loc=0.0, scale=0.2, size=len(world))
+    world['Temp Anomaly'] = world['Temp Anomaly'].round(2) # Round for display
+
+    # Ensure the column used in Choropleth exists and has the correct name
+    if 'name' not in world.columns and 'NAME' in world.columns:
+        world = world.rename(columns={'NAME': 'name'})
+    elif 'name' not in world.columns and 'ADMIN' in world.columns:
+        world = world.rename(columns={'ADMIN': 'name'})
+    # Add more fallbacks if necessary based on the shapefile structure
+
+    # Handle potential missing names (fill with a placeholder)
+    if 'name' in world.columns:
+        world['name'] = world['name'].fillna('Unknown Country')
+    else:
+        # Add a dummy name column if it's missing entirely to prevent errors, though the map might not work well
+        world['name'] = [f"Region {i}" for i in range(len(world))]
+        world.attrs['names_missing'] = True
+
+    # Version stamp for the map cache; travels with the cached copy via DataFrame.attrs
+    world.attrs['map_version'] = geodata_version(world)
+    return world
@@ -0,0 +1,281 @@
+"""Columnar, memory-mapped store for climate time series.
+
+Source files (CSV, or NetCDF when xarray is installed) are ingested once
+into a directory per series, e.g. ``data/store/global`` or
+``data/store/country/KEN``. Each column is a raw little-endian file with a
+narrow dtype, and a small ``manifest.json`` next to them records the names,
+dtypes, row count and a version::
+
+    data/store/global/
+        manifest.json
+        time.bin      int32, months since year 0 (year * 12 + month - 1), sorted
+                      (days since 1970-01-01 for daily series)
+        000.bin       float32, first value column
+        001.bin       ...
+
+A source with a ``Day`` column becomes a daily series; the manifest's
+``resolution`` records which. Reads memory-map the files, binary-search the sorted time column for the
+requested years and copy out only the requested columns in that slice, so
+memory stays flat however long the series gets. New months are appended to
+the end of every column file and then the manifest is atomically replaced.
+Readers only trust ``rows`` from the manifest, so a half-finished append is
+never visible and nothing has to be rebuilt.
+
+The version hashes a random id drawn when the store is created together
+with the row count and last month, so it changes on every append and a
+store deleted and rebuilt from other data never reuses an old version.
+The app keys its caches on it.
+
+Usage::
+
+    python climate_store.py ingest data/store global observations.csv
+"""
+import argparse
+import hashlib
+import json
+import os
+import uuid
+
+import numpy as np
+import pandas as pd
+
+TIME_DTYPE = np.dtype("<i4")
+VALUE_DTYPE = np.dtype("<f4")
+MANIFEST = "manifest.json"
+EPOCH = np.datetime64("1970-01-01", "D")  # Day 0 of daily series
+
+
+def _year_start(year, resolution):
+    # First time value of ``year``: its January in months, or its 1 January in days
+    if resolution == "daily":
+        return int((np.datetime64(int(year) - 1970, "Y").astype("datetime64[D]") - EPOCH).astype("int64"))
+    return int(year) * 12
+
+
+def _decode_time(time, resolution):
+    # Year, Month (and Day) columns for stored time values
+    time = np.asarray(time, dtype="int64")
+    if resolution != "daily":
+        return {"Year": time // 12, "Month": time % 12 + 1}
+    dates = EPOCH + time.astype("timedelta64[D]")
+    months = dates.astype("datetime64[M]")
+    return {
+        "Year": dates.astype("datetime64[Y]").astype("int64") + 1970,
+        "Month": months.astype("int64") % 12 + 1,
+        "Day": (dates - months).astype("int64") + 1,
+    }
+
+
+def decimal_years(time, resolution):
+    """Time values as fractional years (2000.0 is 1 January 2000), the x axis of sub-annual charts."""
+    time = np.asarray(time, dtype="int64")
+    if resolution != "daily":
+        return time / 12
+    dates = EPOCH + time.astype("timedelta64[D]")
+    year = dates.astype("datetime64[Y]")
+    start, end = year.astype("datetime64[D]"), (year + 1).astype("datetime64[D]")
+    return year.astype("int64") + 1970 + (dates - start).astype("int64") / (end - start).astype("int64")
+
+
+class SeriesStore:
+    def __init__(self, path):
+        self.path = path
+
+    # --- Manifest ---
+
+    def manifest(self):
+        try:
+            with open(os.path.join(self.path, MANIFEST), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _write_manifest(self, manifest):
+        tmp = os.path.join(self.path, MANIFEST + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, os.path.join(self.path, MANIFEST))
+
+    @property
+    def version(self):
+        manifest = self.manifest()
+        return manifest["version"] if manifest else None
+
+    # --- Writing ---
+
+    def append(self, frame):
+        """Appends rows with a ``Year`` (and optional ``Month`` and ``Day``) column plus value columns.
+
+        Rows at or before the last stored month (day, for daily series) are
+        skipped, so re-ingesting a source file that has grown only adds the new
+        ones. Returns the number of rows written.
+        """
+        frame = frame.copy()
+        resolution = "daily" if "Day" in frame.columns else "monthly"
+        manifest = self.manifest()
+        if manifest is not None and manifest.get("resolution", "monthly") != resolution:
+            raise ValueError(f"The stored series is {manifest.get('resolution', 'monthly')}; these rows are {resolution}")
+        month = frame.pop("Month").astype("int64") if "Month" in frame.columns else 1
+        if resolution == "daily":
+            dates = pd.to_datetime({"year": frame.pop("Year"), "month": month, "day": frame.pop("Day")})
+            time = (dates.to_numpy().astype("datetime64[D]") - EPOCH).astype("int64")
+        else:
+            time = (frame.pop("Year").astype("int64") * 12 + month - 1).to_numpy()
+        order = np.argsort(time, kind="stable")
+        time, frame = time[order], frame.iloc[order]
+
+        if manifest is None:
+            os.makedirs(self.path, exist_ok=True)
+            manifest = {"version": None, "created": uuid.uuid4().hex, "resolution": resolution, "rows": 0, "columns": {}}
+            for i, name in enumerate(frame.columns):
+                manifest["columns"][name] = {"file": f"{i:03d}.bin", "dtype": VALUE_DTYPE.str}
+            for column in manifest["columns"].values():
+                open(os.path.join(self.path, column["file"]), "wb").close()
+            open(os.path.join(self.path, "time.bin"), "wb").close()
+        elif set(frame.columns) != set(manifest["columns"]):
+            raise ValueError(
+                f"Columns {sorted(frame.columns)} do not match the stored columns {sorted(manifest['columns'])}"
+            )
+
+        if manifest["rows"]:
+            last = self._memmap("time.bin", TIME_DTYPE, manifest["rows"])[-1]
+            keep = time > last
+            time, frame = time[keep], frame[keep]
+        if not len(time):
+            return 0
+
+        self._truncate(manifest)
+        with open(os.path.join(self.path, "time.bin"), "ab") as f:
+            f.write(time.astype(TIME_DTYPE).tobytes())
+        for name, column in manifest["columns"].items():
+            with open(os.path.join(self.path, column["file"]), "ab") as f:
+                f.write(frame[name].to_numpy(dtype=np.dtype(column["dtype"])).tobytes())
+
+        manifest["rows"] += len(time)
+        # Stores written before the id existed get one now
+        created = manifest.setdefault("created", uuid.uuid4().hex)
+        manifest["version"] = hashlib.sha1(f"{created}:{manifest['rows']}:{int(time[-1])}".encode()).hexdigest()[:16]
+        self._write_manifest(manifest)
+        return len(time)
+
+    def _truncate(self, manifest):
+        # Drops bytes left behind by an append that died before updating the manifest
+        rows = manifest["rows"]
+        os.truncate(os.path.join(self.path, "time.bin"), rows * TIME_DTYPE.itemsize)
+        for column in manifest["columns"].values():
+            os.truncate(os.path.join(self.path, column["file"]), rows * np.dtype(column["dtype"]).itemsize)
+
+    # --- Reading ---
+
+    def _memmap(self, file, dtype, rows):
+        if rows == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(os.path.join(self.path, file), dtype=dtype, mode="r", shape=(rows,))
+
+    def _slice(self, start_year, end_year):
+        # Manifest, time memmap and the row range of start_year..end_year (inclusive)
+        manifest = self.manifest()
+        if manifest is None:
+            raise FileNotFoundError(f"No climate series at {self.path}")
+        rows, resolution = manifest["rows"], manifest.get("resolution", "monthly")
+        time = self._memmap("time.bin", TIME_DTYPE, rows)
+        lo = 0 if start_year is None else int(np.searchsorted(time, _year_start(start_year, resolution), side="left"))
+        hi = rows if end_year is None else int(np.searchsorted(time, _year_start(end_year + 1, resolution), side="left"))
+        return manifest, time, lo, hi
+
+    def _column(self, manifest, name):
+        column = manifest["columns"][name]
+        return self._memmap(column["file"], np.dtype(column["dtype"]), manifest["rows"])
+
+    def read(self, columns=None, start_year=None, end_year=None):
+        """Monthly (or daily) rows for ``start_year``..``end_year`` (inclusive) as a DataFrame."""
+        manifest, time, lo, hi = self._slice(start_year, end_year)
+        data = _decode_time(time[lo:hi], manifest.get("resolution", "monthly"))
+        for name in columns or manifest["columns"]:
+            data[name] = np.array(self._column(manifest, name)[lo:hi])
+        return pd.DataFrame(data)
+
+    def points(self, column, start_year=None, end_year=None):
+        """(decimal years, values) of one column at full resolution, for charts."""
+        manifest, time, lo, hi = self._slice(start_year, end_year)
+        x = decimal_years(time[lo:hi], manifest.get("resolution", "monthly"))
+        return x, np.asarray(self._column(manifest, column)[lo:hi], dtype="float64")
+
+    def read_annual(self, columns=None, start_year=None, end_year=None):
+        """Calendar-year means, reduced straight from the memory-mapped columns.
+
+        Year boundaries come from binary searches of the time column and every
+        column is summed in float64 over its memmap slice, so no monthly (or
+        daily) rows are copied out or decoded.
+        """
+        manifest, time, lo, hi = self._slice(start_year, end_year)
+        names = list(columns or manifest["columns"])
+        if hi == lo:
+            return pd.DataFrame({"Year": np.empty(0, dtype="int64"), **{name: np.empty(0) for name in names}})
+        resolution = manifest.get("resolution", "monthly")
+        first, last = _decode_time(time[[lo, hi - 1]], resolution)["Year"]
+        years = np.arange(first, last + 1)
+        bounds = np.searchsorted(time[lo:hi], [_year_start(year, resolution) for year in range(first, last + 2)])
+        counts = np.diff(bounds)
+        present = counts > 0  # Years missing from the series get no row
+        annual = {"Year": years[present]}
+        for name in names:
+            values = self._column(manifest, name)[lo:hi]
+            annual[name] = np.add.reduceat(values, bounds[:-1][present], dtype="float64") / counts[present]
+        return pd.DataFrame(annual)
+
+
+class ClimateStore:
+    """A root directory holding one ``SeriesStore`` per series name."""
+
+    def __init__(self, root):
+        self.root = root
+
+    def series(self, name):
+        return SeriesStore(os.path.join(self.root, *name.split("/")))
+
+    def exists(self, name="global"):
+        return self.series(name).manifest() is not None
+
+
+def read_source(path):
+    """Reads a CSV or NetCDF source into a frame with Year/Month and value columns."""
+    if path.endswith((".nc", ".nc4", ".cdf")):
+        try:
+            import xarray as xr  # Optional dependency, only needed for NetCDF sources
+        except ImportError as e:
+            raise ImportError("Reading NetCDF sources requires xarray (pip install xarray netCDF4)") from e
+        frame = xr.open_dataset(path).to_dataframe().reset_index()
+        if "time" in frame.columns:
+            time = pd.to_datetime(frame.pop("time"))
+            if (time.dt.year * 12 + time.dt.month).nunique() < time.nunique():
+                frame.insert(0, "Day", time.dt.day)  # Several time steps per month: a daily series
+            frame.insert(0, "Month", time.dt.month)
+            frame.insert(0, "Year", time.dt.year)
+        return frame
+    return pd.read_csv(path)
+
+
+def ingest(root, series, source):
+    frame = read_source(source)
+    if "Year" not in frame.columns:
+        raise ValueError(f"{source} has no 'Year' column")
+    value_columns = [c for c in frame.columns if c not in ("Year", "Month", "Day") and pd.api.types.is_numeric_dtype(frame[c])]
+    return ClimateStore(root).series(series).append(frame[[c for c in ("Year", "Month", "Day") if c in frame.columns] + value_columns])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ingest climate series into the columnar store.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    ingest_parser = sub.add_parser("ingest", help="Append a CSV/NetCDF source to a series (new months only).")
+    ingest_parser.add_argument("root", help="Store directory, e.g. data/store")
+    ingest_parser.add_argument("series", help="Series name, e.g. global or country/KEN")
+    ingest_parser.add_argument("source", help="CSV or NetCDF file with Year (and optionally Month and Day) columns")
+    args = parser.parse_args(argv)
+
+    written = ingest(args.root, args.series, args.source)
+    print(f"Appended {written} rows to {args.series} in {args.root}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Point-budgeted downsampling of long time series for charts.
+
+A chart a thousand pixels wide cannot show more than a couple of thousand
+points, however many rows the series has. ``SeriesPyramid`` is built once
+per series and holds min-max reductions at bucket sizes 4, 8, 16, ...
+(each bucket keeps its lowest and highest point, in time order, so spikes
+survive every level). A query for a year range picks the finest level that
+has at most ``2 * budget`` points in the range and then thins that slice to
+``budget`` points with LTTB (largest-triangle-three-buckets), so the cost
+and the payload of a chart depend on the budget, not on the series length.
+"""
+import numpy as np
+
+
+def lttb(x, y, n_out):
+    """Largest-triangle-three-buckets: ``n_out`` points that keep the visual shape of (x, y)."""
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    # Interior points split into n_out - 2 buckets; first and last points are always kept
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    chosen = np.empty(n_out, dtype=np.int64)
+    chosen[0], chosen[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], max(edges[i + 1], edges[i] + 1)
+        # Average of the next bucket (or the last point) is the third vertex
+        nlo, nhi = edges[i + 1], edges[i + 2] if i + 2 < len(edges) else n
+        cx, cy = (x[nlo:nhi].mean(), y[nlo:nhi].mean()) if nhi > nlo else (x[-1], y[-1])
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(np.argmax(area))
+        chosen[i + 1] = a
+    return chosen
+
+
+def minmax(y, bucket):
+    """Indices of the min and max of every ``bucket`` consecutive points, in time order."""
+    starts = np.arange(0, len(y), bucket)
+    # Pad to whole buckets so argmin/argmax can run on a reshaped array
+    padded = np.full(len(starts) * bucket, np.nan)
+    padded[:len(y)] = y
+    blocks = padded.reshape(-1, bucket)
+    lows = starts + np.nanargmin(blocks, axis=1)
+    highs = starts + np.nanargmax(blocks, axis=1)
+    index = np.sort(np.stack([lows, highs], axis=1), axis=1).ravel()
+    keep = np.r_[True, index[1:] != index[:-1]]  # Buckets whose min and max are the same point
+    return index[keep]
+
+
+class SeriesPyramid:
+    def __init__(self, x, y, min_points=256):
+        order = np.argsort(x, kind="stable")
+        x = np.asarray(x, dtype="float64")[order]
+        y = np.asarray(y, dtype="float64")[order]
+        self.levels = [(x, y)]
+        bucket = 4  # Buckets of 2 keep every point
+        while len(x) // bucket * 2 >= min_points and bucket < len(x):
+            index = minmax(y, bucket)
+            self.levels.append((x[index], y[index]))
+            bucket *= 2
+
+    def __len__(self):
+        return len(self.levels[0][0])
+
+    def query(self, start, end, budget):
+        """At most ``budget`` (x, y) points covering start <= x <= end."""
+        for x, y in self.levels:
+            lo, hi = np.searchsorted(x, start, side="left"), np.searchsorted(x, end, side="right")
+            if hi - lo <= 2 * budget:
+                break
+        x, y = x[lo:hi], y[lo:hi]
+        index = lttb(x, y, budget)
+        return x[index], y[index]
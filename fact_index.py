@@ -0,0 +1,138 @@
+"""Retrieval index of short facts for the Section 4 QA model.
+
+Instead of handing the QA model a fixed handful of min/max sentences, the
+climate DataFrame and the country GeoDataFrame are turned into small,
+self-contained fact chunks (one per year, one per decade, one per country,
+plus a few overviews). The chunks are indexed once with a TF-IDF vectorizer
+and, for each question, the best matching chunks are packed into the model
+context until a token budget is used up. The context stays small however
+many years and countries the data covers.
+"""
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from climate_data import anomaly_source
+from query_planner import INDICATORS, LABELS
+
+DEFAULT_TOP_K = 8
+DEFAULT_TOKEN_BUDGET = 384  # Leaves room for the question in a 512-token QA model
+MIN_RELATIVE_SCORE = 0.3  # Drops chunks that only share a stray number or common word with the question
+
+
+def estimate_tokens(text):
+    # Subword tokenizers average roughly 1.3 tokens per English word
+    return int(len(text.split()) * 1.3) + 1
+
+
+def _fmt(column, value):
+    return f"{INDICATORS[column][2].format(value)} {INDICATORS[column][1]}"
+
+
+def climate_facts(df):
+    columns = [c for c in INDICATORS if c in df.columns]
+    if df.empty or not columns:
+        return []
+    df = df.sort_values("Year")
+    years = df["Year"].to_numpy()
+    facts = []
+
+    # Overview, in the spirit of the old hand-written context
+    facts.append(f"The dataset covers the years {years[0]} to {years[-1]}.")
+    for column in columns:
+        values = df[column].to_numpy(dtype="float64")
+        facts.append(
+            f"Over {years[0]}-{years[-1]}, {LABELS[column]} ranged from {_fmt(column, values.min())} "
+            f"(in {years[values.argmin()]}) to {_fmt(column, values.max())} (in {years[values.argmax()]}), "
+            f"going from {_fmt(column, values[0])} to {_fmt(column, values[-1])} overall."
+        )
+
+    # One fact per year with every indicator
+    for row in df[["Year"] + columns].itertuples(index=False):
+        parts = [f"{LABELS[c]} was {_fmt(c, v)}" for c, v in zip(columns, row[1:])]
+        facts.append(f"In {row[0]}, " + ", ".join(parts[:-1]) + (" and " if len(parts) > 1 else "") + parts[-1] + ".")
+
+    # Decade trends
+    decades = (years // 10) * 10
+    for decade in np.unique(decades):
+        mask = decades == decade
+        if mask.sum() < 2:
+            continue
+        span = years[mask]
+        parts = []
+        for column in columns:
+            values = df[column].to_numpy(dtype="float64")[mask]
+            slope = np.polyfit(span, values, 1)[0]
+            parts.append(f"{LABELS[column]} went from {_fmt(column, values[0])} to {_fmt(column, values[-1])} "
+                         f"(trend {slope:+.2f} {INDICATORS[column][1]}/year)")
+        facts.append(f"During the {decade}s ({span[0]}-{span[-1]}), " + "; ".join(parts) + ".")
+    return facts
+
+
+def country_facts(world, value_column="Temp Anomaly"):
+    if world is None or value_column not in world.columns or "name" not in world.columns:
+        return []
+    kind = anomaly_source(world)
+    # Gridded anomalies are the annual means of the grid's last year
+    when = f" in {int(world.attrs['timeline'][0][-1])} (annual mean)" if kind == "gridded" else ""
+    values = world[value_column].astype("float64")
+    mean = values.mean()
+    facts = []
+    has_continent = "CONTINENT" in world.columns
+    for name, value, continent in zip(world["name"], values,
+                                      world["CONTINENT"] if has_continent else [None] * len(world)):
+        if np.isnan(value):
+            continue
+        where = f" ({continent})" if continent else ""
+        relation = "above" if value > mean else "below"
+        facts.append(f"{name}{where} has a {kind} regional temperature anomaly of {value:.2f} °C{when}, "
+                     f"{relation} the country average of {mean:.2f} °C.")
+
+    ranked = world.assign(_value=values).dropna(subset=["_value"]).sort_values("_value")
+    if len(ranked):
+        top = ", ".join(f"{n} ({v:.2f} °C)" for n, v in zip(ranked["name"][::-1][:5], ranked["_value"][::-1][:5]))
+        bottom = ", ".join(f"{n} ({v:.2f} °C)" for n, v in zip(ranked["name"][:5], ranked["_value"][:5]))
+        facts.append(f"The countries with the highest {kind} temperature anomalies{when} are {top}.")
+        facts.append(f"The countries with the lowest {kind} temperature anomalies{when} are {bottom}.")
+    if has_continent:
+        for continent, group in ranked.groupby("CONTINENT"):
+            best = group.iloc[-1]
+            facts.append(f"Across {continent}, {kind} country temperature anomalies{when} average "
+                         f"{group['_value'].mean():.2f} °C; the highest is {best['name']} ({best['_value']:.2f} °C).")
+    return facts
+
+
+class FactIndex:
+    def __init__(self, facts):
+        self.facts = list(facts)
+        self.tokens = np.array([estimate_tokens(f) for f in self.facts])
+        self._vectorizer = TfidfVectorizer(sublinear_tf=True, token_pattern=r"(?u)\b\w+\b")
+        self._matrix = self._vectorizer.fit_transform(self.facts) if self.facts else None
+
+    @classmethod
+    def from_data(cls, df, world=None):
+        return cls(climate_facts(df) + country_facts(world))
+
+    def search(self, question, top_k=DEFAULT_TOP_K):
+        """Indices of the ``top_k`` best matching facts, best first.
+
+        Facts scoring below ``MIN_RELATIVE_SCORE`` times the best score are left out.
+        """
+        if self._matrix is None:
+            return []
+        # Rows are L2-normalized, so the dot product is the cosine similarity
+        scores = (self._matrix @ self._vectorizer.transform([question]).T).toarray().ravel()
+        k = min(top_k, len(scores))
+        candidates = np.argpartition(-scores, k - 1)[:k]
+        candidates = candidates[np.argsort(-scores[candidates])]
+        cutoff = max(scores[candidates[0]] * MIN_RELATIVE_SCORE, 1e-12)
+        return [int(i) for i in candidates if scores[i] >= cutoff]
+
+    def context_for(self, question, top_k=DEFAULT_TOP_K, token_budget=DEFAULT_TOKEN_BUDGET):
+        """Best matching facts, joined, within ``token_budget`` estimated tokens."""
+        chosen, used = [], 0
+        for i in self.search(question, top_k) or range(min(top_k, len(self.facts))):
+            if used + self.tokens[i] > token_budget:
+                continue
+            chosen.append(self.facts[i])
+            used += self.tokens[i]
+        return " ".join(chosen)
@@ -0,0 +1,146 @@
+"""Multi-model forecasts with bootstrap prediction intervals.
+
+``Forecaster`` fits every model to every indicator once per dataset and keeps
+what a forecast needs, so rendering another horizon or model is a matrix
+product and a quantile, never a refit:
+
+* linear, polynomial and exponential trends are least-squares fits on a
+  basis of the (centred, scaled) year. The residual bootstrap refits all
+  resamples at once through the pseudo-inverse of the design matrix, which
+  gives a (basis, n_boot) matrix of coefficients. A forecast is the future
+  basis times those coefficients, plus resampled residuals for noise.
+* the autoregressive model is an AR(p) on year-to-year changes with drift.
+  Its point path is precomputed up to ``max_horizon``. Because the model is
+  linear, a path driven by resampled innovations is the point path plus
+  innovations times a lower-triangular matrix of cumulative impulse
+  responses.
+
+Residual draws are shared indices into each fit's residuals, drawn once, so
+every model and horizon sees the same bootstrap samples.
+"""
+import numpy as np
+import pandas as pd
+
+MODELS = ("linear", "polynomial", "exponential", "autoregressive")
+DEFAULT_MAX_HORIZON = 50
+DEFAULT_BOOTSTRAP = 1000
+DEFAULT_LEVEL = 0.9
+POLYNOMIAL_DEGREE = 2
+AR_ORDER = 2
+EXP_RATES = np.geomspace(1e-3, 0.1, 60)  # Candidate growth rates per year for the exponential trend
+
+
+class _BasisFit:
+    """y ~ basis(t) @ coef, with bootstrap coefficients from resampled residuals."""
+
+    def __init__(self, basis, t, y, in_sample_draws):
+        self.basis = basis
+        X = basis(t)
+        pinv = np.linalg.pinv(X)
+        coef = pinv @ y
+        fitted = X @ coef
+        self.residuals = y - fitted
+        self.rmse = float(np.sqrt(np.mean(self.residuals ** 2)))
+        self.coef = coef
+        # Every bootstrap refit in one product: (k, n) @ (n, B)
+        self.coef_boot = pinv @ (fitted[:, None] + self.residuals[in_sample_draws].T)
+
+    def forecast(self, t_future, noise_draws):
+        X = self.basis(t_future)
+        draws = (X @ self.coef_boot).T + self.residuals[noise_draws]
+        return X @ self.coef, draws
+
+
+class _AutoregressiveFit:
+    """AR(p) with drift on first differences, integrated back to levels."""
+
+    def __init__(self, y, order, max_horizon):
+        diffs = np.diff(y)
+        if len(diffs) <= order + 1:
+            raise ValueError(f"Need more than {order + 2} values for an AR({order}) model")
+        lags = np.column_stack([np.ones(len(diffs) - order)] + [diffs[order - i - 1:len(diffs) - i - 1] for i in range(order)])
+        phi, *_ = np.linalg.lstsq(lags, diffs[order:], rcond=None)
+        self.residuals = diffs[order:] - lags @ phi
+        self.rmse = float(np.sqrt(np.mean(self.residuals ** 2)))
+
+        # Point path of the differences, then levels
+        history = list(diffs[-order:][::-1])
+        steps = []
+        for _ in range(max_horizon):
+            step = phi[0] + np.dot(phi[1:], history[:order])
+            steps.append(step)
+            history.insert(0, step)
+        self.point = y[-1] + np.cumsum(steps)
+
+        # Impulse responses of the differences (psi), summed for levels: L[h, j] = psi_0 + ... + psi_(h-j)
+        psi = np.zeros(max_horizon)
+        psi[0] = 1.0
+        for h in range(1, max_horizon):
+            psi[h] = sum(phi[i + 1] * psi[h - i - 1] for i in range(min(order, h)))
+        cumulative = np.cumsum(psi)
+        offsets = np.arange(max_horizon)[:, None] - np.arange(max_horizon)[None, :]
+        self.impulse = np.where(offsets >= 0, cumulative[np.clip(offsets, 0, None)], 0.0)
+
+    def forecast(self, horizon, noise_draws):
+        draws = self.point[:horizon] + self.residuals[noise_draws] @ self.impulse[:horizon, :horizon].T
+        return self.point[:horizon], draws
+
+
+class Forecaster:
+    def __init__(self, df, columns=None, year_column="Year", max_horizon=DEFAULT_MAX_HORIZON,
+                 n_boot=DEFAULT_BOOTSTRAP, seed=0):
+        df = df.sort_values(year_column)
+        self.years = df[year_column].to_numpy()
+        self.columns = [c for c in (columns or df.columns) if c != year_column]
+        self.max_horizon = max_horizon
+        self.origin = float(self.years[0])
+        self.scale = max(float(self.years[-1] - self.years[0]), 1.0)
+
+        n = len(self.years)
+        rng = np.random.default_rng(seed)
+        in_sample = rng.integers(0, n, size=(n_boot, n))
+        # Residual counts differ per model (AR loses p + 1 values), so noise is drawn as fractions
+        self._noise = rng.random((n_boot, max_horizon))
+
+        t = self._t(self.years)
+        self.fits = {}
+        for column in self.columns:
+            y = df[column].to_numpy(dtype="float64")
+            self.fits[(column, "linear")] = _BasisFit(lambda t: np.vander(t, 2, increasing=True), t, y, in_sample)
+            self.fits[(column, "polynomial")] = _BasisFit(
+                lambda t: np.vander(t, POLYNOMIAL_DEGREE + 1, increasing=True), t, y, in_sample)
+            self.fits[(column, "exponential")] = self._fit_exponential(t, y, in_sample)
+            self.fits[(column, "autoregressive")] = _AutoregressiveFit(y, AR_ORDER, max_horizon)
+
+    def _t(self, years):
+        return (np.asarray(years, dtype="float64") - self.origin) / self.scale
+
+    def _fit_exponential(self, t, y, in_sample):
+        # y ~ a + b * exp(r * year): linear in (a, b) for a fixed rate, so pick the rate by grid search.
+        # The exponential is anchored at the last year (t = 1) so it stays <= 1 however long the series
+        best = None
+        for rate in EXP_RATES * self.scale:
+            basis = np.column_stack([np.ones_like(t), np.exp(rate * (t - 1))])
+            coef, sse, *_ = np.linalg.lstsq(basis, y, rcond=None)
+            sse = float(sse[0]) if len(sse) else float(np.sum((basis @ coef - y) ** 2))
+            if best is None or sse < best[0]:
+                best = (sse, rate)
+        rate = best[1]
+        return _BasisFit(lambda t: np.column_stack([np.ones_like(t), np.exp(rate * (t - 1))]), t, y, in_sample)
+
+    def rmse(self, column, model):
+        return self.fits[(column, model)].rmse
+
+    def forecast(self, column, model, horizon, level=DEFAULT_LEVEL):
+        """Year, forecast and the lower/upper bounds of the ``level`` prediction interval."""
+        if not 1 <= horizon <= self.max_horizon:
+            raise ValueError(f"Horizon must be between 1 and {self.max_horizon} years")
+        fit = self.fits[(column, model)]
+        future_years = self.years[-1] + np.arange(1, horizon + 1)
+        noise_draws = (self._noise[:, :horizon] * len(fit.residuals)).astype(int)
+        if isinstance(fit, _AutoregressiveFit):
+            point, draws = fit.forecast(horizon, noise_draws)
+        else:
+            point, draws = fit.forecast(self._t(future_years), noise_draws)
+        lower, upper = np.quantile(draws, [(1 - level) / 2, (1 + level) / 2], axis=0)
+        return pd.DataFrame({"Year": future_years, "Forecast": point, "Lower": lower, "Upper": upper})
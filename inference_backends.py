@@ -0,0 +1,251 @@
+"""Pluggable backends for the summary and QA features.
+
+Every backend takes a task name and a Hugging Face style payload and returns
+a Future resolving to a Hugging Face style response, so app.py renders the
+results the same way whichever backend is configured:
+
+* ``remote`` sends requests to the Hugging Face inference API through the
+  pooled ``InferenceClient``;
+* ``local`` runs ``transformers`` pipelines on the CPU in this process, if
+  the package is installed, and falls back to ``extractive`` otherwise;
+* ``extractive`` is a dependency-free sentence scorer that works offline.
+
+Local backends micro-batch: requests arriving from many sessions within a
+few milliseconds of each other are grouped and run through the model in a
+single forward pass.
+"""
+import logging
+import queue
+import re
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+
+from response_cache import make_key
+
+logger = logging.getLogger(__name__)
+
+SUMMARIZATION = "summarization"
+QUESTION_ANSWERING = "question-answering"
+
+BACKENDS = ("remote", "local", "extractive")
+DEFAULT_SUMMARY_MODEL = "facebook/bart-large-cnn"
+DEFAULT_QA_MODEL = "deepset/roberta-base-squad2"
+
+_SENTENCE = re.compile(r"(?<=[.!?])\s+")
+# Prompt scaffolding the extractive summarizer must not echo back: directions to the model
+# ("Provide a concise summary ...") and section labels ("Context:", "Example data points (if available):")
+_INSTRUCTION = re.compile(r"^(provide|focus|summari[sz]e|mention|describe|write|give|explain|include|list|use)\b", re.I)
+_LABEL = re.compile(r"^[A-Z][A-Za-z ()]{0,40}:\s+")
+_WORD = re.compile(r"[a-z0-9₂]+(?:\.[0-9]+)?")
+STOPWORDS = frozenset(
+    "a an and are as at be by did do does for from had has have how in is it its of on or over "
+    "since than that the their there this to was were what when which who why will with".split()
+)
+
+
+def _content_words(text):
+    return [word for word in _WORD.findall(text.lower()) if word not in STOPWORDS]
+
+
+def _sentences(text):
+    return [s.strip() for s in _SENTENCE.split(" ".join(text.split())) if s.strip()]
+
+
+def _data_sentences(text):
+    """The sentences of a prompt that carry data: instructions dropped, labels stripped."""
+    sentences = [_LABEL.sub("", s) for s in _sentences(text) if not _INSTRUCTION.match(s)]
+    return [s for s in sentences if s] or _sentences(text)
+
+
+def _resolve(future, result=None, error=None):
+    # Only for futures marked running: those can no longer be cancelled, so this cannot race a cancel()
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+class MicroBatcher:
+    """Collects submitted items for up to ``max_wait`` seconds and runs them as one batch.
+
+    ``batch_fn`` receives a list of items and must return a list of results in
+    the same order. Items with different ``group`` keys (e.g. different
+    generation parameters) never share a batch.
+    """
+
+    def __init__(self, batch_fn, max_batch_size=8, max_wait=0.02, name="batcher"):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name=name, daemon=True)
+        self._worker.start()
+
+    def submit(self, item, group=None):
+        future = Future()
+        self._queue.put((item, group, future))
+        return future
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            groups = {}
+            for item, group, future in self._collect():
+                # False if the caller already cancelled it: skip the item. Once running, cancel() is refused
+                if future.set_running_or_notify_cancel():
+                    groups.setdefault(group, []).append((item, future))
+            for entries in groups.values():
+                try:
+                    results = list(self.batch_fn([item for item, _ in entries]))
+                    if len(results) != len(entries):
+                        # Results can no longer be matched to their items, so none of them is delivered
+                        raise RuntimeError(f"{self._worker.name} got {len(results)} results for {len(entries)} inputs")
+                except Exception as e:
+                    for _, future in entries:
+                        _resolve(future, error=e)
+                    continue
+                for (_, future), result in zip(entries, results):
+                    _resolve(future, result)
+
+
+class ExtractiveModels:
+    """Frequency-based sentence extraction; no model download, no network."""
+
+    name = "extractive"
+
+    def summarize(self, payloads):
+        results = []
+        for payload in payloads:
+            max_words = payload.get("parameters", {}).get("max_length", 150)
+            sentences = _data_sentences(payload["inputs"])
+            freq = Counter(_content_words(" ".join(sentences)))
+
+            def score(sentence):
+                words = _content_words(sentence)
+                return sum(freq[w] for w in words) / (len(words) or 1)
+
+            top = sorted(sorted(range(len(sentences)), key=lambda i: score(sentences[i]), reverse=True)[:3])
+            summary = " ".join(sentences[i] for i in top).split()[:max_words]
+            results.append([{"summary_text": " ".join(summary)}])
+        return results
+
+    def answer(self, payloads):
+        results = []
+        for payload in payloads:
+            question = set(_content_words(payload["question"]))
+            best, best_score = "", 0.0
+            for sentence in _sentences(payload["context"]):
+                overlap = len(question & set(_content_words(sentence)))
+                score = overlap / len(question) if question else 0.0
+                if score > best_score:
+                    best, best_score = sentence, score
+            results.append({"answer": best, "score": best_score} if best else {"score": 0.0})
+        return results
+
+
+class TransformersModels:
+    """CPU ``transformers`` pipelines, loaded lazily on first use."""
+
+    name = "local"
+
+    def __init__(self, summary_model=DEFAULT_SUMMARY_MODEL, qa_model=DEFAULT_QA_MODEL):
+        import transformers  # Optional dependency; create_backend() checks for it
+        self._transformers = transformers
+        self.summary_model = summary_model
+        self.qa_model = qa_model
+        self._pipelines = {}
+        self._lock = threading.Lock()
+
+    def _pipeline(self, task, model):
+        with self._lock:
+            if task not in self._pipelines:
+                self._pipelines[task] = self._transformers.pipeline(task, model=model, device=-1)
+            return self._pipelines[task]
+
+    def summarize(self, payloads):
+        summarizer = self._pipeline(SUMMARIZATION, self.summary_model)
+        params = payloads[0].get("parameters", {})  # Same for the whole batch, see LocalBackend.submit
+        outputs = summarizer([p["inputs"] for p in payloads], batch_size=len(payloads), truncation=True, **params)
+        return [[output] for output in outputs]
+
+    def answer(self, payloads):
+        answerer = self._pipeline(QUESTION_ANSWERING, self.qa_model)
+        outputs = answerer(
+            question=[p["question"] for p in payloads],
+            context=[p["context"] for p in payloads],
+            batch_size=len(payloads),
+        )
+        return outputs if isinstance(outputs, list) else [outputs]
+
+
+class RemoteBackend:
+    name = "remote"
+
+    def __init__(self, client, urls, api_key):
+        self.client = client
+        self.urls = urls
+        self.available = bool(api_key)
+
+    def submit(self, task, payload):
+        return self.client.submit(self.urls[task], payload)
+
+
+class LocalBackend:
+    available = True
+
+    def __init__(self, models, cache=None, max_batch_size=8, max_wait=0.02):
+        self.models = models
+        self.name = models.name
+        self.cache = cache
+        self._batchers = {
+            SUMMARIZATION: MicroBatcher(models.summarize, max_batch_size, max_wait, name="summary-batcher"),
+            QUESTION_ANSWERING: MicroBatcher(models.answer, max_batch_size, max_wait, name="qa-batcher"),
+        }
+
+    def submit(self, task, payload):
+        key = make_key(f"{self.name}:{task}", payload)
+        cached = self.cache.get(key) if self.cache is not None else None
+        if cached is not None:
+            future = Future()
+            future.set_result(cached)
+            return future
+
+        group = make_key(task, payload.get("parameters", {}))
+        future = self._batchers[task].submit(payload, group)
+        if self.cache is not None:
+            future.add_done_callback(lambda f: self._store(key, f))
+        return future
+
+    def _store(self, key, future):
+        if future.exception() is None:
+            self.cache.set(key, future.result())
+
+
+def create_backend(name, client=None, urls=None, api_key=None, cache=None, max_batch_size=8, max_wait=0.02,
+                   summary_model=DEFAULT_SUMMARY_MODEL, qa_model=DEFAULT_QA_MODEL):
+    """Builds the backend selected by ``name`` (one of ``BACKENDS``)."""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown inference backend {name!r}; expected one of {', '.join(BACKENDS)}")
+    if name == "remote":
+        return RemoteBackend(client, urls, api_key)
+    models = None
+    if name == "local":
+        try:
+            models = TransformersModels(summary_model, qa_model)
+        except ImportError:
+            logger.warning("transformers is not installed; using the extractive inference backend instead")
+    return LocalBackend(models or ExtractiveModels(), cache, max_batch_size, max_wait)
@@ -0,0 +1,147 @@
+"""Pooled, concurrent client for the Hugging Face inference API.
+
+All sessions in a Streamlit process share one client: a single
+``requests.Session`` keeps TLS connections alive, a small thread pool bounds
+how many requests run at once, and identical requests that are already in
+flight are coalesced onto the same future. Transient failures are retried
+with jittered exponential backoff, and the "model is loading" 503 (which
+carries an ``estimated_time``) waits for the model instead of failing.
+
+The client only needs URLs, so it can be pointed at a local stand-in server
+for tests and benchmarks.
+
+Every request is counted by where it was answered from (response cache,
+an in-flight duplicate, or the network) and every HTTP attempt is timed by
+outcome (status code, timeout or connection error) in the ``metrics``
+registry, labelled with the model.
+"""
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import Registry
+from response_cache import make_key
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def _model_of(url):
+    # Metric label: the model path after /models/, else the whole URL
+    return url.split("/models/", 1)[-1]
+
+
+class InferenceClient:
+    def __init__(self, api_key=None, max_concurrency=4, max_retries=3, backoff_base=0.5, backoff_cap=8.0,
+                 timeout=30, max_warmup_wait=30.0, cache=None, metrics=None):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.timeout = timeout
+        self.max_warmup_wait = max_warmup_wait
+        self.cache = cache
+        self.metrics = metrics if metrics is not None else Registry()
+        self.metrics.describe("inference_requests_total", "Inference requests by model and where they were answered from")
+        self.metrics.describe("inference_attempt_seconds", "HTTP attempts to the inference API by model and outcome")
+        self.metrics.describe("inference_request_seconds", "Inference requests over the network, retries included")
+
+        self.session = requests.Session()
+        if api_key:
+            self.session.headers["Authorization"] = f"Bearer {api_key}"
+        adapter = HTTPAdapter(pool_connections=max_concurrency, pool_maxsize=max_concurrency)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        # The pool size is the concurrency limit for the whole process
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="inference")
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def submit(self, url, payload):
+        """Starts (or joins) a request and returns a Future for its JSON response."""
+        key = make_key(url, payload)
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.metrics.counter("inference_requests_total", model=_model_of(url), source="cache").inc()
+                future = Future()
+                future.set_result(cached)
+                return future
+
+        with self._lock:
+            future = self._in_flight.get(key)
+            source = "coalesced" if future is not None else "network"
+            if future is None:
+                future = self._executor.submit(self._fetch, key, url, payload)
+                self._in_flight[key] = future
+        if source == "network":
+            # Outside the lock: a future that already finished runs the callback right here
+            future.add_done_callback(lambda done, key=key: self._forget(key, done))
+        self.metrics.counter("inference_requests_total", model=_model_of(url), source=source).inc()
+        return future
+
+    def post(self, url, payload):
+        """Blocking convenience wrapper around ``submit``."""
+        return self.submit(url, payload).result()
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
+
+    def _forget(self, key, future):
+        with self._lock:
+            # Only this request's entry; a newer one may have taken the key since
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+    def _backoff(self, attempt):
+        # "Full jitter": spreads retries from many sessions instead of synchronizing them
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+    def _fetch(self, key, url, payload):
+        with self.metrics.span("inference_request", model=_model_of(url)):
+            result = self._request(url, payload)
+        if self.cache is not None:
+            self.cache.set(key, result)
+        return result
+
+    def _request(self, url, payload):
+        model = _model_of(url)
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            start = time.perf_counter()
+            try:
+                response = self.session.post(url, json=payload, timeout=self.timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                outcome = "timeout" if isinstance(e, requests.exceptions.Timeout) else "connection_error"
+                self._record_attempt(model, outcome, start)
+                if last_attempt:
+                    raise
+                time.sleep(self._backoff(attempt))
+                continue
+
+            self._record_attempt(model, str(response.status_code), start)
+            if response.status_code not in RETRY_STATUSES or last_attempt:
+                response.raise_for_status() # Raise HTTPError for bad responses (4xx or 5xx)
+                return response.json()
+            time.sleep(self._retry_delay(response, attempt))
+
+    def _record_attempt(self, model, outcome, start):
+        self.metrics.histogram("inference_attempt_seconds", model=model, outcome=outcome).observe(time.perf_counter() - start)
+
+    def _retry_delay(self, response, attempt):
+        if response.status_code == 503:
+            # {"error": "Model ... is currently loading", "estimated_time": 20.0}
+            try:
+                estimated = float(response.json().get("estimated_time", 0))
+            except (ValueError, AttributeError):
+                estimated = 0
+            if estimated > 0:
+                return min(estimated, self.max_warmup_wait)
+        retry_after = response.headers.get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), self.backoff_cap)
+        return self._backoff(attempt)
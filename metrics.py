@@ -0,0 +1,283 @@
+"""Process-wide timing spans, counters and latency histograms.
+
+app.py wraps each section, cache fill and Hugging Face request in a span.
+``Registry`` keeps one counter or histogram per metric name and label set,
+in memory, shared by every session of the process. Values kept elsewhere
+(e.g. the response cache's counters in SQLite) are read at render time
+through ``add_collector``. There are two ways to read them:
+
+* ``serve(registry, port)`` answers ``GET /metrics`` in the Prometheus
+  text format, for scraping. Every worker process has its own registry,
+  so each binds its own port: the first free one of ``port`` ..
+  ``port + ports - 1``. It listens on localhost unless told otherwise;
+* ``JsonLogSink`` writes one JSON line per finished span, for log
+  pipelines.
+
+``FlameProfiler`` samples one thread's call stack and writes folded stacks
+(``outer;inner;innermost <samples>``), which flamegraph.pl and speedscope
+render as a flame graph. app.py uses it to profile a single rerun on
+request.
+"""
+import bisect
+import collections
+import contextlib
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PREFIX = "climatecanvas_"
+# Upper bounds in seconds, from a cached figure lookup up to a cold model on the inference API
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def samples(self):
+        return [("", (), self.value)]
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # The last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def samples(self):
+        with self._lock:
+            counts, total, count = list(self.counts), self.sum, self.count
+        cumulative = 0
+        samples = []
+        for bound, n in zip(self.buckets + (float("inf"),), counts):
+            cumulative += n
+            samples.append(("_bucket", (("le", _number(bound)),), cumulative))
+        return samples + [("_sum", (), total), ("_count", (), count)]
+
+
+class _Collected:
+    # One sample returned by a collector, rendered like a metric of the registry's own
+    def __init__(self, kind, value):
+        self.kind = kind
+        self.value = value
+
+    def samples(self):
+        return [("", (), self.value)]
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _labels(pairs):
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+class Registry:
+    def __init__(self, prefix=PREFIX):
+        self.prefix = prefix
+        self._families = {}  # name -> (kind, {sorted label pairs: metric})
+        self._help = {}
+        self._sinks = []
+        self._collectors = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _get(self, cls, name, labels, **kwargs):
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        with self._lock:
+            kind, series = self._families.setdefault(name, (cls.kind, {}))
+            if kind != cls.kind:
+                raise ValueError(f"Metric {name!r} is a {kind}, not a {cls.kind}")
+            metric = series.get(key)
+            if metric is None:
+                metric = series[key] = cls(**kwargs)
+        return metric
+
+    def counter(self, name, **labels):
+        return self._get(Counter, name, labels)
+
+    def histogram(self, name, buckets=DEFAULT_BUCKETS, **labels):
+        return self._get(Histogram, name, labels, buckets=buckets)
+
+    def describe(self, name, text):
+        """HELP text for ``name`` in the Prometheus output."""
+        self._help[name] = text
+
+    def add_collector(self, collect):
+        """``collect()`` is called on every render and returns ``(name, kind, labels, value)`` samples."""
+        self._collectors.append(collect)
+
+    def add_sink(self, sink):
+        """``sink(event)`` is called with a dict for every finished span."""
+        self._sinks.append(sink)
+
+    @contextlib.contextmanager
+    def span(self, name, **labels):
+        """Times the block into the ``<name>_seconds`` histogram; failures also count in ``<name>_errors_total``."""
+        stack = self._local.__dict__.setdefault("stack", [])
+        parent = stack[-1] if stack else None
+        stack.append(name)
+        error = None
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception as e:  # Not BaseException: Streamlit's rerun/stop signals are not failures
+            error = type(e).__name__
+            raise
+        finally:
+            seconds = time.perf_counter() - start
+            stack.pop()
+            self.histogram(f"{name}_seconds", **labels).observe(seconds)
+            if error is not None:
+                self.counter(f"{name}_errors_total", error=error, **labels).inc()
+            if self._sinks:
+                event = {"span": name, **labels, "ms": round(seconds * 1000, 3), "parent": parent, "error": error}
+                for sink in self._sinks:
+                    sink(event)
+
+    def timed(self, name, **labels):
+        """Decorator form of ``span``."""
+        def decorate(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(name, **labels):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def render(self):
+        """Every metric in the Prometheus text exposition format."""
+        with self._lock:
+            families = {name: (kind, dict(series)) for name, (kind, series) in self._families.items()}
+        for collect in list(self._collectors):
+            try:
+                samples = collect()
+            except Exception:
+                continue  # A failing source must not break the scrape of everything else
+            for name, kind, labels, value in samples:
+                key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+                families.setdefault(name, (kind, {}))[1][key] = _Collected(kind, value)
+        lines = []
+        for name, (kind, series) in sorted(families.items()):
+            full = self.prefix + name
+            if name in self._help:
+                lines.append(f"# HELP {full} {self._help[name]}")
+            lines.append(f"# TYPE {full} {kind}")
+            for labels, metric in sorted(series.items()):
+                for suffix, extra, value in metric.samples():
+                    lines.append(f"{full}{suffix}{_labels(labels + extra)} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+class JsonLogSink:
+    """Writes each finished span to ``logger`` as one JSON line."""
+
+    def __init__(self, logger):
+        self.logger = logger
+
+    def __call__(self, event):
+        self.logger.info(json.dumps(event, ensure_ascii=False))
+
+
+def serve(registry, port, host="127.0.0.1", ports=1):
+    """Starts a background HTTP server answering ``GET /metrics``; returns it (``shutdown()`` stops it).
+
+    Binds the first free port of ``port`` .. ``port + ports - 1`` (``server.server_port``
+    says which) and raises ``OSError`` when all of them are taken.
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # One line per scrape would drown the app's log
+
+    last = port + max(ports, 1) - 1
+    for candidate in range(port, last + 1):
+        try:
+            server = ThreadingHTTPServer((host, candidate), Handler)
+            break
+        except OSError:
+            if candidate == last:  # Every port in the range is taken
+                raise
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-endpoint", daemon=True).start()
+    return server
+
+
+class FlameProfiler:
+    """Samples a thread's call stack every ``interval`` seconds into folded stacks."""
+
+    def __init__(self, thread_id=None, interval=0.005, max_seconds=300):
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.interval = interval
+        self.max_seconds = max_seconds  # Stops on its own if the run it profiles never reaches stop()
+        self.stacks = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="flame-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        deadline = time.monotonic() + self.max_seconds
+        while not self._stop.wait(self.interval) and time.monotonic() < deadline:
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                return
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                # Function and where it is defined, so every line of a function folds into one frame
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+
+    def write(self, path):
+        """Writes the folded stacks to ``path``; returns the number of samples."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        return sum(self.stacks.values())
@@ -0,0 +1,195 @@
+"""Answers common numeric questions straight from the climate DataFrame.
+
+Section 4 used to send every question to a remote extractive QA model that
+only ever saw a min/max summary of the data. Most questions are really
+lookups ("CO2 level in 2010?", "did sea level rise faster after 1980?"),
+so ``QueryPlanner`` recognises a handful of intents with regular
+expressions and answers them from indexes built once per dataset (a
+year-position map plus the range statistics in range_stats.py):
+
+* value of an indicator in a year;
+* change of an indicator between two years, or since / before one year;
+* rate (linear trend) before versus after a year;
+* trend over a year range, or since / before one year;
+* year of the highest / lowest value, optionally within a year range or
+  before / after one year.
+
+Anything it does not recognise returns None and goes to the model, and so
+do open-ended questions ("why ...", "what caused ...", "explain ...") and
+comparisons of several ranges (more than two years) even when they
+mention an indicator.
+"""
+import re
+
+import numpy as np
+
+from range_stats import RangeIndex
+
+# Indicator column -> (keywords, unit, number format)
+INDICATORS = {
+    "Temperature Anomaly (°C)": (("temperature", "temp", "anomaly", "anomalies", "warming", "warm"), "°C", "{:.2f}"),
+    "CO2 Levels (ppm)": (("co2", "co₂", "carbon", "ppm"), "ppm", "{:.0f}"),
+    "Sea Level Rise (mm)": (("sea level", "sea-level", "sea", "ocean"), "mm", "{:.1f}"),
+}
+LABELS = {
+    "Temperature Anomaly (°C)": "the global temperature anomaly",
+    "CO2 Levels (ppm)": "the atmospheric CO₂ level",
+    "Sea Level Rise (mm)": "cumulative sea level rise",
+}
+
+_YEAR = re.compile(r"\b(1[5-9]\d\d|2[01]\d\d)\b")
+_MAX = re.compile(r"\b(highest|maximum|max|peak|peaked|warmest|hottest|largest|biggest|most)\b")
+_MIN = re.compile(r"\b(lowest|minimum|min|coolest|coldest|smallest|least)\b")
+_RATE = re.compile(r"\b(faster|slower|rate|quick(er|ly)?|speed|accelerat\w*|decelerat\w*)\b")
+_TREND = re.compile(r"\btrend(s|ed|ing)?\b")
+_BEFORE_AFTER = re.compile(r"\b(before|after|since|from|prior to)\s+(?:the\s+year\s+)?(1[5-9]\d\d|2[01]\d\d)\b")
+_CHANGE = re.compile(r"\b(change[ds]?|increase[ds]?|decrease[ds]?|rise|rose|risen|grow|grew|grown|fall|fell|drop(ped)?|"
+                     r"differ\w*|between|from)\b")
+_OPEN_ENDED = re.compile(r"^\s*(why|how come)\b|\bexplain\w*\b|\breasons?\b|"
+                         r"\bwhat\s+(caused?|causes|causing|drives?|drove|driving|explains?|made)\b")
+# Plurals and inflections of a keyword ("temperatures", "oceans", "warmer", "warming")
+_INFLECTION = r"(?:s|es|ed|er|est|ing)?"
+
+def _sentence_case(text):
+    # str.capitalize() would also lowercase "CO₂"
+    return text[:1].upper() + text[1:]
+
+
+class QueryPlanner:
+    def __init__(self, df, range_index=None):
+        self.ranges = range_index or RangeIndex(df, [c for c in INDICATORS if c in df.columns])
+        self.years = self.ranges.years
+        self.values = {col: self.ranges.df[col].to_numpy(dtype="float64") for col in INDICATORS if col in df.columns}
+        self._position = {int(year): i for i, year in enumerate(self.years)}
+
+    # --- Parsing ---
+
+    def _indicator(self, question):
+        for column in self.values:
+            keywords = INDICATORS[column][0]
+            if any(re.search(rf"\b{re.escape(k)}{_INFLECTION}\b", question) for k in keywords):
+                return column
+        return None
+
+    def answer(self, question):
+        """Returns an HF-style answer dict, or None if the question needs the model."""
+        q = question.lower()
+        if _OPEN_ENDED.search(q):
+            return None
+        column = self._indicator(q)
+        if column is None or not len(self.years):
+            return None
+        years = [int(y) for y in _YEAR.findall(q)]
+        if len(years) > 2:
+            # "more between 1950 and 1980 or between 1990 and 2020?" compares ranges; leave it to the model
+            return None
+
+        split = _BEFORE_AFTER.search(q)
+        if _RATE.search(q) and split and split.group(1) != "from":
+            return self.rate_before_after(column, int(split.group(2)))
+        if (_MAX.search(q) or _MIN.search(q)) and re.search(r"\b(year|when)\b", q):
+            if len(years) == 2:
+                start, end = min(years), max(years)
+            elif split:
+                start, end = self._open_range(split)
+            else:
+                start, end = None, None
+            return self.extreme_year(column, highest=bool(_MAX.search(q)), start=start, end=end)
+        if _TREND.search(q) and (len(years) != 1 or split):
+            start, end = (min(years), max(years)) if len(years) == 2 else self._open_range(split)
+            return self.trend_between(column, start, end)
+        if len(years) == 2 and _CHANGE.search(q):
+            return self.change_between(column, years[0], years[1])
+        if len(years) == 1 and split and _CHANGE.search(q):
+            # "since 1950" runs to the last year of data, "before 1950" from the first
+            year = int(split.group(2))
+            if split.group(1) in ("before", "prior to"):
+                return self.change_between(column, int(self.years[0]), year)
+            return self.change_between(column, year, int(self.years[-1]))
+        if len(years) == 1:
+            return self.value_in_year(column, years[0])
+        return None
+
+    def _open_range(self, split):
+        # "before 1950" -> first year..1949, "after/since/from 1950" -> 1950..last year; no split -> everything
+        first, last = int(self.years[0]), int(self.years[-1])
+        if split is None:
+            return first, last
+        year = int(split.group(2))
+        if split.group(1) in ("before", "prior to"):
+            return first, year - 1
+        return year, last
+
+    # --- Intents ---
+
+    def _fmt(self, column, value):
+        return f"{INDICATORS[column][2].format(value)} {INDICATORS[column][1]}"
+
+    def _result(self, text):
+        return {"answer": text, "score": 1.0, "source": "data"}
+
+    def _out_of_range(self, year):
+        return self._result(f"The dataset covers {self.years[0]} to {self.years[-1]}; there is no data for {year}.")
+
+    def value_in_year(self, column, year):
+        if year not in self._position:
+            return self._out_of_range(year)
+        value = self.values[column][self._position[year]]
+        return self._result(f"In {year}, {LABELS[column]} was {self._fmt(column, value)}.")
+
+    def change_between(self, column, start, end):
+        for year in (start, end):
+            if year not in self._position:
+                return self._out_of_range(year)
+        a, b = self.values[column][self._position[start]], self.values[column][self._position[end]]
+        direction = "rose" if b > a else ("fell" if b < a else "was unchanged")
+        return self._result(
+            f"Between {start} and {end}, {LABELS[column]} {direction} from {self._fmt(column, a)} to "
+            f"{self._fmt(column, b)} (a change of {'+' if b >= a else '-'}{self._fmt(column, abs(b - a))})."
+        )
+
+    def rate_before_after(self, column, year):
+        before = self.ranges.stats(column, self.years[0], year - 1)
+        after = self.ranges.stats(column, year, self.years[-1])
+        before = before and before["slope"]
+        after = after and after["slope"]
+        if before is None or after is None:
+            return self._result(
+                f"There is not enough data on both sides of {year} to compare rates "
+                f"(the dataset covers {self.years[0]} to {self.years[-1]})."
+            )
+        unit = INDICATORS[column][1]
+        label = _sentence_case(LABELS[column])
+        if np.isclose(after, before):
+            return self._result(f"{label} changed at about {after:.2f} {unit}/year both before and after {year}.")
+        return self._result(
+            f"{label} changed by about {after:.2f} {unit}/year from {year} to {self.years[-1]}, "
+            f"versus {before:.2f} {unit}/year from {self.years[0]} to {year - 1}: "
+            f"{'faster' if after > before else 'slower'} after {year}."
+        )
+
+    def trend_between(self, column, start, end):
+        stats = self.ranges.stats(column, start, end)
+        if stats is None or stats["slope"] is None:
+            return self._result(
+                f"There is not enough data between {start} and {end} for a trend "
+                f"(the dataset covers {self.years[0]} to {self.years[-1]})."
+            )
+        unit = INDICATORS[column][1]
+        return self._result(
+            f"From {stats['start_year']} to {stats['end_year']}, {LABELS[column]} changed by about "
+            f"{stats['slope']:+.2f} {unit}/year, from {self._fmt(column, stats['first'])} to "
+            f"{self._fmt(column, stats['last'])}."
+        )
+
+    def extreme_year(self, column, highest=True, start=None, end=None):
+        stats = self.ranges.stats(column, self.years[0] if start is None else start,
+                                  self.years[-1] if end is None else end)
+        if stats is None:
+            return self._result(f"The dataset covers {self.years[0]} to {self.years[-1]}; there is no data in that range.")
+        key = "max" if highest else "min"
+        span = "" if start is None else f" between {start} and {end}"
+        return self._result(
+            f"{_sentence_case(LABELS[column])} was {'highest' if highest else 'lowest'}{span} in {stats[key + '_year']}, "
+            f"at {self._fmt(column, stats[key])}."
+        )
@@ -0,0 +1,98 @@
+"""Constant-time summary statistics over year ranges.
+
+The Section 1 slider, the summary prompt and the query planner all ask the
+same kind of question: "for years in [start, end], what are the first/last
+values, the mean, the extremes and the trend?". Scanning the DataFrame with
+a boolean mask answers that in O(n) per interaction. ``RangeIndex`` is
+built once per dataset and answers it with
+
+* a binary search over the sorted years to find the row range, O(log n);
+* prefix sums of y, x, x*x and x*y for the mean and least-squares slope, O(1);
+* sparse tables of argmin/argmax positions for the extremes, O(1)
+  (n log n int32 positions per indicator).
+
+Slices are returned as ``iloc`` views of the sorted frame, so no mask and
+no copy are needed either. Indicator columns are assumed to have no NaNs.
+"""
+import numpy as np
+
+
+def _sparse_table(values, better):
+    # levels[k][i] is the position of the best value in values[i:i + 2**k]
+    n = len(values)
+    levels = [np.arange(n, dtype=np.int32)]
+    k = 1
+    while (1 << k) <= n:
+        prev, half, width = levels[-1], 1 << (k - 1), n - (1 << k) + 1
+        left, right = prev[:width], prev[half:half + width]
+        levels.append(np.where(better(values[right], values[left]), right, left))
+        k += 1
+    return levels
+
+
+class RangeIndex:
+    def __init__(self, df, columns=None, year_column="Year"):
+        self.df = df.sort_values(year_column, kind="stable").reset_index(drop=True)
+        self.year_column = year_column
+        self.years = self.df[year_column].to_numpy()
+        self.columns = [c for c in (columns or df.columns) if c != year_column]
+
+        # Centre x on the first year so the prefix sums keep their precision
+        x = self.years.astype("float64") - (float(self.years[0]) if len(self.years) else 0.0)
+        zero = np.zeros(1)
+        self._sx = np.concatenate([zero, np.cumsum(x)])
+        self._sxx = np.concatenate([zero, np.cumsum(x * x)])
+        self._values, self._sy, self._sxy, self._argmin, self._argmax = {}, {}, {}, {}, {}
+        for column in self.columns:
+            y = self.df[column].to_numpy(dtype="float64")
+            self._values[column] = y
+            self._sy[column] = np.concatenate([zero, np.cumsum(y)])
+            self._sxy[column] = np.concatenate([zero, np.cumsum(x * y)])
+            self._argmin[column] = _sparse_table(y, np.less)
+            self._argmax[column] = _sparse_table(y, np.greater)
+
+    def bounds(self, start, end):
+        """Row range [lo, hi) of the sorted frame covering start <= year <= end."""
+        lo = int(np.searchsorted(self.years, start, side="left"))
+        hi = int(np.searchsorted(self.years, end, side="right"))
+        return lo, max(lo, hi)
+
+    def slice(self, start, end):
+        lo, hi = self.bounds(start, end)
+        return self.df.iloc[lo:hi]
+
+    def _best(self, table, values, lo, hi, better):
+        k = (hi - lo).bit_length() - 1
+        a, b = table[k][lo], table[k][hi - (1 << k)]
+        return int(b if better(values[b], values[a]) else a)
+
+    def stats(self, column, start, end):
+        """Count, first/last, mean, min/max (with their years) and slope per year over [start, end].
+
+        Returns None when no rows fall in the range; the slope is None for fewer than two rows.
+        """
+        lo, hi = self.bounds(start, end)
+        n = hi - lo
+        if n == 0:
+            return None
+        y = self._values[column]
+        sy = self._sy[column][hi] - self._sy[column][lo]
+        sx = self._sx[hi] - self._sx[lo]
+        sxx = self._sxx[hi] - self._sxx[lo]
+        sxy = self._sxy[column][hi] - self._sxy[column][lo]
+        denominator = n * sxx - sx * sx
+        i_min = self._best(self._argmin[column], y, lo, hi, np.less)
+        i_max = self._best(self._argmax[column], y, lo, hi, np.greater)
+        return {
+            "count": n,
+            "start_year": self.years[lo],
+            "end_year": self.years[hi - 1],
+            "first": float(y[lo]),
+            "last": float(y[hi - 1]),
+            "mean": sy / n,
+            "min": float(y[i_min]),
+            "min_year": self.years[i_min],
+            "max": float(y[i_max]),
+            "max_year": self.years[i_max],
+            "slope": (n * sxy - sx * sy) / denominator if n > 1 and denominator > 0 else None,
+        }
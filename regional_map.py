@@ -0,0 +1,243 @@
+"""Regional anomaly choropleth for Section 2.
+
+Building the folium map means serializing every country polygon to GeoJSON,
+which is by far the most expensive thing a rerun does. The helpers here build
+the map once from a slimmed-down GeoDataFrame and return the rendered HTML so
+app.py can cache it per geodata version and reuse it across reruns and
+sessions.
+
+Below the "full" level of detail the polygons are sent as simplified,
+quantized TopoJSON (see topology.py) instead of GeoJSON.
+
+With a countries x years anomaly matrix (see anomaly_timeline.py) the map
+also gets a year slider and play button. All frames travel inside the page
+as one byte per country-year, and moving through time only restyles the
+existing layer in the browser: no rerun and no geometry is resent.
+"""
+import copy
+import hashlib
+import time
+
+import branca.colormap as cm
+import folium
+import numpy as np
+from branca.element import MacroElement
+from jinja2 import Template
+
+from anomaly_timeline import MISSING, encode_frames
+from climate_data import anomaly_source
+from topology import DEFAULT_LOD, build_lod_variants
+
+VALUE_COLUMN = "Temp Anomaly"
+MAP_HEIGHT = 500
+
+TOOLTIP_STYLE = ("background-color: white; color: black; font-family: Arial; "
+                 "font-size: 12px; padding: 5px; border-radius: 3px; box-shadow: 1px 1px 3px grey;")
+HIGHLIGHT_STYLE = {"weight": 3, "fillOpacity": 0.9}
+# Legend and tooltip wording per anomaly source (see climate_data.anomaly_source)
+SOURCE_LABELS = {
+    "simulated": {"legend": "Simulated Temperature Anomaly (°C)", "tooltip": "Simulated Anomaly (°C):"},
+    "gridded": {"legend": "Temperature Anomaly (°C), area-weighted from gridded data", "tooltip": "Anomaly (°C):"},
+}
+
+
+def geodata_version(world, value_column=VALUE_COLUMN):
+    # Fingerprint of everything that ends up in the map: geometry, names and values
+    digest = hashlib.sha1()
+    digest.update(b"".join(world.geometry.to_wkb()))
+    digest.update("\x1f".join(world["name"].astype(str)).encode("utf-8"))
+    digest.update(np.ascontiguousarray(world[value_column].to_numpy(dtype="float64")).tobytes())
+    return digest.hexdigest()
+
+
+def slim_geodata(world, value_column=VALUE_COLUMN):
+    # Only ship the columns the map actually uses; the Natural Earth shapefile has ~170 attributes.
+    # "fid" is the row number, which the timeline uses to find a feature's values.
+    return world[["name", value_column, "geometry"]].assign(fid=np.arange(len(world)))
+
+
+class HoverHighlight(MacroElement):
+    """Hover highlight for a ``folium.TopoJson`` layer, which has no ``highlight_function``."""
+
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        (function() {
+            var layer = {{ this.layer.get_name() }};
+            layer.eachLayer(function(l) {
+                l.on("mouseover", function() { l.setStyle({{ this.style|tojson }}); });
+                l.on("mouseout", function() {
+                    // TopoJson keeps each feature's style in its properties; the timeline swaps in options.style
+                    var style = layer.options.style;
+                    l.setStyle(typeof style === "function" ? style(l.feature) : l.feature.properties.style);
+                });
+            });
+        })();
+        {% endmacro %}
+    """)
+
+    def __init__(self, layer, style=HIGHLIGHT_STYLE):
+        super().__init__()
+        self._name = "HoverHighlight"
+        self.layer = layer
+        self.style = style
+
+
+class TimelineControl(MacroElement):
+    """Year slider and play button that restyle ``layer`` from pre-encoded frames."""
+
+    _template = Template("""
+        {% macro html(this, kwargs) %}
+        <div id="{{ this.get_name() }}" style="position: absolute; bottom: 24px; left: 12px; z-index: 1000;
+             background: white; padding: 6px 10px; border-radius: 4px; font: 12px Arial, sans-serif;
+             box-shadow: 0 1px 4px rgba(0, 0, 0, 0.3);">
+            <button type="button" style="width: 28px;">&#9654;</button>
+            <input type="range" min="0" max="{{ this.years|length - 1 }}" value="{{ this.years|length - 1 }}"
+                   style="width: 220px; vertical-align: middle;">
+            <strong>{{ this.years[-1] }}</strong>
+        </div>
+        {% endmacro %}
+
+        {% macro script(this, kwargs) %}
+        (function() {
+            var years = {{ this.years|tojson }};
+            var count = {{ this.count }};
+            var frames = Uint8Array.from(atob({{ this.frames|tojson }}), function(c) { return c.charCodeAt(0); });
+            var lut = {{ this.lut|tojson }};
+            var layer = {{ this.layer.get_name() }};
+            var box = document.getElementById({{ this.get_name()|tojson }});
+            var button = box.querySelector("button"), slider = box.querySelector("input"), label = box.querySelector("strong");
+            var current = years.length - 1, timer = null;
+            L.DomEvent.disableClickPropagation(box);
+
+            // Wrap the layer's own style so hover resets keep the current year's colour
+            var baseStyle = layer.options.style;
+            layer.options.style = function(feature) {
+                var style = typeof baseStyle === "function" ? baseStyle(feature) : (baseStyle || feature.properties.style || {});
+                var q = frames[current * count + feature.properties.fid];
+                return Object.assign({}, style, {fillColor: q === {{ this.missing }} ? "lightgrey" : lut[q]});
+            };
+
+            function show(t) {
+                current = t;
+                label.textContent = years[t];
+                layer.eachLayer(function(l) {
+                    var q = frames[t * count + l.feature.properties.fid];
+                    l.feature.properties[{{ this.value_column|tojson }}] =
+                        q === {{ this.missing }} ? null : Math.round(({{ this.vmin }} + q * {{ this.step }}) * 100) / 100;
+                });
+                layer.setStyle(layer.options.style);
+            }
+            function stop() {
+                clearInterval(timer);
+                timer = null;
+                button.innerHTML = "&#9654;";
+            }
+
+            slider.addEventListener("input", function() { stop(); show(+slider.value); });
+            button.addEventListener("click", function() {
+                if (timer) { stop(); return; }
+                if (current >= years.length - 1) { show(0); slider.value = 0; }
+                button.innerHTML = "&#10074;&#10074;";
+                timer = setInterval(function() {
+                    if (current >= years.length - 1) { stop(); return; }
+                    slider.value = current + 1;
+                    show(current + 1);
+                }, {{ this.interval }});
+            });
+        })();
+        {% endmacro %}
+    """)
+
+    def __init__(self, layer, years, matrix, colormap, value_column=VALUE_COLUMN, interval=150):
+        super().__init__()
+        self._name = "TimelineControl"
+        self.layer = layer
+        self.years = [int(y) for y in years]
+        self.count = matrix.shape[0]
+        self.vmin = float(colormap.vmin)
+        self.frames, self.step = encode_frames(matrix, colormap.vmin, colormap.vmax)
+        self.lut = [colormap(colormap.vmin + i * self.step) for i in range(MISSING)]
+        self.missing = MISSING
+        self.value_column = value_column
+        self.interval = interval
+
+
+def build_choropleth_map(world, value_column=VALUE_COLUMN, source="simulated", topology=None, timeline=None):
+    m = folium.Map(location=[20, 0], zoom_start=2, tiles='CartoDB positron', attr='CartoDB Positron')
+
+    # With a timeline the colour scale spans every year, so frames are comparable
+    values = world[value_column].dropna() if timeline is None else timeline[1][~np.isnan(timeline[1])]
+    vmin, vmax = (float(values.min()), float(values.max())) if len(values) else (0.0, 1.0)
+    colormap = cm.linear.YlOrRd_09.scale(vmin, vmax)
+    colormap.caption = SOURCE_LABELS[source]["legend"]
+
+    def style_function(feature):
+        value = feature["properties"].get(value_column)
+        return {
+            "fillColor": colormap(value) if value is not None and not np.isnan(value) else "lightgrey",
+            "color": "black",
+            "weight": 1,
+            "opacity": 0.3,
+            "fillOpacity": 0.7,
+        }
+
+    tooltip = folium.features.GeoJsonTooltip(
+        fields=['name', value_column],
+        aliases=['Country:', SOURCE_LABELS[source]["tooltip"]],
+        sticky=False,
+        style=TOOLTIP_STYLE,
+    )
+    if topology is not None:
+        # TopoJson writes styles into the topology it is given, so hand it a private copy
+        layer = folium.TopoJson(
+            copy.deepcopy(topology),
+            object_path="objects.countries",
+            name="choropleth",
+            style_function=style_function,
+            tooltip=tooltip,
+        ).add_to(m)
+        m.add_child(HoverHighlight(layer))
+    else:
+        # One layer does fill, highlight and tooltip, so the geometry is serialized only once
+        layer = folium.GeoJson(
+            slim_geodata(world, value_column),
+            name="choropleth",
+            style_function=style_function,
+            highlight_function=lambda x: HIGHLIGHT_STYLE,
+            tooltip=tooltip,
+        ).add_to(m)
+    colormap.add_to(m)
+    if timeline is not None:
+        m.add_child(TimelineControl(layer, timeline[0], timeline[1], colormap, value_column))
+
+    folium.LayerControl().add_to(m)
+    return m
+
+
+def render_map_html(m):
+    # Same wrapping streamlit_folium.folium_static does, minus re-rendering on every call
+    return folium.Figure().add_child(m).render()
+
+
+def build_map_artifact(world, detail=DEFAULT_LOD, value_column=VALUE_COLUMN, timeline=None):
+    """Renders the map at one level of detail and reports what it cost.
+
+    ``timeline`` is an optional ``(years, matrix)`` pair with one matrix row
+    per row of ``world``; it adds the year slider. The legend and tooltip
+    name the anomaly source of ``world`` (simulated or gridded).
+
+    Returns ``(html, stats)`` where ``stats`` holds the geometry payload size,
+    the size of the equivalent full-precision GeoJSON, the fraction saved, the
+    TopoJSON encoding time, the total build-and-render time in milliseconds
+    and the map height in pixels.
+    """
+    start = time.perf_counter()
+    source = anomaly_source(world)
+    world = world.assign(fid=np.arange(len(world)))
+    variant = build_lod_variants(world, ["name", value_column, "fid"], levels=[detail])[detail]
+    html = render_map_html(build_choropleth_map(world, value_column, source, variant["topology"], timeline))
+    stats = {key: value for key, value in variant.items() if key != "topology"}
+    stats["render_ms"] = (time.perf_counter() - start) * 1000
+    stats["html_bytes"] = len(html.encode("utf-8"))
+    stats["height"] = MAP_HEIGHT
+    return html, stats
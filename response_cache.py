@@ -0,0 +1,149 @@
+"""Disk-backed cache for Hugging Face inference responses.
+
+Summaries and QA answers only depend on the request payload, so identical
+requests are answered from a small SQLite database instead of the network.
+SQLite gives us a cache that every Streamlit worker process on the machine
+can share, with entries expiring after a TTL and the least recently used
+entries evicted once the cache grows past ``max_entries``.
+"""
+import contextlib
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+
+DEFAULT_PATH = os.path.join(".cache", "responses.sqlite3")
+DEFAULT_TTL = 7 * 24 * 3600  # One week
+DEFAULT_MAX_ENTRIES = 5000
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _normalize(value):
+    # Prompts are built from indented f-strings; layout changes should not change the key
+    if isinstance(value, str):
+        return _WHITESPACE.sub(" ", value).strip()
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+
+def make_key(url, payload):
+    """Stable hash of an endpoint and its (normalized) JSON payload."""
+    blob = json.dumps({"url": url, "payload": _normalize(payload)}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, path=DEFAULT_PATH, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+                " created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+            conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+
+    def _connect(self):
+        # One short-lived connection per call keeps this safe across Streamlit's script threads
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return contextlib.closing(conn)
+
+    @staticmethod
+    def _bump(conn, name, amount=1):
+        conn.execute(
+            "INSERT INTO counters (name, value) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            (name, amount),
+        )
+
+    def get(self, key):
+        """Returns the cached response for ``key``, or None on a miss or expired entry."""
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                if row is not None:
+                    conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._bump(conn, "misses")
+                return None
+            conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self._bump(conn, "hits")
+            return json.loads(row[0])
+
+    def set(self, key, value):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value), now, now),
+                )
+                conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+                # Least recently used entries go first once we are over the size bound
+                evicted = conn.execute(
+                    "DELETE FROM responses WHERE key IN ("
+                    " SELECT key FROM responses ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                ).rowcount
+                if evicted:
+                    self._bump(conn, "evictions", evicted)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def get_or_fetch(self, url, payload, fetch):
+        """Returns ``(response, cached)``; ``fetch()`` is only called on a miss."""
+        key = make_key(url, payload)
+        value = self.get(key)
+        if value is not None:
+            return value, True
+        value = fetch()
+        self.set(key, value)
+        return value, False
+
+    def stats(self):
+        with self._connect() as conn:
+            counters = dict(conn.execute("SELECT name, value FROM counters").fetchall())
+            entries = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        hits, misses = counters.get("hits", 0), counters.get("misses", 0)
+        return {
+            "hits": hits,
+            "misses": misses,
+            "evictions": counters.get("evictions", 0),
+            "entries": entries,
+            "hit_ratio": hits / (hits + misses) if hits + misses else 0.0,
+        }
+
+    def metric_samples(self):
+        """``stats()`` as samples for ``metrics.Registry.add_collector``.
+
+        The counters live in the database, so they cover every process sharing it.
+        """
+        stats = self.stats()
+        return [
+            ("response_cache_hits_total", "counter", {}, stats["hits"]),
+            ("response_cache_misses_total", "counter", {}, stats["misses"]),
+            ("response_cache_evictions_total", "counter", {}, stats["evictions"]),
+            ("response_cache_entries", "gauge", {}, stats["entries"]),
+        ]
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM responses")
+            conn.execute("DELETE FROM counters")
+
@@ -0,0 +1,214 @@
+"""Monte Carlo emission scenarios: CO₂ → temperature → sea level fans.
+
+Each ensemble member samples its own pathway and physical responses:
+
+* CO₂ grows by the current annual increase, scaled each year by the
+  pathway's growth rate (plus per-member rate uncertainty and yearly noise);
+* temperature responds with a transient sensitivity per doubling of CO₂
+  (lognormal around ``TCR_MEDIAN``) plus AR(1) year-to-year variability;
+* sea level rises at the current rate plus a semi-empirical term
+  proportional to the warming since the last observed year (``SEA_RATE_MEDIAN``
+  mm/yr per °C, lognormal).
+
+Members are simulated as (members, years) arrays, ``chunk_size`` at a time,
+and folded into ``QuantileSketch`` histograms, so memory depends on the
+chunk size and not on the ensemble size. Sketches from different chunks
+just add up, so large ensembles can be split across a process pool and
+merged; each chunk has its own seed, so the result does not depend on the
+number of workers. A long-lived process (the app) keeps one ``make_pool``
+pool and passes it to every ``run_ensemble`` call instead of starting
+workers per run.
+"""
+import contextlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import numpy as np
+import pandas as pd
+
+CO2 = "CO2 Levels (ppm)"
+TEMPERATURE = "Temperature Anomaly (°C)"
+SEA_LEVEL = "Sea Level Rise (mm)"
+INDICATORS = (CO2, TEMPERATURE, SEA_LEVEL)
+
+# Yearly change in the annual CO₂ increase, e.g. -0.04 shrinks it by 4% a year
+PATHWAYS = {
+    "Rapid decline": -0.04,
+    "Stabilising": -0.01,
+    "Current trend": 0.0,
+    "High emissions": 0.015,
+}
+PATHWAY_SPREAD = 0.005  # Std of a member's growth-rate deviation from its pathway
+CO2_NOISE = 0.3  # ppm, yearly noise on the CO₂ increase
+TCR_MEDIAN, TCR_SPREAD = 1.8, 0.25  # °C per doubling of CO₂, lognormal sigma
+SEA_RATE_MEDIAN, SEA_RATE_SPREAD = 3.4, 0.3  # mm/yr per °C of extra warming, lognormal sigma
+TEMP_PERSISTENCE = 0.6  # AR(1) coefficient of year-to-year temperature variability
+
+DEFAULT_HORIZON = 77  # Years ahead; 2100 for data ending in 2023
+DEFAULT_MEMBERS = 100_000
+DEFAULT_CHUNK = 8192
+DEFAULT_BINS = 1024
+DEFAULT_QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+POOL_MIN_MEMBERS = 250_000  # Smaller ensembles finish faster than a process pool starts
+
+
+def calibrate(df, recent=30):
+    """Starting levels, current rates and variability from the last ``recent`` years of ``df``."""
+    missing = [c for c in INDICATORS if c not in df.columns]
+    if missing:
+        raise ValueError(f"Scenarios need the columns {missing}")
+    tail = df.sort_values("Year").tail(recent)
+    years = tail["Year"].to_numpy(dtype="float64")
+    baseline = {"year": int(years[-1])}
+    for key, column in (("co2", CO2), ("temperature", TEMPERATURE), ("sea_level", SEA_LEVEL)):
+        slope, intercept = np.polyfit(years, tail[column].to_numpy(dtype="float64"), 1)
+        # Trend value rather than the last (noisy) observation
+        baseline[key] = float(slope * years[-1] + intercept)
+        baseline[key + "_rate"] = float(slope)
+        if key == "temperature":
+            residuals = tail[column].to_numpy(dtype="float64") - (slope * years + intercept)
+            baseline["temperature_noise"] = float(residuals.std())
+    return baseline
+
+
+def simulate(baseline, pathway, horizon, members, rng):
+    """One batch of trajectories: {indicator: (members, horizon)} arrays."""
+    steps = np.arange(1, horizon + 1)
+    growth_rate = PATHWAYS[pathway] + PATHWAY_SPREAD * rng.standard_normal((members, 1))
+    increase = max(baseline["co2_rate"], 0.0) * (1 + growth_rate) ** steps
+    co2 = baseline["co2"] + np.cumsum(increase + CO2_NOISE * rng.standard_normal((members, horizon)), axis=1)
+    co2 = np.maximum(co2, 1.0)
+
+    tcr = TCR_MEDIAN * np.exp(TCR_SPREAD * rng.standard_normal((members, 1)))
+    shocks = rng.standard_normal((members, horizon)) * baseline["temperature_noise"] * np.sqrt(1 - TEMP_PERSISTENCE ** 2)
+    # AR(1) along each trajectory; a loop over years, vectorized over members (scipy.signal is slow to import)
+    variability = np.empty_like(shocks)
+    variability[:, 0] = shocks[:, 0]
+    for t in range(1, horizon):
+        variability[:, t] = TEMP_PERSISTENCE * variability[:, t - 1] + shocks[:, t]
+    warming = tcr * np.log2(co2 / baseline["co2"])
+    temperature = baseline["temperature"] + warming + variability
+
+    sea_rate = SEA_RATE_MEDIAN * np.exp(SEA_RATE_SPREAD * rng.standard_normal((members, 1)))
+    sea_level = baseline["sea_level"] + np.cumsum(baseline["sea_level_rate"] + sea_rate * warming, axis=1)
+    return {CO2: co2, TEMPERATURE: temperature, SEA_LEVEL: sea_level}
+
+
+class QuantileSketch:
+    """Fixed-range histograms, one per time step, mergeable by adding counts.
+
+    Values outside [lo, hi] land in the edge bins, so quantiles are exact to
+    within one bin width as long as the range covers the quantiles asked for.
+    """
+
+    def __init__(self, lo, hi, bins=DEFAULT_BINS):
+        self.lo = np.asarray(lo, dtype="float64")
+        self.width = np.maximum(np.asarray(hi, dtype="float64") - self.lo, 1e-9) / bins
+        self.bins = bins
+        self.counts = np.zeros((len(self.lo), bins), dtype=np.int64)
+        self.total = np.zeros(len(self.lo))
+
+    def update(self, values):
+        """Adds a (members, steps) batch."""
+        index = np.clip(((values - self.lo) / self.width).astype(np.int64), 0, self.bins - 1)
+        index += np.arange(len(self.lo)) * self.bins
+        self.counts += np.bincount(index.ravel(), minlength=self.counts.size).reshape(self.counts.shape)
+        self.total += values.sum(axis=0)
+
+    def merge(self, other):
+        self.counts += other.counts
+        self.total += other.total
+        return self
+
+    @property
+    def members(self):
+        return int(self.counts[0].sum())
+
+    def mean(self):
+        return self.total / max(self.members, 1)
+
+    def quantiles(self, qs):
+        """(len(qs), steps) array, interpolated linearly inside the bin."""
+        cumulative = np.cumsum(self.counts, axis=1)
+        result = np.empty((len(qs), len(self.lo)))
+        rows = np.arange(len(self.lo))
+        for i, q in enumerate(qs):
+            target = q * cumulative[:, -1]
+            b = np.argmax(cumulative >= target[:, None], axis=1)
+            before = np.where(b > 0, cumulative[rows, b - 1], 0)
+            inside = (target - before) / np.maximum(self.counts[rows, b], 1)
+            result[i] = self.lo + (b + inside) * self.width
+        return result
+
+
+def _sketch_ranges(trajectories, margin=0.5):
+    # Per-step range of a pilot batch, widened on both sides to leave room for the tails of the full ensemble
+    ranges = {}
+    for name, values in trajectories.items():
+        lo, hi = values.min(axis=0), values.max(axis=0)
+        span = np.maximum(hi - lo, 1e-6)
+        ranges[name] = (lo - margin * span, hi + margin * span)
+    return ranges
+
+
+def _run_chunks(baseline, pathway, horizon, sizes, seeds, ranges, bins):
+    sketches = {name: QuantileSketch(lo, hi, bins) for name, (lo, hi) in ranges.items()}
+    for size, seed in zip(sizes, seeds):
+        for name, values in simulate(baseline, pathway, horizon, size, np.random.default_rng(seed)).items():
+            sketches[name].update(values)
+    return sketches
+
+
+def make_pool(workers):
+    # Spawned (not forked) workers: the app's server threads are not copied into them
+    return ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn"))
+
+
+def run_ensemble(baseline, pathway, horizon=DEFAULT_HORIZON, members=DEFAULT_MEMBERS, chunk_size=DEFAULT_CHUNK,
+                 workers=1, seed=0, quantiles=DEFAULT_QUANTILES, bins=DEFAULT_BINS, pool=None):
+    """Simulates ``members`` trajectories and returns {indicator: DataFrame of Year, Mean and P<q> columns}.
+
+    With ``workers`` > 1 and at least ``POOL_MIN_MEMBERS`` members, chunks are split ``workers`` ways and
+    run on ``pool`` (any executor), or on a pool started for this call when ``pool`` is None.
+    """
+    if pathway not in PATHWAYS:
+        raise ValueError(f"Unknown pathway {pathway!r}; choose from {list(PATHWAYS)}")
+    sizes = [min(chunk_size, members - start) for start in range(0, members, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    # The first chunk doubles as the pilot that fixes each sketch's range
+    pilot = simulate(baseline, pathway, horizon, sizes[0], np.random.default_rng(seeds[0]))
+    ranges = _sketch_ranges(pilot)
+    sketches = {name: QuantileSketch(lo, hi, bins) for name, (lo, hi) in ranges.items()}
+    for name, values in pilot.items():
+        sketches[name].update(values)
+    del pilot
+
+    rest_sizes, rest_seeds = sizes[1:], seeds[1:]
+    if workers > 1 and members >= POOL_MIN_MEMBERS and len(rest_sizes) > 1:
+        with contextlib.ExitStack() as stack:
+            executor = pool if pool is not None else stack.enter_context(make_pool(workers))
+            jobs = [
+                executor.submit(_run_chunks, baseline, pathway, horizon, rest_sizes[i::workers], rest_seeds[i::workers], ranges, bins)
+                for i in range(workers)
+            ]
+            partials = [job.result() for job in jobs]
+    else:
+        partials = [_run_chunks(baseline, pathway, horizon, rest_sizes, rest_seeds, ranges, bins)] if rest_sizes else []
+    for partial in partials:
+        for name, sketch in partial.items():
+            sketches[name].merge(sketch)
+
+    years = baseline["year"] + np.arange(1, horizon + 1)
+    results = {}
+    for name, sketch in sketches.items():
+        frame = pd.DataFrame({"Year": years, "Mean": sketch.mean()})
+        for q, values in zip(quantiles, sketch.quantiles(quantiles)):
+            frame[f"P{q * 100:g}"] = values
+        results[name] = frame
+    return results
+
+
+def default_workers():
+    return max(1, min(4, os.cpu_count() or 1))
@@ -0,0 +1,157 @@
+"""Node-wide dataset cache in memory-mapped Arrow IPC files.
+
+``st.cache_data`` is per process, so every worker behind the load balancer
+builds its own copy of the climate DataFrame and the country geodata, and
+every cache hit unpickles another copy. ``SharedDatasetCache`` publishes
+each dataset once per node as an Arrow IPC file, by default under
+/dev/shm (RAM-backed and shared by every process on the machine):
+
+    /dev/shm/climatecanvas/climate-<version>.arrow
+    /dev/shm/climatecanvas/world-<version>.arrow
+
+Other workers memory-map the file instead of rebuilding the dataset.
+Numeric columns become pandas columns backed directly by the mapped pages
+(read-only, no copy), so they count once towards the node's memory rather
+than once per worker.
+
+The version in the file name is a hash of everything the dataset is built
+from (source file signatures, code, upstream dataset versions), so a
+change publishes a new file and never serves a stale one. On publish a
+process unlinks the older versions it published itself, never the files
+of other processes: during a rolling deploy the old and the new build run
+side by side, each with its own versions. Versions nobody has republished
+for ``STALE_AFTER`` seconds (left by processes that have exited) are
+unlinked too. Workers that still map an unlinked file keep their pages
+until they let go. Files are written to a temporary name and renamed into
+place, so readers never see a partial file.
+
+``DataFrame.attrs`` travel in the schema metadata (NumPy arrays included),
+and GeoDataFrames keep their geometry as WKB plus the CRS.
+"""
+import contextlib
+import glob
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+ATTRS_KEY = b"climatecanvas.attrs"
+GEO_KEY = b"climatecanvas.geo"
+STALE_AFTER = 7 * 24 * 3600  # Seconds; far longer than a rolling deploy
+
+
+def default_root():
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(base, "climatecanvas")
+
+
+def dataset_key(*parts):
+    """Short hash of the JSON-serializable ``parts`` a dataset is built from."""
+    return hashlib.sha1(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+
+
+def _encode(value):
+    # JSON for attrs, with NumPy arrays (e.g. the anomaly timeline) tagged so they come back as arrays
+    if isinstance(value, np.ndarray):
+        return {"__ndarray__": value.tolist(), "dtype": value.dtype.str}
+    if isinstance(value, (list, tuple)):
+        return {"__tuple__": [_encode(v) for v in value]} if isinstance(value, tuple) else [_encode(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _encode(v) for k, v in value.items()}
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _decode(value):
+    if isinstance(value, dict):
+        if "__ndarray__" in value:
+            return np.array(value["__ndarray__"], dtype=value["dtype"])
+        if "__tuple__" in value:
+            return tuple(_decode(v) for v in value["__tuple__"])
+        return {k: _decode(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_decode(v) for v in value]
+    return value
+
+
+def to_table(frame):
+    metadata = {ATTRS_KEY: json.dumps(_encode(dict(frame.attrs))).encode("utf-8")}
+    geometry = getattr(frame, "_geometry_column_name", None)
+    if geometry is not None and geometry in frame.columns:
+        crs = frame.crs.to_wkt() if frame.crs is not None else None
+        metadata[GEO_KEY] = json.dumps({"column": geometry, "crs": crs}).encode("utf-8")
+        frame = pd.DataFrame(frame).assign(**{geometry: frame.geometry.to_wkb()})
+    table = pa.Table.from_pandas(pd.DataFrame(frame), preserve_index=False)
+    return table.replace_schema_metadata({**(table.schema.metadata or {}), **metadata})
+
+
+def from_table(table):
+    metadata = table.schema.metadata or {}
+    # split_blocks keeps each numeric column in its own block, so pandas can use the mapped buffer as is
+    frame = table.to_pandas(split_blocks=True)
+    if GEO_KEY in metadata:
+        import geopandas as gpd  # Only for geodata that still has its geometry
+        geo = json.loads(metadata[GEO_KEY])
+        frame = gpd.GeoDataFrame(frame.drop(columns=geo["column"]),
+                                 geometry=gpd.GeoSeries.from_wkb(frame[geo["column"]], crs=geo["crs"]),
+                                 crs=geo["crs"])
+        frame = frame.rename_geometry(geo["column"]) if geo["column"] != "geometry" else frame
+    frame.attrs.update(_decode(json.loads(metadata.get(ATTRS_KEY, b"{}"))))
+    return frame
+
+
+class SharedDatasetCache:
+    def __init__(self, root=None, stale_after=STALE_AFTER):
+        self.root = root  # None disables sharing: every call builds its own copy
+        self.stale_after = stale_after
+        self._published = {}  # name -> paths this process published
+
+    def path(self, name, version):
+        return os.path.join(self.root, f"{name}-{version}.arrow")
+
+    def read(self, name, version):
+        try:
+            source = pa.memory_map(self.path(name, version), "r")
+        except FileNotFoundError:
+            return None
+        return from_table(pa.ipc.open_file(source).read_all())
+
+    def publish(self, name, version, frame):
+        os.makedirs(self.root, exist_ok=True)
+        table = to_table(frame)
+        fd, tmp = tempfile.mkstemp(dir=self.root, prefix=f".{name}-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f, pa.ipc.new_file(f, table.schema) as writer:
+                writer.write_table(table)
+            os.chmod(tmp, 0o644)  # mkstemp creates it private; workers may run as another user
+            os.replace(tmp, self.path(name, version))
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        current = self.path(name, version)
+        mine = self._published.setdefault(name, set())
+        mine.add(current)
+        cutoff = time.time() - self.stale_after
+        for old in glob.glob(os.path.join(self.root, f"{name}-*.arrow")):
+            if old == current:
+                continue
+            with contextlib.suppress(FileNotFoundError):  # Another worker got there first
+                if old in mine or os.stat(old).st_mtime < cutoff:
+                    os.unlink(old)
+                    mine.discard(old)
+
+    def get_or_publish(self, name, version, build):
+        """The shared copy of ``name`` at ``version``, building and publishing it if no worker has yet."""
+        if self.root is None:
+            return build()
+        frame = self.read(name, version)
+        if frame is None:
+            self.publish(name, version, build())
+            frame = self.read(name, version)
+        return frame
@@ -0,0 +1,168 @@
+"""Prebuilt startup artifacts: the country table, anomaly timeline and rendered maps.
+
+Without them, the first request to a fresh process imports geopandas and
+folium, reads the shapefile, computes centroids and anomalies and renders
+the regional map. Running the build step at deploy time::
+
+    python startup_artifacts.py build
+
+does all of that once and writes the results to ``data/artifacts``:
+
+    manifest.json     source signatures, dataset/geodata/timeline versions, map stats
+    regions.parquet   country table without geometry (name, continent, anomaly, centroid)
+    timeline.npz      years and the countries x years anomaly matrix
+    map_<detail>.html rendered map per level of detail
+
+The manifest records the size and mtime of every source file (shapefile,
+anomaly grid and the modules that shape the output) plus the version of
+the climate DataFrame. ``load`` returns None as soon as any of them differ,
+and the app then falls back to building everything at runtime.
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_PATH = os.path.join("data", "artifacts")
+SHAPEFILE = os.path.join("data", "ne_110m_admin_0_countries.shp")
+MANIFEST = "manifest.json"
+FORMAT = 1
+REGION_COLUMNS = ["name", "CONTINENT", "Temp Anomaly", "centroid_lat"]
+# Code whose output is baked into the artifacts; editing it invalidates them
+CODE_SOURCES = ["climate_data.py", "regional_map.py", "topology.py", "anomaly_timeline.py", "zonal_stats.py"]
+
+
+def source_paths(shapefile=SHAPEFILE, grid_path=None):
+    base, _ = os.path.splitext(shapefile)
+    here = os.path.dirname(os.path.abspath(__file__))
+    paths = [shapefile, base + ".dbf"] + ([grid_path] if grid_path else [])
+    return paths + [os.path.join(here, name) for name in CODE_SOURCES]
+
+
+def source_signature(paths):
+    signature = []
+    for path in paths:
+        try:
+            info = os.stat(path)
+            signature.append([os.path.basename(path), info.st_size, info.st_mtime_ns])
+        except FileNotFoundError:
+            signature.append([os.path.basename(path), None, None])
+    return signature
+
+
+def build(out_dir, world, df, timeline, sources, levels=None):
+    """Writes the artifacts for a prepared ``world`` and the ``timeline`` its map animates; returns the manifest."""
+    from anomaly_timeline import timeline_version
+    from regional_map import build_map_artifact
+    from topology import LOD_LEVELS
+
+    os.makedirs(out_dir, exist_ok=True)
+    regions = pd.DataFrame(world[[c for c in REGION_COLUMNS if c in world.columns]])
+    regions.to_parquet(os.path.join(out_dir, "regions.parquet"), index=False)
+    np.savez(os.path.join(out_dir, "timeline.npz"), years=timeline[0], matrix=timeline[1])
+
+    maps = {}
+    for detail in levels or LOD_LEVELS:
+        html, stats = build_map_artifact(world, detail, timeline=timeline)
+        with open(os.path.join(out_dir, f"map_{detail}.html"), "w", encoding="utf-8") as f:
+            f.write(html)
+        maps[detail] = stats
+
+    manifest = {
+        "format": FORMAT,
+        "built_at": time.time(),
+        "sources": source_signature(sources),
+        "df_version": df.attrs.get("version"),
+        "map_version": world.attrs["map_version"],
+        "timeline_version": timeline_version(*timeline),
+        "timeline_from_grid": "timeline" in world.attrs,
+        "maps": maps,
+    }
+    tmp = os.path.join(out_dir, MANIFEST + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, os.path.join(out_dir, MANIFEST))
+    return manifest
+
+
+class StartupArtifacts:
+    def __init__(self, path, manifest):
+        self.path = path
+        self.manifest = manifest
+
+    def regions(self):
+        """Country table with the same attrs the runtime loader sets (map_version, and timeline if from a grid)."""
+        regions = pd.read_parquet(os.path.join(self.path, "regions.parquet"))
+        regions.attrs["map_version"] = self.manifest["map_version"]
+        if self.manifest["timeline_from_grid"]:
+            regions.attrs["timeline"] = self.timeline()
+        return regions
+
+    def timeline(self):
+        saved = np.load(os.path.join(self.path, "timeline.npz"))
+        return saved["years"], saved["matrix"]
+
+    def map_html(self, detail, map_version, timeline_key):
+        """(html, stats) for ``detail`` if it was built from this geodata and timeline, else None."""
+        stats = self.manifest["maps"].get(detail)
+        if stats is None or map_version != self.manifest["map_version"] or timeline_key != self.manifest["timeline_version"]:
+            return None
+        with open(os.path.join(self.path, f"map_{detail}.html"), encoding="utf-8") as f:
+            return f.read(), stats
+
+
+def load(path, sources, df_version):
+    """The artifacts at ``path`` if they were built from these sources and this dataset, else None."""
+    try:
+        with open(os.path.join(path, MANIFEST), encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    if (manifest.get("format") != FORMAT or manifest["sources"] != source_signature(sources)
+            or manifest["df_version"] != df_version):
+        return None
+    return StartupArtifacts(path, manifest)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prebuild the geodata and maps the app needs at startup.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build_parser = sub.add_parser("build", help="Build the artifacts from the shapefile, anomaly grid and climate store.")
+    build_parser.add_argument("--out", default=os.getenv("STARTUP_ARTIFACTS_PATH", DEFAULT_PATH))
+    build_parser.add_argument("--shapefile", default=SHAPEFILE)
+    build_parser.add_argument("--grid", default=os.getenv("ANOMALY_GRID_PATH", os.path.join("data", "anomaly_grid.npz")))
+    build_parser.add_argument("--store", default=os.getenv("CLIMATE_STORE_PATH", os.path.join("data", "store")))
+    args = parser.parse_args(argv)
+
+    from anomaly_timeline import simulate_country_matrix
+    from climate_data import load_climate, prepare_world, read_world
+    from climate_store import ClimateStore
+
+    timings = {}
+    start = time.perf_counter()
+    store = args.store if ClimateStore(args.store).exists() else None
+    df = load_climate(store)
+    timings["climate data"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    grid = args.grid if os.path.exists(args.grid) else None
+    world = prepare_world(read_world(args.shapefile), grid)
+    timeline = world.attrs["timeline"] if "timeline" in world.attrs else simulate_country_matrix(world, df)
+    timings["geodata"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    manifest = build(args.out, world, df, timeline, source_paths(args.shapefile, grid))
+    timings["maps"] = time.perf_counter() - start
+
+    for step, seconds in timings.items():
+        print(f"{step:>13}: {seconds * 1000:8.0f} ms")
+    for detail, stats in manifest["maps"].items():
+        print(f"{'map ' + detail:>13}: {stats['html_bytes'] / 1024:8.0f} KB")
+    print(f"Wrote startup artifacts to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
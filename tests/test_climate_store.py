@@ -0,0 +1,75 @@
+import shutil
+
+import pandas as pd
+import pytest
+
+from climate_store import ClimateStore
+
+
+def frame(years, offset=0.0):
+    return pd.DataFrame({
+        "Year": [y for y in years for _ in range(12)],
+        "Month": list(range(1, 13)) * len(years),
+        "Temperature Anomaly (°C)": [offset + i / 100 for i in range(12 * len(years))],
+    })
+
+
+def test_appends_only_new_months(tmp_path):
+    series = ClimateStore(str(tmp_path)).series("global")
+    assert series.append(frame([2000, 2001])) == 24
+    assert series.append(frame([2001, 2002])) == 12
+    annual = series.read_annual()
+    assert list(annual["Year"]) == [2000, 2001, 2002]
+
+
+def test_version_changes_with_every_append(tmp_path):
+    series = ClimateStore(str(tmp_path)).series("global")
+    assert series.version is None
+    series.append(frame([2000]))
+    first = series.version
+    assert series.append(frame([2000])) == 0
+    assert series.version == first
+    series.append(frame([2001]))
+    assert series.version != first
+
+
+def test_rebuilt_store_gets_a_new_version(tmp_path):
+    store = ClimateStore(str(tmp_path / "store"))
+    store.series("global").append(frame([2000]))
+    before = store.series("global").version
+    shutil.rmtree(tmp_path / "store")
+    store.series("global").append(frame([2000], offset=1.0))
+    assert store.series("global").version != before
+
+
+def test_daily_series_read_back_by_year(tmp_path):
+    series = ClimateStore(str(tmp_path)).series("global")
+    dates = pd.date_range("1999-12-01", "2001-01-31")
+    assert series.append(pd.DataFrame({
+        "Year": dates.year, "Month": dates.month, "Day": dates.day, "Temperature Anomaly (°C)": 1.0,
+    })) == len(dates)
+    rows = series.read(start_year=2000, end_year=2000)
+    assert len(rows) == 366
+    assert rows.iloc[[0, -1]][["Month", "Day"]].values.tolist() == [[1, 1], [12, 31]]
+    x, y = series.points("Temperature Anomaly (°C)", 2000, 2000)
+    assert x[0] == 2000 and 2000.99 < x[-1] < 2001
+    assert list(series.read_annual()["Year"]) == [1999, 2000, 2001]
+
+
+def test_monthly_points_are_decimal_years(tmp_path):
+    series = ClimateStore(str(tmp_path)).series("global")
+    series.append(frame([2000, 2001]))
+    x, y = series.points("Temperature Anomaly (°C)", 2001)
+    assert x[0] == 2001 and x[-1] == 2001 + 11 / 12
+    assert y[0] == pytest.approx(0.12)
+
+
+def test_annual_means_skip_missing_years_and_respect_the_range(tmp_path):
+    series = ClimateStore(str(tmp_path)).series("global")
+    series.append(frame([2000, 2002, 2003]))
+    annual = series.read_annual(start_year=2001, end_year=2002)
+    assert list(annual["Year"]) == [2002]
+    monthly = series.read(start_year=2002, end_year=2002)
+    assert annual["Temperature Anomaly (°C)"].iloc[0] == pytest.approx(monthly["Temperature Anomaly (°C)"].astype("float64").mean())
+    assert list(series.read_annual()["Year"]) == [2000, 2002, 2003]
+    assert series.read_annual(start_year=2010).empty
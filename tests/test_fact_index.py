@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+
+from fact_index import FactIndex, country_facts
+
+
+def world(**attrs):
+    frame = pd.DataFrame({
+        "name": ["Kenya", "Norway", "Chile"],
+        "CONTINENT": ["Africa", "Europe", "South America"],
+        "Temp Anomaly": [0.8, 1.6, np.nan],
+    })
+    frame.attrs.update(attrs)
+    return frame
+
+
+def test_simulated_anomalies_say_so():
+    facts = country_facts(world())
+    assert facts[0] == "Kenya (Africa) has a simulated regional temperature anomaly of 0.80 °C, below the country average of 1.20 °C."
+    assert not any("Chile" in fact for fact in facts)
+
+
+def test_gridded_anomalies_name_their_year():
+    timeline = (np.array([2021, 2022, 2023]), np.zeros((3, 3)))
+    facts = country_facts(world(timeline=timeline))
+    assert facts[1] == "Norway (Europe) has a gridded regional temperature anomaly of 1.60 °C in 2023 (annual mean), above the country average of 1.20 °C."
+    assert not any("simulated" in fact for fact in facts)
+
+
+def test_country_questions_find_the_country():
+    df = pd.DataFrame({"Year": [2000, 2001], "Temperature Anomaly (°C)": [0.4, 0.5]})
+    index = FactIndex.from_data(df, world())
+    assert "Norway" in index.context_for("How warm did Norway get?").split(".")[0]
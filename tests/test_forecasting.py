@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from forecasting import MODELS, Forecaster
+
+
+def trend_with_noise(rng, n):
+    return 0.02 * np.arange(n) + rng.normal(0, 0.3, n)
+
+
+def ar_changes(rng, n):
+    # Year-to-year changes follow an AR(1) with drift, as the autoregressive model assumes
+    changes, shocks = np.zeros(n), rng.normal(0, 0.2, n)
+    for t in range(1, n):
+        changes[t] = 0.05 + 0.5 * (changes[t - 1] - 0.05) + shocks[t]
+    return np.cumsum(changes)
+
+
+def test_new_horizons_and_models_do_not_refit(monkeypatch):
+    rng = np.random.default_rng(0)
+    years = np.arange(1950, 2024)
+    forecaster = Forecaster(pd.DataFrame({"Year": years, "y": trend_with_noise(rng, len(years))}), max_horizon=30)
+
+    def refit(*args, **kwargs):
+        raise AssertionError("forecast() refitted a model")
+    for name in ("pinv", "lstsq", "solve", "inv"):
+        monkeypatch.setattr(np.linalg, name, refit)
+    monkeypatch.setattr(np, "polyfit", refit)
+
+    for model in MODELS:
+        long = forecaster.forecast("y", model, 30)
+        short = forecaster.forecast("y", model, 5)
+        # The same bootstrap draws: a shorter horizon is the start of a longer one
+        pd.testing.assert_frame_equal(short, long.iloc[:5])
+        assert list(long["Year"]) == list(range(2024, 2054))
+        assert (long["Lower"] <= long["Forecast"]).all() and (long["Forecast"] <= long["Upper"]).all()
+
+
+@pytest.mark.parametrize("model, series, history, bounds", [
+    ("linear", trend_with_noise, 80, (0.86, 0.94)),
+    ("polynomial", trend_with_noise, 80, (0.86, 0.94)),
+    # Only the innovations are resampled, not the AR coefficients, so short histories cover a little less
+    ("autoregressive", ar_changes, 150, (0.82, 0.95)),
+])
+def test_bands_cover_about_ninety_percent(model, series, history, bounds):
+    rng, horizon, hits = np.random.default_rng(1), 10, []
+    for replicate in range(200):
+        y = series(rng, history + horizon)
+        frame = pd.DataFrame({"Year": np.arange(1900, 1900 + history), "y": y[:history]})
+        forecast = Forecaster(frame, max_horizon=horizon, n_boot=500, seed=replicate).forecast("y", model, horizon)
+        actual = y[history:]
+        hits.append((actual >= forecast["Lower"].to_numpy()) & (actual <= forecast["Upper"].to_numpy()))
+    assert bounds[0] <= np.mean(hits) <= bounds[1]
@@ -0,0 +1,60 @@
+import threading
+
+import pytest
+
+from inference_backends import ExtractiveModels, MicroBatcher
+
+PROMPT = """
+    Provide a concise summary of the global temperature anomaly trend shown in the data between the years 1950 and 2023.
+    Focus on the overall pattern (e.g., increasing, decreasing, stable) and mention the approximate anomaly values.
+    Context: The data represents global average temperature deviations from a baseline.
+    Example data points (if available): Start year 1950 anomaly might be around 0.21°C, end year 2023 anomaly might be around 1.10°C.
+"""
+
+
+def test_extractive_summary_leaves_out_the_instructions():
+    [[result]] = ExtractiveModels().summarize([{"inputs": PROMPT, "parameters": {"max_length": 150}}])
+    summary = result["summary_text"]
+    assert "Provide" not in summary and "Focus" not in summary
+    assert "Context:" not in summary
+    assert "0.21°C" in summary and "1.10°C" in summary
+
+
+def test_extractive_answer_picks_the_matching_sentence():
+    [result] = ExtractiveModels().answer([{"question": "What was the CO2 level in 2010?",
+                                           "context": "Sea level rose. The CO2 level in 2010 was 390 ppm."}])
+    assert result["answer"] == "The CO2 level in 2010 was 390 ppm."
+
+
+def test_batcher_fails_every_future_when_results_go_missing():
+    batcher = MicroBatcher(lambda items: items[:-1], max_wait=0.05)
+    futures = [batcher.submit(i) for i in range(3)]
+    for future in futures:
+        with pytest.raises(RuntimeError):
+            future.result(timeout=5)
+
+
+def test_batcher_survives_a_cancelled_future():
+    batcher = MicroBatcher(lambda items: items, max_wait=0.05)
+    batcher.submit(1).cancel()
+    assert batcher.submit(2).result(timeout=5) == 2
+
+
+def test_cancelled_items_are_not_run_and_running_ones_cannot_be_cancelled():
+    started, release, seen = threading.Event(), threading.Event(), []
+
+    def batch(items):
+        seen.extend(items)
+        started.set()
+        release.wait(5)
+        return items
+
+    batcher = MicroBatcher(batch, max_wait=0.05)
+    skipped = batcher.submit("skipped")
+    assert skipped.cancel()
+    running = batcher.submit("running")
+    assert started.wait(5)
+    assert not running.cancel()  # Already handed to the batch
+    release.set()
+    assert running.result(timeout=5) == "running"
+    assert seen == ["running"]
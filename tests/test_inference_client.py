@@ -0,0 +1,103 @@
+import time
+
+import pytest
+import requests
+
+from benchmarks.fake_hf import FakeInferenceServer
+from inference_client import InferenceClient
+from response_cache import ResponseCache
+
+SUMMARY = {"inputs": "Temperatures rose.", "parameters": {"max_length": 50}}
+QUESTION = {"question": "How warm?", "context": "It got warmer."}
+
+
+@pytest.fixture
+def server():
+    with FakeInferenceServer(latency=0) as server:
+        yield server
+
+
+def make_client(**kwargs):
+    kwargs.setdefault("backoff_base", 0.001)
+    kwargs.setdefault("timeout", 5)
+    return InferenceClient("test-key", **kwargs)
+
+
+def test_returns_model_json(server):
+    client = make_client()
+    assert client.post(f"{server.url}/models/summary", SUMMARY)[0]["summary_text"]
+    assert client.post(f"{server.url}/models/qa", QUESTION)["answer"]
+    assert server.calls == 2
+
+
+def test_retries_transient_errors(server):
+    server.queue(500).queue(429).queue(502)
+    result = make_client(max_retries=3).post(f"{server.url}/models/qa", QUESTION)
+    assert result["answer"]
+    assert server.calls == 4
+
+
+def test_gives_up_after_max_retries(server):
+    for _ in range(3):
+        server.queue(503)
+    with pytest.raises(requests.exceptions.HTTPError):
+        make_client(max_retries=2).post(f"{server.url}/models/qa", QUESTION)
+    assert server.calls == 3
+
+
+def test_client_errors_are_not_retried(server):
+    server.queue(400)
+    with pytest.raises(requests.exceptions.HTTPError):
+        make_client().post(f"{server.url}/models/qa", QUESTION)
+    assert server.calls == 1
+
+
+def test_waits_for_a_loading_model(server):
+    server.queue(503, {"error": "Model is currently loading", "estimated_time": 0.3})
+    start = time.perf_counter()
+    result = make_client().post(f"{server.url}/models/qa", QUESTION)
+    assert result["answer"]
+    assert time.perf_counter() - start >= 0.3
+    assert server.calls == 2
+
+
+def test_loading_wait_is_capped(server):
+    server.queue(503, {"error": "Model is currently loading", "estimated_time": 60})
+    start = time.perf_counter()
+    make_client(max_warmup_wait=0.1).post(f"{server.url}/models/qa", QUESTION)
+    assert time.perf_counter() - start < 5
+
+
+def test_coalesces_identical_requests_in_flight():
+    with FakeInferenceServer(latency=0.3) as server:
+        client = make_client()
+        first = client.submit(f"{server.url}/models/qa", QUESTION)
+        second = client.submit(f"{server.url}/models/qa", dict(QUESTION))
+        assert second is first
+        assert first.result(timeout=5)["answer"]
+        assert server.calls == 1
+
+
+def test_cached_responses_skip_the_network(server, tmp_path):
+    client = make_client(cache=ResponseCache(str(tmp_path / "responses.sqlite3")))
+    first = client.post(f"{server.url}/models/qa", QUESTION)
+    assert client.post(f"{server.url}/models/qa", QUESTION) == first
+    assert server.calls == 1
+
+
+def test_fast_failures_do_not_hang():
+    # A URL without a scheme fails before any I/O, so the future is often done before submit() returns
+    client = make_client(max_retries=0)
+    for i in range(50):
+        future = client.submit("api.invalid/models/qa", {"question": str(i), "context": ""})
+        with pytest.raises(requests.exceptions.MissingSchema):
+            future.result(timeout=5)
+    assert not client._in_flight
+
+
+def test_instant_results_do_not_hang(monkeypatch):
+    client = make_client()
+    monkeypatch.setattr(client, "_request", lambda url, payload: {"answer": "ok"})
+    for i in range(200):
+        assert client.submit("http://localhost/models/qa", {"question": str(i)}).result(timeout=5) == {"answer": "ok"}
+    assert not client._in_flight
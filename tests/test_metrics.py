@@ -0,0 +1,31 @@
+import socket
+import urllib.request
+
+import pytest
+
+from metrics import Registry, serve
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def test_workers_take_the_next_free_port_on_localhost():
+    registry = Registry()
+    registry.counter("requests_total").inc()
+    port = free_port()
+    first = serve(registry, port, ports=4)
+    second = serve(registry, port, ports=4)
+    try:
+        assert first.server_address == ("127.0.0.1", port)
+        assert second.server_port != port
+        with urllib.request.urlopen(f"http://127.0.0.1:{second.server_port}/metrics") as response:
+            assert "requests_total 1" in response.read().decode()
+        with pytest.raises(OSError):
+            serve(registry, port, ports=1)
+    finally:
+        for server in (first, second):
+            server.shutdown()
+            server.server_close()
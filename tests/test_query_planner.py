@@ -0,0 +1,84 @@
+import pytest
+
+from climate_data import simulate_climate
+from query_planner import QueryPlanner
+
+
+@pytest.fixture(scope="module")
+def planner():
+    return QueryPlanner(simulate_climate())
+
+
+@pytest.mark.parametrize("question", [
+    "How much did CO2 increase since 1950?",
+    "Has carbon dioxide grown since 1950?",
+    "How did CO2 change after 1950?",
+])
+def test_change_since_a_year_runs_to_the_last_year(planner, question):
+    assert planner.answer(question)["answer"].startswith("Between 1950 and 2023, the atmospheric CO₂ level")
+
+
+def test_change_before_a_year_starts_at_the_first_year(planner):
+    assert planner.answer("How much did CO2 increase before 1950?")["answer"].startswith("Between 1900 and 1950")
+
+
+def test_change_between_two_years(planner):
+    assert planner.answer("How did CO2 change between 1950 and 2000?")["answer"].startswith("Between 1950 and 2000")
+
+
+def test_value_in_a_year(planner):
+    assert planner.answer("What was the CO2 level in 2010?")["answer"].startswith("In 2010, the atmospheric CO₂ level")
+
+
+@pytest.mark.parametrize("question", [
+    "Why did the temperature anomaly spike in 1998?",
+    "What caused the CO2 rise after 1950?",
+    "Explain the sea level trend since 1900.",
+    "How come temperatures were so high in 2016?",
+])
+def test_open_ended_questions_go_to_the_model(planner, question):
+    assert planner.answer(question) is None
+
+
+@pytest.mark.parametrize("question, label", [
+    ("Did temperatures rise faster before 1950?", "The global temperature anomaly"),
+    ("Did the oceans rise faster after 1980?", "Cumulative sea level rise"),
+])
+def test_inflected_indicator_names(planner, question, label):
+    assert planner.answer(question)["answer"].startswith(label)
+
+
+@pytest.mark.parametrize("question, start, end", [
+    ("Which year before 1950 was the warmest?", 1900, 1949),
+    ("When was CO2 lowest after 1980?", 1980, 2023),
+    ("In which year since 1990 was sea level highest?", 1990, 2023),
+])
+def test_extremes_respect_a_single_bound(planner, question, start, end):
+    text = planner.answer(question)["answer"]
+    assert f"between {start} and {end} in " in text
+    year = int(text.split(" in ")[1][:4])
+    assert start <= year <= end
+
+
+def test_extreme_year_of_a_before_bound(planner):
+    df = planner.ranges.df
+    expected = int(df.loc[df["Year"] < 1950, "Temperature Anomaly (°C)"].idxmax())
+    assert f"in {df['Year'][expected]}," in planner.answer("Which year before 1950 was the warmest?")["answer"]
+
+
+def test_trend_since_a_year_runs_to_the_last_year(planner):
+    text = planner.answer("What is the CO2 trend since 1990?")["answer"]
+    assert text.startswith("From 1990 to 2023, the atmospheric CO₂ level changed by about +")
+    assert "ppm/year" in text
+
+
+def test_trend_before_a_year(planner):
+    assert planner.answer("What was the sea level trend before 1950?")["answer"].startswith("From 1900 to 1949")
+
+
+@pytest.mark.parametrize("question", [
+    "Did CO2 increase more between 1950 and 1980 or between 1990 and 2020?",
+    "Was the temperature anomaly higher in 1950, 1980 or 2010?",
+])
+def test_comparisons_of_several_ranges_go_to_the_model(planner, question):
+    assert planner.answer(question) is None
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from range_stats import RangeIndex
+
+
+@pytest.fixture(scope="module")
+def data():
+    rng = np.random.default_rng(7)
+    # Gaps between years, shuffled rows and repeated values (ties for min/max)
+    years = np.sort(rng.choice(np.arange(1850, 2030), size=130, replace=False))
+    df = pd.DataFrame({"Year": years, "Value": rng.integers(-20, 20, len(years)) / 4})
+    return df.sample(frac=1, random_state=3), df
+
+
+def brute_force(df, start, end):
+    rows = df[(df["Year"] >= start) & (df["Year"] <= end)]
+    if rows.empty:
+        return None
+    years, values = rows["Year"].to_numpy(), rows["Value"].to_numpy()
+    return {
+        "count": len(rows),
+        "start_year": years[0],
+        "end_year": years[-1],
+        "first": values[0],
+        "last": values[-1],
+        "mean": values.mean(),
+        "min": values.min(),
+        "min_year": years[np.argmin(values)],  # First of any ties
+        "max": values.max(),
+        "max_year": years[np.argmax(values)],
+        "slope": np.polyfit(years, values, 1)[0] if len(rows) > 1 else None,
+    }
+
+
+def assert_matches(index, df, start, end):
+    expected, actual = brute_force(df, start, end), index.stats("Value", start, end)
+    if expected is None:
+        assert actual is None
+        return
+    for key, value in expected.items():
+        if value is None:
+            assert actual[key] is None, key
+        else:
+            assert actual[key] == pytest.approx(value, abs=1e-9), (key, start, end)
+    pd.testing.assert_frame_equal(index.slice(start, end).reset_index(drop=True),
+                                  df[(df["Year"] >= start) & (df["Year"] <= end)].reset_index(drop=True))
+
+
+def test_random_ranges_match_a_brute_force_scan(data):
+    shuffled, df = data
+    index = RangeIndex(shuffled)
+    rng = np.random.default_rng(11)
+    for start, end in np.sort(rng.integers(1840, 2040, size=(500, 2)), axis=1):
+        assert_matches(index, df, start, end)
+
+
+def test_single_years_and_the_boundaries(data):
+    shuffled, df = data
+    index = RangeIndex(shuffled)
+    first, last = int(df["Year"].iloc[0]), int(df["Year"].iloc[-1])
+    for year in df["Year"].iloc[[0, 1, 64, -2, -1]]:
+        assert_matches(index, df, year, year)
+        assert index.stats("Value", year, year)["slope"] is None
+    for start, end in [(first, last), (first - 10, first), (last, last + 10), (first - 10, last + 10), (first + 1, last - 1)]:
+        assert_matches(index, df, start, end)
+
+
+def test_ranges_without_rows(data):
+    shuffled, df = data
+    index = RangeIndex(shuffled)
+    first, last = int(df["Year"].iloc[0]), int(df["Year"].iloc[-1])
+    missing = next(year for year in range(first, last) if year not in set(df["Year"]))
+    assert index.stats("Value", first - 20, first - 1) is None
+    assert index.stats("Value", last + 1, last + 20) is None
+    assert index.stats("Value", missing, missing) is None
+    assert index.stats("Value", last, first) is None
+    assert index.slice(last, first).empty
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from climate_data import prepare_world, read_world
+from regional_map import build_map_artifact
+from startup_artifacts import SHAPEFILE
+
+
+@pytest.fixture(scope="module")
+def world():
+    return prepare_world(read_world(SHAPEFILE))
+
+
+def test_simulated_anomalies_are_labelled_simulated(world):
+    html, _ = build_map_artifact(world, "low")
+    assert "Simulated Temperature Anomaly" in html
+    assert "Simulated Anomaly" in html
+
+
+def test_gridded_anomalies_are_not_labelled_simulated(world):
+    gridded = world.copy()
+    gridded.attrs["timeline"] = (np.array([2023]), gridded[["Temp Anomaly"]].to_numpy())
+    html, _ = build_map_artifact(gridded, "low", timeline=gridded.attrs["timeline"])
+    assert "Simulated" not in html
+    assert "area-weighted from gridded data" in html
+
+
+def test_gridded_map_opens_on_the_last_years_annual_mean(tmp_path):
+    # Uniform grids: 0 in December 2022, then 1 and 3 in 2023, so 2023 averages 2 while its last step is 3
+    lats, lons = np.arange(-85, 90, 10.0), np.arange(-175, 180, 10.0)
+    time = np.array(["2022-12", "2023-01", "2023-06"], dtype="datetime64[M]")
+    anomaly = np.array([0.0, 1.0, 3.0])[:, None, None] * np.ones((3, len(lats), len(lons)))
+    np.savez(tmp_path / "grid.npz", lat=lats, lon=lons, time=time, anomaly=anomaly)
+
+    gridded = prepare_world(read_world(SHAPEFILE), str(tmp_path / "grid.npz"))
+    years, matrix = gridded.attrs["timeline"]
+    assert list(years) == [2022, 2023]
+    assert np.nanmax(np.abs(gridded["Temp Anomaly"] - 2.0)) < 1e-6
+    np.testing.assert_allclose(gridded["Temp Anomaly"], np.round(matrix[:, -1], 2))
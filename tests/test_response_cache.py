@@ -0,0 +1,71 @@
+import pytest
+
+import response_cache
+from metrics import Registry
+from response_cache import ResponseCache, make_key
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(response_cache.time, "time", clock)
+    return clock
+
+
+def test_entries_expire_after_the_ttl(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path / "responses.sqlite3"), ttl=60)
+    cache.set("a", {"answer": 1})
+    clock.now += 59
+    assert cache.get("a") == {"answer": 1}
+    clock.now += 2  # Reading does not extend the TTL
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path / "responses.sqlite3"), max_entries=2)
+    for key in ("a", "b"):
+        clock.now += 1
+        cache.set(key, key)
+    clock.now += 1
+    assert cache.get("a") == "a"  # Now "b" is the least recently used
+    clock.now += 1
+    cache.set("c", "c")
+    assert cache.get("b") is None
+    assert cache.get("a") == "a" and cache.get("c") == "c"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_hits_and_misses_are_counted(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path / "responses.sqlite3"))
+    fetched = []
+    payload = {"inputs": "  Summarize\n   this  "}
+    for _ in range(3):
+        value, cached = cache.get_or_fetch("https://api/x", payload, lambda: fetched.append(1) or "summary")
+    assert value == "summary" and cached and len(fetched) == 1
+    # The same prompt laid out differently is the same entry
+    assert cache.get(make_key("https://api/x", {"inputs": "Summarize this"})) == "summary"
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (3, 1, 1)
+    assert stats["hit_ratio"] == 0.75
+
+
+def test_stats_are_exported_as_metrics(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path / "responses.sqlite3"))
+    cache.get("missing")
+    cache.set("a", 1)
+    cache.get("a")
+    registry = Registry()
+    registry.add_collector(cache.metric_samples)
+    text = registry.render()
+    assert "climatecanvas_response_cache_hits_total 1" in text
+    assert "climatecanvas_response_cache_misses_total 1" in text
+    assert "# TYPE climatecanvas_response_cache_entries gauge" in text
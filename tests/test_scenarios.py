@@ -0,0 +1,64 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import scenarios
+from scenarios import QuantileSketch, calibrate, make_pool, run_ensemble
+
+
+@pytest.fixture(scope="module")
+def baseline():
+    years = np.arange(1990, 2024)
+    return calibrate(pd.DataFrame({
+        "Year": years,
+        "CO2 Levels (ppm)": 350 + 2.0 * (years - 1990),
+        "Temperature Anomaly (°C)": 0.3 + 0.02 * (years - 1990) + 0.05 * np.sin(years),
+        "Sea Level Rise (mm)": 3.3 * (years - 1990),
+    }))
+
+
+def test_sketch_quantiles_are_within_a_bin_of_the_exact_ones():
+    values = np.random.default_rng(0).normal(size=(50_000, 3)) * [1.0, 2.0, 0.5]
+    sketch = QuantileSketch(values.min(axis=0), values.max(axis=0), bins=512)
+    sketch.update(values)
+    qs = (0.05, 0.5, 0.95)
+    exact = np.quantile(values, qs, axis=0)
+    assert np.all(np.abs(sketch.quantiles(qs) - exact) <= sketch.width)
+    np.testing.assert_allclose(sketch.mean(), values.mean(axis=0))
+    assert sketch.members == len(values)
+
+
+def test_merged_sketches_equal_one_sketch_of_everything():
+    values = np.random.default_rng(1).normal(size=(1000, 4))
+    whole = QuantileSketch(np.full(4, -4.0), np.full(4, 4.0))
+    whole.update(values)
+    halves = [QuantileSketch(np.full(4, -4.0), np.full(4, 4.0)) for _ in range(2)]
+    halves[0].update(values[:300])
+    halves[1].update(values[300:])
+    merged = halves[0].merge(halves[1])
+    np.testing.assert_array_equal(merged.counts, whole.counts)
+    np.testing.assert_array_equal(merged.quantiles((0.1, 0.9)), whole.quantiles((0.1, 0.9)))
+
+
+@pytest.mark.parametrize("workers", [2, 3])
+def test_results_do_not_depend_on_the_number_of_workers(baseline, monkeypatch, workers):
+    monkeypatch.setattr(scenarios, "POOL_MIN_MEMBERS", 0)
+    serial = run_ensemble(baseline, "Current trend", horizon=10, members=20_000, chunk_size=1024)
+    with ThreadPoolExecutor(workers) as pool:
+        split = run_ensemble(baseline, "Current trend", horizon=10, members=20_000, chunk_size=1024, workers=workers, pool=pool)
+    for name, frame in serial.items():
+        quantiles = [c for c in frame.columns if c.startswith("P")]
+        pd.testing.assert_frame_equal(split[name][["Year", *quantiles]], frame[["Year", *quantiles]])
+        np.testing.assert_allclose(split[name]["Mean"], frame["Mean"])  # Sums in another order
+
+
+def test_a_shared_process_pool_serves_several_runs(baseline, monkeypatch):
+    monkeypatch.setattr(scenarios, "POOL_MIN_MEMBERS", 0)
+    serial = run_ensemble(baseline, "High emissions", horizon=5, members=5_000, chunk_size=1024)
+    with make_pool(2) as pool:
+        runs = [run_ensemble(baseline, "High emissions", horizon=5, members=5_000, chunk_size=1024, workers=2, pool=pool)
+                for _ in range(2)]
+    for run in runs:
+        pd.testing.assert_frame_equal(run["CO2 Levels (ppm)"].drop(columns="Mean"), serial["CO2 Levels (ppm)"].drop(columns="Mean"))
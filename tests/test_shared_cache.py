@@ -0,0 +1,67 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from shared_cache import SharedDatasetCache
+
+
+def climate():
+    frame = pd.DataFrame({"Year": np.arange(2000, 2005), "Temperature Anomaly (°C)": np.linspace(0.4, 0.8, 5)})
+    frame.attrs.update(version="abc", timeline=(np.array([2000, 2001]), np.eye(2)))
+    return frame
+
+
+def test_publish_and_attach_round_trip(tmp_path):
+    cache = SharedDatasetCache(str(tmp_path))
+    cache.publish("climate", "v1", climate())
+    attached = SharedDatasetCache(str(tmp_path)).read("climate", "v1")  # Another worker
+    pd.testing.assert_frame_equal(attached, climate())
+    assert attached.attrs["version"] == "abc"
+    years, matrix = attached.attrs["timeline"]
+    np.testing.assert_array_equal(years, [2000, 2001])
+    np.testing.assert_array_equal(matrix, np.eye(2))
+
+
+def test_geodata_keeps_its_geometry_and_crs(tmp_path):
+    import geopandas as gpd
+    from shapely.geometry import box
+
+    world = gpd.GeoDataFrame({"name": ["A", "B"]}, geometry=[box(0, 0, 1, 1), box(1, 0, 2, 1)], crs=4326)
+    cache = SharedDatasetCache(str(tmp_path))
+    cache.publish("world", "v1", world)
+    attached = cache.read("world", "v1")
+    assert isinstance(attached, gpd.GeoDataFrame)
+    assert attached.crs.to_epsg() == 4326
+    assert attached.geometry.equals(world.geometry)
+
+
+def test_a_version_mismatch_rebuilds(tmp_path):
+    cache = SharedDatasetCache(str(tmp_path))
+    builds = []
+    build = lambda: builds.append(1) or climate()
+    cache.get_or_publish("climate", "v1", build)
+    cache.get_or_publish("climate", "v1", build)
+    assert len(builds) == 1
+    assert cache.read("climate", "v2") is None
+    cache.get_or_publish("climate", "v2", build)
+    assert len(builds) == 2
+
+
+def test_publish_only_unlinks_this_processes_old_versions(tmp_path):
+    old_build, new_build = SharedDatasetCache(str(tmp_path)), SharedDatasetCache(str(tmp_path))
+    old_build.publish("climate", "old", climate())
+    new_build.publish("climate", "new", climate())
+    # Side by side during a rolling deploy: neither removes the other's file
+    assert old_build.read("climate", "old") is not None
+    new_build.publish("climate", "newer", climate())
+    assert not os.path.exists(new_build.path("climate", "new"))
+    assert os.path.exists(new_build.path("climate", "old"))
+
+
+def test_stale_versions_of_exited_processes_are_unlinked(tmp_path):
+    exited = SharedDatasetCache(str(tmp_path))
+    exited.publish("climate", "abandoned", climate())
+    os.utime(exited.path("climate", "abandoned"), (0, 0))
+    SharedDatasetCache(str(tmp_path)).publish("climate", "current", climate())
+    assert not os.path.exists(exited.path("climate", "abandoned"))
@@ -0,0 +1,74 @@
+import geopandas as gpd
+import numpy as np
+import pytest
+import shapely
+
+from climate_data import read_world
+from startup_artifacts import SHAPEFILE
+from topology import LOD_LEVELS, to_topojson
+
+LEVELS = [level for level, preset in LOD_LEVELS.items() if preset["quantization"] is not None]
+
+
+def decode(topology):
+    # TopoJSON back to shapely, following the spec: delta-decoded arcs, then the transform
+    (kx, ky), (x0, y0) = topology["transform"]["scale"], topology["transform"]["translate"]
+    arcs = [np.cumsum(np.array(arc, dtype="float64"), axis=0) * [kx, ky] + [x0, y0] for arc in topology["arcs"]]
+
+    def ring(refs):
+        parts = [arcs[ref] if ref >= 0 else arcs[~ref][::-1] for ref in refs]
+        return np.concatenate([parts[0]] + [part[1:] for part in parts[1:]])
+
+    shapes = []
+    for geometry in topology["objects"]["countries"]["geometries"]:
+        if geometry["type"] is None:
+            shapes.append(None)
+            continue
+        polygons = [geometry["arcs"]] if geometry["type"] == "Polygon" else geometry["arcs"]
+        parts = [shapely.Polygon(ring(rings[0]), [ring(hole) for hole in rings[1:]]) for rings in polygons]
+        shapes.append(parts[0] if len(parts) == 1 else shapely.MultiPolygon(parts))
+    return shapes
+
+
+@pytest.fixture(scope="module")
+def world():
+    return read_world(SHAPEFILE)[["NAME", "geometry"]]
+
+
+@pytest.fixture(scope="module", params=LEVELS)
+def decoded(request, world):
+    preset = LOD_LEVELS[request.param]
+    return np.array(decode(to_topojson(world, ["NAME"], preset["quantization"], preset["tolerance"])), dtype=object)
+
+
+def test_every_country_is_valid(world, decoded):
+    invalid = [name for name, shape in zip(world["NAME"], decoded) if shape is None or not shape.is_valid]
+    assert invalid == []
+
+
+def test_no_country_collapses(world, decoded):
+    ratio = shapely.area(decoded) / shapely.area(world.geometry.values)
+    assert list(world["NAME"][(ratio < 0.5) | (ratio > 1.5)]) == []
+
+
+def test_neighbours_share_their_borders(world, decoded):
+    tree = shapely.STRtree(world.geometry.values)
+    a, b = tree.query(world.geometry.values, predicate="touches")
+    pairs = [(i, j) for i, j in zip(a, b) if i < j]
+    assert pairs
+    for i, j in pairs:
+        # Same border on both sides: no overlap, and still in contact
+        assert shapely.area(shapely.intersection(decoded[i], decoded[j])) < 1e-9, (world["NAME"][i], world["NAME"][j])
+        assert shapely.intersects(decoded[i], decoded[j]), (world["NAME"][i], world["NAME"][j])
+
+
+def test_vertex_next_to_a_border_is_snapped_onto_it():
+    # A needle between two neighbours, like Sudan's between Ethiopia and South Sudan. On a grid with
+    # a step of 1, its inner corner (50.7, 60) rounds to (51, 60), across the east border at x = 50.75.
+    needle = shapely.Polygon([(50, 80), (53, 0), (50.7, 60), (20, 62)])
+    east = shapely.Polygon([(50, 80), (100, 80), (100, 0), (53, 0)])
+    west = shapely.Polygon([(53, 0), (50.7, 60), (20, 62), (20, 0)])
+    frame = gpd.GeoDataFrame({"NAME": ["needle", "east", "west"]}, geometry=[needle, east, west])
+    shapes = decode(to_topojson(frame, ["NAME"], quantization=81))
+    assert all(shape.is_valid for shape in shapes)
+    assert shapely.area(shapely.intersection(shapes[1], shapes[2])) < 1e-9
@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+import shapely
+
+from zonal_stats import ZonalAggregator, load_grid
+
+LATS = np.arange(-89.5, 90)
+# One box in the western hemisphere, one in the eastern
+COUNTRIES = np.array([shapely.box(-100, 10, -80, 30), shapely.box(20, -10, 40, 10)])
+
+
+def write_grid(path, lons, **extra):
+    # Anomaly = the cell's longitude in -180..180, so each country's mean is its centre longitude
+    wrapped = (lons + 180) % 360 - 180
+    anomaly = np.broadcast_to(wrapped, (2, len(LATS), len(lons))).copy()
+    np.savez(path, lat=LATS, lon=lons, anomaly=anomaly, **extra)
+    return str(path)
+
+
+def test_grids_in_0_360_are_wrapped(tmp_path):
+    path = write_grid(tmp_path / "grid.npz", np.arange(0.5, 360), time=np.array([2000, 2001]))
+    lats, lons, anomaly, time = load_grid(path)
+    assert lons.min() == -179.5 and lons.max() == 179.5
+    assert np.all(np.diff(lons) > 0)
+    means = ZonalAggregator(COUNTRIES, lats, lons).aggregate(anomaly)
+    np.testing.assert_allclose(means, [[-90, -90], [30, 30]], rtol=1e-5)  # float32 accumulation
+    assert list(time) == [2000, 2001]
+
+
+def test_both_conventions_agree(tmp_path):
+    time = np.array([2000, 2001])
+    east = load_grid(write_grid(tmp_path / "east.npz", np.arange(0.5, 360), time=time))
+    centred = load_grid(write_grid(tmp_path / "centred.npz", np.arange(-179.5, 180), time=time))
+    np.testing.assert_array_equal(east[1], centred[1])
+    np.testing.assert_array_equal(np.asarray(east[2]), np.asarray(centred[2]))
+
+
+def test_aggregator_rejects_0_360_longitudes():
+    with pytest.raises(ValueError, match="0..360"):
+        ZonalAggregator(COUNTRIES, LATS, np.arange(0.5, 360))
+
+
+def test_grid_without_time_is_rejected(tmp_path):
+    path = write_grid(tmp_path / "grid.npz", np.arange(-179.5, 180))
+    with pytest.raises(ValueError, match="no 'time'"):
+        load_grid(path)
+
+
+def test_time_must_match_the_grids(tmp_path):
+    path = write_grid(tmp_path / "grid.npz", np.arange(-179.5, 180), time=np.array([2000]))
+    with pytest.raises(ValueError, match="1 time values for 2 grids"):
+        load_grid(path)
+
+
+def test_chunks_and_changing_nan_masks_match_a_direct_mean():
+    lons = np.arange(-179.5, 180)
+    rng = np.random.default_rng(0)
+    grids = rng.normal(1, 0.5, (7, len(LATS), len(lons)))
+    grids[2, :, :100] = np.nan  # Step 2 loses the western country
+    grids[5, 60:140, 200:230] = np.nan  # Step 5 loses part of the eastern one
+    original = grids.copy()
+    means = ZonalAggregator(COUNTRIES, LATS, lons).aggregate(grids, chunk=3)
+    np.testing.assert_array_equal(grids, original)  # The caller's array is left alone
+
+    # Brute force: cos(lat)-weighted mean of the cells each box covers
+    expected = np.full((2, 7), np.nan)
+    for c, (x0, y0, x1, y1) in enumerate([(-100, 10, -80, 30), (20, -10, 40, 10)]):
+        rows = (LATS > y0) & (LATS < y1)
+        cols = (lons > x0) & (lons < x1)
+        weight = np.cos(np.radians(LATS[rows]))[:, None] * np.ones(cols.sum())
+        for t in range(7):
+            cells = grids[t][np.ix_(rows, cols)]
+            if np.isfinite(cells).any():
+                expected[c, t] = np.nansum(cells * weight) / weight[np.isfinite(cells)].sum()
+    np.testing.assert_allclose(means, expected, rtol=1e-5)
+    assert np.isnan(means[0, 2])
+
+
+def test_stacks_are_read_a_chunk_at_a_time(tmp_path):
+    path = write_grid(tmp_path / "grid.npz", np.arange(-179.5, 180), time=np.array([2000, 2001]))
+    _, _, stack, _ = load_grid(path)
+    blocks = list(stack.chunks(1))
+    assert [start for start, _ in blocks] == [0, 1]
+    assert all(block.shape == (1, len(LATS), 360) and block.dtype == np.float32 for _, block in blocks)
+    np.testing.assert_array_equal(np.concatenate([b for _, b in blocks]), np.load(path)["anomaly"])
@@ -0,0 +1,348 @@
+"""Shared-arc TopoJSON encoding with topology-preserving simplification.
+
+Country polygons share most of their borders, so GeoJSON sends every border
+twice and at full float precision. This module converts a GeoDataFrame of
+(Multi)Polygons into a TopoJSON topology:
+
+* coordinates are quantized onto an integer grid, so shared vertices match
+  exactly and serialize as short integers; a segment that passes within
+  half a step of another vertex is routed through it (snap rounding), so
+  rounding cannot push a vertex across a neighbour's border;
+* rings are cut into arcs at junctions (points where neighbouring rings
+  diverge) and identical arcs are stored once;
+* each arc is simplified once with Douglas-Peucker, keeping its end points,
+  so neighbours keep an identical border and no gaps appear. Simplifying
+  arcs one at a time can still make a ring cross itself or a neighbour, or
+  collapse a small country, so every feature is checked afterwards; the
+  arcs of a feature that became invalid, lost or gained more than half its
+  area or started overlapping a neighbour are simplified again at a lower
+  tolerance, and finally kept as they were;
+* arcs are delta-encoded, as the TopoJSON spec allows with a transform.
+
+Only numpy and shapely are needed, both of which geopandas already pulls in.
+"""
+import json
+import time
+
+import numpy as np
+import shapely
+
+# Level-of-detail presets: simplification tolerance in degrees and grid size per axis.
+# "full" keeps the original geometry and is rendered as plain GeoJSON.
+LOD_LEVELS = {
+    "low": {"tolerance": 0.5, "quantization": 10_000},
+    "medium": {"tolerance": 0.1, "quantization": 100_000},
+    "high": {"tolerance": 0.02, "quantization": 100_000},
+    "full": {"tolerance": 0.0, "quantization": None},
+}
+DEFAULT_LOD = "medium"
+SIMPLIFY_RETRIES = 3  # Halvings of the tolerance for arcs of broken features before keeping them unsimplified
+MAX_AREA_CHANGE = 0.5  # Largest relative area change a feature may see from simplification
+
+
+def _polygon_rings(geometry):
+    # Yields a list of rings (each an (n, 2) array, closed) per polygon part
+    if geometry is None or geometry.is_empty:
+        return []
+    parts = geometry.geoms if geometry.geom_type == "MultiPolygon" else [geometry]
+    polygons = []
+    for part in parts:
+        rings = [np.asarray(part.exterior.coords)[:, :2]]
+        rings.extend(np.asarray(interior.coords)[:, :2] for interior in part.interiors)
+        polygons.append(rings)
+    return polygons
+
+
+def _snap_rings(rings, stride):
+    # Inserts into each segment the grid points within half a step of it, in order along the segment.
+    # Neighbours share their segments, so both get the same points and their borders stay identical.
+    xy = [np.column_stack([ring // stride, ring % stride]) for ring in rings]
+    if not xy:
+        return rings
+    points = np.unique(np.concatenate(xy), axis=0)
+    starts = np.concatenate([a[:-1] for a in xy])
+    ends = np.concatenate([a[1:] for a in xy])
+    segments = shapely.linestrings(np.stack([starts, ends], axis=1).astype("float64"))
+    seg_idx, pt_idx = shapely.STRtree(shapely.points(points.astype("float64"))).query(
+        segments, predicate="dwithin", distance=0.5)
+    hit = points[pt_idx]
+    inner = ~(np.all(hit == starts[seg_idx], axis=1) | np.all(hit == ends[seg_idx], axis=1))
+    if not inner.any():
+        return rings
+    seg_idx, hit = seg_idx[inner], hit[inner]
+    direction = (ends[seg_idx] - starts[seg_idx]).astype("float64")
+    along = np.einsum("ij,ij->i", (hit - starts[seg_idx]).astype("float64"), direction)
+    inserts = {}
+    for i in np.lexsort([along, seg_idx]):
+        inserts.setdefault(int(seg_idx[i]), []).append(int(hit[i, 0] * stride + hit[i, 1]))
+
+    snapped, offset = [], 0
+    for ring in rings:
+        keys = [int(ring[0])]
+        for j in range(len(ring) - 1):
+            keys.extend(inserts.get(offset + j, ()))
+            keys.append(int(ring[j + 1]))
+        offset += len(ring) - 1
+        snapped.append(_remove_spikes(keys))
+    return snapped
+
+
+def _remove_spikes(keys):
+    # Drops repeated points and back-and-forth detours (A B A -> A) from a closed ring of keys
+    out = []
+    for key in keys[:-1]:
+        if out and out[-1] == key:
+            continue
+        if len(out) >= 2 and out[-2] == key:
+            out.pop()
+            continue
+        out.append(key)
+    while len(out) >= 3 and (out[0] == out[-1] or out[1] == out[-1]):
+        out.pop(0) if out[1] == out[-1] else out.pop()
+    return np.array(out + out[:1], dtype="int64")
+
+
+def _find_junctions(rings):
+    # A point is a junction when it is reached through different neighbours in different rings
+    points, pairs_lo, pairs_hi = [], [], []
+    for ring in rings:
+        open_ring = ring[:-1]
+        if len(open_ring) < 3:
+            continue
+        prev = np.roll(open_ring, 1)
+        nxt = np.roll(open_ring, -1)
+        points.append(open_ring)
+        pairs_lo.append(np.minimum(prev, nxt))
+        pairs_hi.append(np.maximum(prev, nxt))
+    if not points:
+        return set()
+    table = np.unique(np.column_stack([np.concatenate(points), np.concatenate(pairs_lo), np.concatenate(pairs_hi)]), axis=0)
+    uniq, counts = np.unique(table[:, 0], return_counts=True)
+    return set(uniq[counts > 1].tolist())
+
+
+def _cut_ring(ring, junctions):
+    # Splits a closed ring of point keys into arcs that start and end at junctions
+    open_ring = ring[:-1]
+    cuts = [i for i, key in enumerate(open_ring.tolist()) if key in junctions]
+    if not cuts:
+        return [ring], False
+    rotated = np.concatenate([open_ring[cuts[0]:], open_ring[:cuts[0]]])
+    cuts = [c - cuts[0] for c in cuts] + [len(open_ring)]
+    rotated = np.append(rotated, rotated[0])
+    return [rotated[a:b + 1] for a, b in zip(cuts[:-1], cuts[1:])], True
+
+
+def _canonical_ring(arc):
+    # Rotates a junction-free closed ring to start at its smallest key so equal rings compare equal
+    open_ring = arc[:-1]
+    start = int(np.argmin(open_ring))
+    rotated = np.concatenate([open_ring[start:], open_ring[:start]])
+    return np.append(rotated, rotated[0])
+
+
+def _simplify_arcs(arcs, tolerance):
+    if tolerance <= 0 or not arcs:
+        return arcs
+    lengths = [len(arc) for arc in arcs]
+    lines = shapely.linestrings(np.concatenate(arcs).astype("float64"), indices=np.repeat(np.arange(len(arcs)), lengths))
+    simplified = shapely.simplify(lines, tolerance, preserve_topology=False)
+    counts = shapely.get_num_coordinates(simplified)
+    coords = np.split(shapely.get_coordinates(simplified).astype("int64"), np.cumsum(counts)[:-1])
+    result = []
+    for original, arc in zip(arcs, coords):
+        closed = np.array_equal(original[0], original[-1])
+        # A closed arc needs four points to stay a ring; otherwise keep it as it was
+        result.append(original if len(arc) < (4 if closed else 2) else arc)
+    return result
+
+
+def _ring_coords(refs, arcs):
+    # Joins a ring's arcs (negative refs run backwards), dropping the point each arc shares with the previous
+    parts = [arcs[ref] if ref >= 0 else arcs[~ref][::-1] for ref in refs]
+    return np.concatenate([parts[0]] + [part[1:] for part in parts[1:]])
+
+
+def _assemble(geometries, arcs):
+    # One shapely (Multi)Polygon per feature, in grid units; None for features without polygons
+    features = []
+    for polygons in geometries:
+        parts = [shapely.Polygon(_ring_coords(rings[0], arcs), [_ring_coords(ring, arcs) for ring in rings[1:]])
+                 for rings in polygons]
+        features.append(None if not parts else parts[0] if len(parts) == 1 else shapely.MultiPolygon(parts))
+    return np.array(features, dtype=object)
+
+
+def _overlapping(features):
+    # Pairs (i < j) of valid features whose interiors overlap
+    present = np.flatnonzero([f is not None and f.is_valid for f in features])
+    if not len(present):
+        return set()
+    a, b = shapely.STRtree(features[present]).query(features[present], predicate="overlaps")
+    return {(int(present[i]), int(present[j])) for i, j in zip(a, b) if i < j}
+
+
+def _simplify_valid(arcs, geometries, tolerance):
+    """Simplifies ``arcs`` so that no feature becomes invalid, collapses or overlaps a neighbour."""
+    simplified = _simplify_arcs(arcs, tolerance)
+    if simplified is arcs:
+        return arcs
+    feature_arcs = [{ref if ref >= 0 else ~ref for rings in polygons for ring in rings for ref in ring}
+                    for polygons in geometries]
+    before = _assemble(geometries, arcs)
+    valid_before = np.array([f is not None and f.is_valid for f in before])
+    area_before = np.array([f.area if f is not None else 0.0 for f in before])
+    overlaps_before = _overlapping(before)
+
+    retries = 0
+    while True:
+        after = _assemble(geometries, simplified)
+        area_after = np.array([f.area if f is not None else 0.0 for f in after])
+        broken = valid_before & ~np.array([f is not None and f.is_valid for f in after])
+        broken |= np.abs(area_after - area_before) > MAX_AREA_CHANGE * area_before
+        for pair in _overlapping(after) - overlaps_before:
+            broken[list(pair)] = True
+        if not broken.any():
+            return simplified
+        # Retry the arcs of every broken feature; their neighbours share the arcs and change with them
+        redo = sorted(set().union(*(feature_arcs[i] for i in np.flatnonzero(broken))))
+        retries += 1
+        if retries <= SIMPLIFY_RETRIES:
+            redone = _simplify_arcs([arcs[i] for i in redo], tolerance / 2 ** retries)
+        else:
+            redone = [arcs[i] for i in redo]
+        if retries > SIMPLIFY_RETRIES and all(np.array_equal(simplified[i], arc) for i, arc in zip(redo, redone)):
+            return simplified  # Already unsimplified: the breakage comes from the input, not from simplifying
+        simplified = list(simplified)
+        for i, arc in zip(redo, redone):
+            simplified[i] = arc
+
+
+def _delta_encode(arc):
+    arc = arc[np.r_[True, np.any(np.diff(arc, axis=0) != 0, axis=1)]]
+    if len(arc) == 1:
+        arc = np.vstack([arc, arc])
+    deltas = np.diff(arc, axis=0, prepend=np.zeros((1, 2), dtype=arc.dtype))
+    return deltas.tolist()
+
+
+def to_topojson(gdf, properties, quantization=100_000, tolerance=0.0, object_name="countries"):
+    """Encodes a polygon GeoDataFrame as a TopoJSON topology dict.
+
+    ``tolerance`` is in the units of the input CRS (degrees for EPSG:4326);
+    ``quantization`` is the number of grid steps per axis.
+    """
+    x0, y0, x1, y1 = gdf.total_bounds
+    kx = (x1 - x0) / (quantization - 1) if x1 > x0 else 1.0
+    ky = (y1 - y0) / (quantization - 1) if y1 > y0 else 1.0
+    stride = quantization + 1
+
+    # Quantize every ring and turn each grid point into one int64 key
+    features = []
+    for geometry in gdf.geometry:
+        polygons = []
+        for rings in _polygon_rings(geometry):
+            keyed = []
+            for ring in rings:
+                qx = np.round((ring[:, 0] - x0) / kx).astype("int64")
+                qy = np.round((ring[:, 1] - y0) / ky).astype("int64")
+                keys = qx * stride + qy
+                keys = keys[np.r_[True, keys[1:] != keys[:-1]]]
+                if keys[0] != keys[-1]:
+                    keys = np.append(keys, keys[0])
+                keyed.append(keys)
+            polygons.append(keyed)
+        features.append(polygons)
+
+    snapped = iter(_snap_rings([ring for polygons in features for rings in polygons for ring in rings], stride))
+    features = [[[next(snapped) for _ in rings] for rings in polygons] for polygons in features]
+
+    junctions = _find_junctions([ring for polygons in features for rings in polygons for ring in rings])
+
+    # Cut rings into arcs and store each distinct arc (in either direction) once
+    arc_keys, arc_index = [], {}
+
+    def arc_ref(arc):
+        forward = arc.tobytes()
+        if forward in arc_index:
+            return arc_index[forward]
+        backward = arc[::-1].tobytes()
+        if backward in arc_index:
+            return ~arc_index[backward]
+        arc_index[forward] = len(arc_keys)
+        arc_keys.append(arc)
+        return arc_index[forward]
+
+    geometries = []
+    for polygons in features:
+        encoded_polygons = []
+        for rings in polygons:
+            encoded_rings = []
+            for ring in rings:
+                if len(ring) < 4:
+                    continue
+                arcs, was_cut = _cut_ring(ring, junctions)
+                if not was_cut:
+                    forward = _canonical_ring(arcs[0])
+                    backward = _canonical_ring(arcs[0][::-1])
+                    ref = arc_index.get(backward.tobytes())
+                    encoded_rings.append([~ref] if ref is not None else [arc_ref(forward)])
+                else:
+                    encoded_rings.append([arc_ref(arc) for arc in arcs])
+            if encoded_rings:
+                encoded_polygons.append(encoded_rings)
+        geometries.append(encoded_polygons)
+
+    # Simplify each shared arc once, in grid units, then delta-encode
+    arcs_xy = [np.column_stack([keys // stride, keys % stride]) for keys in arc_keys]
+    tolerance_grid = tolerance / min(kx, ky) if tolerance else 0.0
+    arcs_xy = _simplify_valid(arcs_xy, geometries, tolerance_grid)
+
+    records = gdf[properties].to_dict(orient="records")
+    topo_geometries = []
+    for polygons, props in zip(geometries, records):
+        props = {k: (None if isinstance(v, float) and np.isnan(v) else v) for k, v in props.items()}
+        if not polygons:
+            topo_geometries.append({"type": None, "properties": props})
+        elif len(polygons) == 1:
+            topo_geometries.append({"type": "Polygon", "arcs": polygons[0], "properties": props})
+        else:
+            topo_geometries.append({"type": "MultiPolygon", "arcs": polygons, "properties": props})
+
+    return {
+        "type": "Topology",
+        "transform": {"scale": [kx, ky], "translate": [float(x0), float(y0)]},
+        "objects": {object_name: {"type": "GeometryCollection", "geometries": topo_geometries}},
+        "arcs": [_delta_encode(arc) for arc in arcs_xy],
+    }
+
+
+def payload_bytes(obj):
+    return len(json.dumps(obj, separators=(",", ":")).encode("utf-8"))
+
+
+def build_lod_variants(gdf, properties, levels=None, object_name="countries"):
+    """Encodes ``gdf`` once per level of detail and reports size and build time.
+
+    Returns ``{level: {"topology": dict | None, "bytes": int, "geojson_bytes": int,
+    "saved_ratio": float, "build_ms": float}}``; the "full" level carries no
+    topology because it is rendered straight from the GeoDataFrame.
+    """
+    geojson_bytes = len(gdf[properties + ["geometry"]].to_json().encode("utf-8"))
+    variants = {}
+    for level in levels or LOD_LEVELS:
+        preset = LOD_LEVELS[level]
+        start = time.perf_counter()
+        if preset["quantization"] is None:
+            topology, size = None, geojson_bytes
+        else:
+            topology = to_topojson(gdf, properties, preset["quantization"], preset["tolerance"], object_name)
+            size = payload_bytes(topology)
+        variants[level] = {
+            "topology": topology,
+            "bytes": size,
+            "geojson_bytes": geojson_bytes,
+            "saved_ratio": 1 - size / geojson_bytes if geojson_bytes else 0.0,
+            "build_ms": (time.perf_counter() - start) * 1000,
+        }
+    return variants
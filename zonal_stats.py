@@ -0,0 +1,222 @@
+"""Area-weighted zonal means of gridded fields over country polygons.
+
+Clipping every polygon against every grid is far too slow for hundreds of
+monthly 0.25° grids. ``ZonalAggregator`` does the geometry work once: it
+indexes the grid cells in an STRtree, finds the cells each country touches,
+and records the overlap area of each (country, cell) pair, scaled by
+cos(latitude) so that cells shrink towards the poles as they do on the
+sphere. The result is a sparse countries x cells weight matrix. After that,
+aggregating a grid is one sparse matrix-vector product; NaN cells (ocean,
+missing data) are left out of both the numerator and the weights.
+
+Grids are regular lat/lon arrays of shape (lat, lon) or (time, lat, lon),
+with ``lats``/``lons`` giving cell centres in the polygons' CRS (EPSG:4326),
+so longitudes run -180..180. ``load_grid`` converts 0..360 grids (common in
+NetCDF products) to that range.
+
+A long 0.25° stack does not fit in memory comfortably, so ``load_grid``
+returns a ``GridStack`` that reads a few time steps at a time, straight
+from the ``.npz`` member or the NetCDF variable, and ``aggregate`` works
+through it chunk by chunk in float32, filling NaNs in place. Memory is
+bounded by the weights plus one chunk, however many steps there are.
+"""
+import zipfile
+
+import numpy as np
+import scipy.sparse as sp
+import shapely
+
+DEFAULT_CHUNK = 8  # Time steps read at once; one 0.25° step is 4 MB in float32
+BAND_CELLS = 100_000  # Grid cells boxed and indexed at once while building the weights
+
+
+def _cell_edges(centres):
+    # Edges halfway between centres, extrapolating half a step at each end
+    centres = np.asarray(centres, dtype="float64")
+    mid = (centres[1:] + centres[:-1]) / 2
+    first = centres[0] - (mid[0] - centres[0]) if len(centres) > 1 else centres[0] - 0.5
+    last = centres[-1] + (centres[-1] - mid[-1]) if len(centres) > 1 else centres[0] + 0.5
+    return np.concatenate([[first], mid, [last]])
+
+
+class ZonalAggregator:
+    def __init__(self, geometries, lats, lons):
+        self.lats = np.asarray(lats, dtype="float64")
+        self.lons = np.asarray(lons, dtype="float64")
+        if self.lons.size and self.lons.max() > 180:
+            # The country polygons stop at 180°E; cells past it would match nothing
+            raise ValueError("Grid longitudes run 0..360; convert them to -180..180 first (see load_grid)")
+        self.shape = (len(self.lats), len(self.lons))
+        # float32 like the grids, so the products need no float64 copy of them
+        self.weights = self._build_weights(np.asarray(geometries)).astype("float32")
+
+    def _build_weights(self, geometries):
+        lat_edges, lon_edges = _cell_edges(self.lats), _cell_edges(self.lons)
+        lat_lo, lat_hi = np.minimum(lat_edges[:-1], lat_edges[1:]), np.maximum(lat_edges[:-1], lat_edges[1:])
+        lon_lo, lon_hi = np.minimum(lon_edges[:-1], lon_edges[1:]), np.maximum(lon_edges[:-1], lon_edges[1:])
+
+        shapely.prepare(geometries)
+        rows, cols, vals = [], [], []
+        # A band of grid rows at a time, so a 0.25° grid never holds a million cell boxes at once
+        band = max(1, BAND_CELLS // len(self.lons))
+        for first in range(0, len(self.lats), band):
+            last = min(first + band, len(self.lats))
+            # One box per cell, flattened in C order to match grid.reshape(-1)
+            cells = shapely.box(
+                np.repeat(lon_lo[None, :], last - first, axis=0).ravel(),
+                np.repeat(lat_lo[first:last, None], len(self.lons), axis=1).ravel(),
+                np.repeat(lon_hi[None, :], last - first, axis=0).ravel(),
+                np.repeat(lat_hi[first:last, None], len(self.lons), axis=1).ravel(),
+            )
+            country_idx, cell_idx = shapely.STRtree(cells).query(geometries, predicate="intersects")
+
+            # Cells entirely inside a country keep their full area; only border cells are clipped
+            inside = shapely.contains_properly(geometries[country_idx], cells[cell_idx])
+            areas = shapely.area(cells[cell_idx])
+            border = ~inside
+            areas[border] = shapely.area(shapely.intersection(geometries[country_idx[border]], cells[cell_idx[border]]))
+
+            values = areas * np.cos(np.radians(self.lats[first + cell_idx // len(self.lons)]))
+            keep = values > 0
+            rows.append(country_idx[keep])
+            cols.append(cell_idx[keep] + first * len(self.lons))
+            vals.append(values[keep])
+        return sp.csr_matrix(
+            (np.concatenate(vals), (np.concatenate(rows), np.concatenate(cols))),
+            shape=(len(geometries), self.shape[0] * self.shape[1]),
+        )
+
+    def aggregate(self, grids, chunk=DEFAULT_CHUNK):
+        """Area-weighted mean per country: (countries,) for one grid, (countries, time) for a stack.
+
+        ``grids`` is an array (a memmap works too) or a ``GridStack``; it is
+        read ``chunk`` time steps at a time. Countries with no valid cells get NaN.
+        """
+        grids = grids if isinstance(grids, GridStack) else np.asarray(grids)
+        single = grids.ndim == 2
+        steps = 1 if single else grids.shape[0]
+        if tuple(grids.shape[-2:]) != self.shape:
+            raise ValueError(f"Grid shape {tuple(grids.shape[-2:])} does not match the aggregator's {self.shape}")
+        chunks = grids.chunks(chunk) if isinstance(grids, GridStack) else _array_chunks(grids, chunk)
+        means = np.empty((self.weights.shape[0], steps))
+        valid, coverage = None, None
+        for start, block in chunks:
+            for i, flat in enumerate(block.reshape(len(block), -1), start):
+                missing = np.isnan(flat)
+                flat[missing] = 0.0  # The block is a private float32 copy, so fill in place
+                # The NaN mask (ocean, missing data) rarely changes between steps; only recount coverage when it does
+                if valid is None or not np.array_equal(~missing, valid):
+                    valid = ~missing
+                    coverage = self.weights @ valid.astype("float32")
+                totals = self.weights @ flat
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    means[:, i] = np.where(coverage > 0, totals / coverage, np.nan)
+        return means[:, 0] if single else means
+
+
+def _array_chunks(grids, size):
+    # Private float32 copies of ``size`` steps at a time (the caller's array is never modified)
+    stack = grids[None] if grids.ndim == 2 else grids
+    for start in range(0, len(stack), size):
+        yield start, np.array(stack[start:start + size], dtype="float32")
+
+
+class GridStack:
+    """A (time, lat, lon) stack read ``read(start, stop)`` at a time, lon axis reordered by ``order``."""
+
+    def __init__(self, shape, read, order=None):
+        self.shape = tuple(shape)
+        self.ndim = 3
+        self._read = read
+        self._order = order
+
+    def __len__(self):
+        return self.shape[0]
+
+    def chunks(self, size=DEFAULT_CHUNK):
+        """Yields ``(start, block)`` with private float32 blocks of up to ``size`` steps."""
+        for start in range(0, self.shape[0], size):
+            block = self._read(start, min(start + size, self.shape[0]))
+            block = block[..., self._order] if self._order is not None else block
+            if block.dtype != np.float32 or not block.flags.writeable or not block.flags.owndata:
+                block = block.astype("float32")
+            yield start, block
+
+    def __array__(self, dtype=None, copy=None):
+        # Reads everything; for small grids and tests
+        stack = np.concatenate([block for _, block in self.chunks()])
+        return stack if dtype is None else stack.astype(dtype)
+
+
+def _npz_member(path, name):
+    # Shape and a reader for an uncompressed or compressed .npy member, streamed from the zip without loading it
+    with zipfile.ZipFile(path) as archive, archive.open(name + ".npy") as f:
+        version = np.lib.format.read_magic(f)
+        reader = np.lib.format.read_array_header_1_0 if version == (1, 0) else np.lib.format.read_array_header_2_0
+        shape, fortran_order, dtype = reader(f)
+        offset = f.tell()
+    if fortran_order:
+        return shape, lambda start, stop: np.load(path)[name][start:stop]
+
+    step_bytes = int(np.prod(shape[1:], dtype="int64")) * dtype.itemsize
+
+    def read(start, stop):
+        block = np.empty((stop - start,) + tuple(shape[1:]), dtype=dtype)
+        with zipfile.ZipFile(path) as archive, archive.open(name + ".npy") as f:
+            f.seek(offset + start * step_bytes)
+            for i in range(stop - start):
+                memoryview(block[i]).cast("B")[:] = f.read(step_bytes)
+        return block
+    return shape, read
+
+
+def _wrap_longitudes(lons):
+    # 0..360 -> -180..180, with the order that keeps the lon axis ascending (None if already in range)
+    lons = np.asarray(lons, dtype="float64")
+    if not lons.size or lons.max() <= 180:
+        return lons, None
+    wrapped = (lons + 180) % 360 - 180
+    order = np.argsort(wrapped, kind="stable")
+    return wrapped[order], order
+
+
+def _require_time(path, time, steps):
+    # Without real dates the timeline would start at year 0
+    if time is None:
+        raise ValueError(f"{path} has no 'time' coordinate; the anomaly timeline needs the date of each grid")
+    time = np.atleast_1d(time)
+    if len(time) != steps:
+        raise ValueError(f"{path} has {len(time)} time values for {steps} grids")
+    return time
+
+
+def load_grid(path):
+    """Reads gridded anomalies: ``.npz`` with lat, lon, time and anomaly (time, lat, lon), or
+    NetCDF (needs xarray) with a single data variable on time/lat/lon. Returns lat, lon, a
+    ``GridStack`` of the anomalies and time, with longitudes in -180..180. The anomalies are
+    read lazily, a chunk at a time."""
+    if path.endswith(".npz"):
+        data = np.load(path)
+        shape, read = _npz_member(path, "anomaly")
+        if len(shape) == 2:
+            single = data["anomaly"]  # One grid: small enough to read whole
+            shape, read = (1,) + tuple(shape), lambda start, stop: single[None]
+        time = _require_time(path, data["time"] if "time" in data.files else None, shape[0])
+        lons, order = _wrap_longitudes(data["lon"])
+        return data["lat"], lons, GridStack(shape, read, order), time
+    try:
+        import xarray as xr  # Optional dependency, only needed for NetCDF grids
+    except ImportError as e:
+        raise ImportError("Reading NetCDF grids requires xarray (pip install xarray netCDF4)") from e
+    dataset = xr.open_dataset(path)
+    variable = dataset[list(dataset.data_vars)[0]]
+    lat = next(n for n in ("lat", "latitude", "y") if n in variable.dims)
+    lon = next(n for n in ("lon", "longitude", "x") if n in variable.dims)
+    time = _require_time(path, variable["time"].values if "time" in variable.coords else None,
+                         variable.shape[0] if variable.ndim == 3 else 1)
+    variable = variable.transpose(..., lat, lon)
+    if variable.ndim == 2:
+        variable = variable.expand_dims("time", axis=0)
+    lons, order = _wrap_longitudes(variable[lon].values)
+    # Slicing the lazily opened variable reads only those steps from the file
+    return variable[lat].values, lons, GridStack(variable.shape, lambda start, stop: variable[start:stop].values, order), time